@@ -1,5 +1,24 @@
+import bisect
 import json
+import os
 import re
+import sys
+from collections import Counter, OrderedDict, deque
+from collections.abc import Iterator
+from functools import lru_cache, partial
+from itertools import islice
+from operator import itemgetter
+
+import pandas as pd
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Append the `src` directory to sys.path for the json lines and byte range helpers
+src_dir = os.path.join(parent_dir, 'src')
+sys.path.append(src_dir)
+
+from byteranges import iter_array_chunks, load_array
+from jsonl import is_jsonl, iter_jsonl, iter_jsonl_batches, load_jsonl, write_jsonl
 
 # people are saying it is going to involve comparing two json files and seeing any mismatch stuff. let's prioritize that instead of flattening the json first. 
 
@@ -15,6 +34,101 @@ import re
 # 2. if the first half has nothing in it, (no comma, no nothing)
 # 3. if the first half has some things, 
 
+# titles / suffixes are compared lowercased without dots. frozensets so the lookups are O(1)
+# and nothing is rebuilt per call
+TITLES = frozenset(['mr', 'mrs', 'miss', 'dr', 'prof', 'rev', 'hon'])
+SUFFIXES = frozenset(['jr', 'sr', 'i', 'ii', 'iii', 'iv', 'v', 'phd', 'md', 'esq'])
+
+# compiled once instead of on every clean_email call
+EMAIL_TAG = re.compile(r'(\+[^@]*)@')
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+
+# real customer data repeats the same names and emails across files and runs, so the normalizers
+# remember their results. bounded LRU keyed by (normalizer, type, raw value), shared by every Jason
+# unless one is given its own. the type keeps true, 1 and 1.0 apart (they hash the same)
+
+def _is_missing(value):
+    # None, NaN, NaT and pd.NA. strings, the usual value, skip the pandas check
+    return value is None or (not isinstance(value, str) and pd.api.types.is_scalar(value) and bool(pd.isna(value)))
+
+
+class NormalizationCache:
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, kind, value, normalize):
+        '''
+        cached normalize(value). missing values (NaN never equals itself, so it would never hit)
+        and values that can't be dict keys are normalized every time
+        '''
+        if _is_missing(value):
+            self.misses += 1
+            return normalize(value)
+        key = (kind, value.__class__, value)
+        try:
+            result = self.entries[key]
+        except KeyError:
+            pass
+        except TypeError:  # unhashable
+            self.misses += 1
+            return normalize(value)
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return result
+
+        self.misses += 1
+        result = normalize(value)
+        if self.maxsize > 0:
+            self.entries[key] = result
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)  # least recently used
+        return result
+
+    def lookup_many(self, kind, values, normalize):
+        '''lookup() over a batch, with the loop kept tight'''
+        entries = self.entries
+        results = []
+        for value in values:
+            key = (kind, value.__class__, value)
+            try:
+                result = entries[key]
+            except (KeyError, TypeError):
+                results.append(self.lookup(kind, value, normalize))
+                continue
+            self.hits += 1
+            entries.move_to_end(key)
+            results.append(result)
+        return results
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self.entries) > max(maxsize, 0):
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+        }
+
+
+NORMALIZATION_CACHE = NormalizationCache()
+
+
 def parse_name(name):
     '''
     parse different name formats and returns a standardized dictionary. string -> dict
@@ -30,9 +144,6 @@ def parse_name(name):
     if not name or not isinstance(name, str):
         return result
     name = ' '.join(name.strip().split())
-    titles = ['mr', 'mrs', 'miss', 'dr', 'prof', 'rev', 'hon']
-
-    suffixes = ['jr', 'sr', 'i', 'ii','iii', 'iv', 'v', 'phd', 'md', 'esq']
     if ',' in name:
         parts = [p.strip() for p in name.split(',', 1)]
         result['last_name'] = parts[0]
@@ -44,7 +155,7 @@ def parse_name(name):
         if ',' in remaining:
             name_part, suffix_part = [p.strip() for p in remaining.split(',', 1)]
             remaining = name_part
-            if suffix_part.lower().replace('.', '') in suffixes:
+            if suffix_part.lower().replace('.', '') in SUFFIXES:
                 result['suffix'] = suffix_part
         
         # Process first/middle from remaining
@@ -58,12 +169,12 @@ def parse_name(name):
         parts = name.split()
         
         # Handle title
-        if parts and parts[0].lower().replace('.', '') in titles:
+        if parts and parts[0].lower().replace('.', '') in TITLES:
             result['title'] = parts[0]
             parts = parts[1:]
         
         # Handle suffix (at the end)
-        if parts and parts[-1].lower().replace('.', '') in suffixes:
+        if parts and parts[-1].lower().replace('.', '') in SUFFIXES:
             result['suffix'] = parts[-1]
             parts = parts[:-1]
         # Also check for comma suffix format "John Doe, PhD"
@@ -71,7 +182,7 @@ def parse_name(name):
             last_part = parts[-1]
             if ',' in last_part:
                 name_part, suffix = last_part.split(',', 1)
-                if suffix.strip().lower().replace('.', '') in suffixes:
+                if suffix.strip().lower().replace('.', '') in SUFFIXES:
                     result['suffix'] = suffix.strip()
                     parts[-1] = name_part
         
@@ -87,7 +198,7 @@ def parse_name(name):
             # First, middle, and last
             result['first_name'] = parts[0]
             result['last_name'] = parts[-1]
-            result['middle_name'] = ' '.join(parts[1])
+            result['middle_name'] = ' '.join(parts[1:-1])
     return result
 
 
@@ -108,15 +219,597 @@ def parse_name(name):
 # implement streaming parser for huge files 
 
 
+# structural diff engine. list elements are matched through a hash map instead of sorting or
+# comparing by position: by the first identity key (e.g. 'id') an element has, otherwise by its
+# content. so one inserted element is one 'add' and not a mismatch for every element after it.
+# near linear: every element is keyed once and looked up once
+
+# built once, json.dumps would build an encoder per call
+_CANONICAL_ENCODER = json.JSONEncoder(sort_keys=True, separators=(',', ':'), default=str)
+
+
+def content_key(value, normalize_numbers=False):
+    '''
+    canonical text of a json value. equal values give equal text whatever their key order (and
+    true != 1). with normalize_numbers integral floats are written as ints, so 1 and 1.0 give the
+    same text. raises TypeError for an object whose keys mix types that can't be sorted
+    '''
+    return _CANONICAL_ENCODER.encode(_integral_floats(value) if normalize_numbers else value)
+
+
+def _integral_floats(value):
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, dict):
+        return {key: _integral_floats(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_integral_floats(item) for item in value]
+    return value
+
+
+def _escape(key):
+    # json pointer (rfc 6901) escaping of one path segment
+    key = str(key)
+    if '~' in key or '/' in key:
+        key = key.replace('~', '~0').replace('/', '~1')
+    return key
+
+
+def _match_key(item, identity_keys):
+    if identity_keys and isinstance(item, dict):
+        for key in identity_keys:
+            if key in item:
+                value = item[key]
+                if isinstance(value, (dict, list)):
+                    value = content_key(value)
+                return ('id', key, value.__class__, value)  # the class keeps true and 1 apart
+    return ('content', content_key(item))
+
+
+def _in_order(positions):
+    '''indexes of a longest increasing run of positions (patience sorting). the others have moved'''
+    tails, tail_at, previous = [], [], [None] * len(positions)
+    for k, position in enumerate(positions):
+        i = bisect.bisect_left(tails, position)
+        if i == len(tails):
+            tails.append(position)
+            tail_at.append(k)
+        else:
+            tails[i] = position
+            tail_at[i] = k
+        previous[k] = tail_at[i - 1] if i else None
+    keep = set()
+    k = tail_at[-1] if tail_at else None
+    while k is not None:
+        keep.add(k)
+        k = previous[k]
+    return keep
+
+
+_END = object()
+
+
+def _diff_items(left, right, pointer, identity_keys, ignore_order):
+    '''
+    diff the elements of two arrays. left and right can be any iterables (e.g. a streamed
+    top-level array): both are read in lockstep and an element is diffed against its match as
+    soon as both have been read, so only elements still waiting for their match are held
+    '''
+    sides = (iter(left), iter(right))
+    pending = ({}, {})  # match key -> deque of (position, item) not matched yet, per side
+    read = [0, 0]
+    active = [True, True]
+    matched = []  # (i, j, right item) of every match, only kept when the order matters
+    while active[0] or active[1]:
+        for side in (0, 1):
+            if not active[side]:
+                continue
+            item = next(sides[side], _END)
+            if item is _END:
+                active[side] = False
+                continue
+            position = read[side]
+            read[side] += 1
+
+            key = _match_key(item, identity_keys)
+            waiting = pending[1 - side].get(key)
+            if not waiting:
+                pending[side].setdefault(key, deque()).append((position, item))
+                continue
+            other_position, other = waiting.popleft()
+            if not waiting:
+                del pending[1 - side][key]
+            i, a, j, b = (position, item, other_position, other) if side == 0 else (other_position, other, position, item)
+            if not ignore_order:
+                matched.append((i, j, b))
+            # content matches are equal by construction, identity matches usually are
+            if key[0] == 'id' and content_key(a) != content_key(b):
+                yield from _diff(a, b, f"{pointer}/{i}", identity_keys, ignore_order)
+
+    removed = sorted(((p, item, key[0] == 'content') for key, q in pending[0].items() for p, item in q),
+                     key=lambda entry: entry[0])
+    added = sorted(((p, item, key[0] == 'content') for key, q in pending[1].items() for p, item in q),
+                   key=lambda entry: entry[0])
+
+    # leftovers without an identity that sit in the same gap between matched elements (as many
+    # matched elements before them on both sides) are paired in order and diffed in place
+    free = {}
+    for rank, (j, item, content) in enumerate(added):
+        if content:
+            free.setdefault(j - rank, deque()).append(j)
+    edited = {}
+    for rank, (i, item, content) in enumerate(removed):
+        candidates = free.get(i - rank) if content else None
+        if candidates:
+            edited[i] = candidates.popleft()
+    edited_right = set(edited.values())
+    right_items = {j: item for j, item, _ in added if j in edited_right}
+
+    for i, item, _ in removed:
+        if i in edited:
+            yield from _diff(item, right_items[edited[i]], f"{pointer}/{i}", identity_keys, ignore_order)
+    for i, item, _ in removed:
+        if i not in edited:
+            yield (f"{pointer}/{i}", 'remove', item, None)
+    for j, item, _ in added:
+        if j not in edited_right:
+            yield (f"{pointer}/{j}", 'add', None, item)
+
+    if not ignore_order:
+        matched.sort(key=lambda entry: entry[0])
+        in_order = _in_order([j for _, j, _ in matched])
+        for k, (i, j, item) in enumerate(matched):
+            if k not in in_order:
+                yield (f"{pointer}/{j}", 'move', f"{pointer}/{i}", item)
+
+
+def _diff(left, right, pointer, identity_keys, ignore_order):
+    '''
+    walk both values and yield (json pointer, kind, left, right) for every difference. kind is
+    'add', 'remove' or 'replace'; 'move' gives the old pointer as left and the moved value as right.
+    pointers are into the left document, except for 'add' and the target of 'move' (right document)
+    '''
+    if isinstance(left, dict) and isinstance(right, dict):
+        for key, value in left.items():
+            child = f"{pointer}/{_escape(key)}"
+            if key in right:
+                yield from _diff(value, right[key], child, identity_keys, ignore_order)
+            else:
+                yield (child, 'remove', value, None)
+        for key, value in right.items():
+            if key not in left:
+                yield (f"{pointer}/{_escape(key)}", 'add', None, value)
+    elif isinstance(left, list) and isinstance(right, list):
+        yield from _diff_items(left, right, pointer, identity_keys, ignore_order)
+    elif type(left) is not type(right) or left != right:
+        yield (pointer, 'replace', left, right)
+
+
+def iter_json_diffs(left, right, identity_keys=None, ignore_order=True, max_diffs=None):
+    '''
+    (json pointer, kind, left, right) for every difference, yielded lazily as the walk goes
+    (see _diff) and stopping after max_diffs.
+
+    left / right are parsed json, or iterators over the items of a top-level array (e.g. the
+    streaming.iter_json_array generator of a file), which are then compared element by element
+    without loading either array
+    '''
+    if isinstance(left, Iterator) or isinstance(right, Iterator):
+        for value in (left, right):
+            if not isinstance(value, (Iterator, list)):
+                raise TypeError(f"a streamed array can only be compared with an array, not {type(value).__name__}")
+        diffs = _diff_items(left, right, '', identity_keys, ignore_order)
+    else:
+        diffs = _diff(left, right, '', identity_keys, ignore_order)
+    yield from islice(diffs, max_diffs)
+
+
+def json_patch(left, right, identity_keys=None, ignore_order=True, max_diffs=None):
+    '''
+    json-patch style operations describing how right differs from left, produced lazily.
+    list elements are matched by the first of identity_keys they have (else by content); with
+    ignore_order=False elements that changed place are reported as 'move'
+    '''
+    for path, kind, old, new in iter_json_diffs(left, right, identity_keys, ignore_order, max_diffs):
+        if kind == 'add':
+            yield {'op': 'add', 'path': path, 'value': new}
+        elif kind == 'remove':
+            yield {'op': 'remove', 'path': path, 'old': old}
+        elif kind == 'replace':
+            yield {'op': 'replace', 'path': path, 'value': new, 'old': old}
+        else:
+            yield {'op': 'move', 'from': old, 'path': path}
+
+
+def _children(value):
+    # (key, child) pairs of a container, list positions as strings
+    if isinstance(value, dict):
+        return iter(value.items())
+    return zip(map(str, range(len(value))), value)
+
+
+def flatten_json(data, parent_key='', sep='_', lists=True):
+    '''
+    flatten nested dicts (and lists, unless lists=False keeps them as values) into one dict
+    of sep-joined keys. walks with an explicit stack of child iterators and writes every leaf
+    straight into the output dict, so deep documents neither copy keys level after level nor
+    hit the recursion limit. empty containers below the root are kept as values so
+    unflatten_json gets them back; an empty root flattens to {}
+    '''
+    flattened = {}
+    stack = []
+    if isinstance(data, dict) or (lists and isinstance(data, list)):
+        if data:
+            stack.append((parent_key, _children(data)))
+    else:
+        flattened[parent_key] = data
+
+    while stack:
+        prefix, children = stack[-1]
+        for key, value in children:
+            new_key = f"{prefix}{sep}{key}" if prefix else key
+            if value and (isinstance(value, dict) or (lists and isinstance(value, list))):
+                stack.append((new_key, _children(value)))
+                break
+            flattened[new_key] = value
+        else:
+            stack.pop()
+    return flattened
+
+
+def unflatten_json(flattened, sep='_', lists=True):
+    '''
+    inverse of flatten_json: split the keys on sep and rebuild the nesting. a level whose keys
+    are exactly 0..n-1 becomes a list again (unless lists=False). round trips as long as no
+    original key contains sep, so pick a sep the keys don't use (e.g. '.')
+    '''
+    if list(flattened) == ['']:
+        return flattened['']
+
+    root = {}
+    built = [(root, None, None)]  # (dict, parent, key) of every level made here, parents first
+    made = {id(root)}
+    for key, value in flattened.items():
+        parts = str(key).split(sep)
+        node = root
+        for depth, part in enumerate(parts[:-1]):
+            child = node.get(part, _END)
+            if child is _END:
+                child = node[part] = {}
+                built.append((child, node, part))
+                made.add(id(child))
+            elif id(child) not in made:
+                raise ValueError(f"key {key!r} goes through {sep.join(parts[:depth + 1])!r}, which has a value")
+            node = child
+        if parts[-1] in node:
+            raise ValueError(f"key {key!r} is also the prefix of other keys")
+        node[parts[-1]] = value
+
+    if not lists:
+        return root
+    # deepest levels first, so a parent always sees its children in their final form
+    for node, parent, key in reversed(built):
+        if node and all(k == str(i) for i, k in enumerate(node)):
+            converted = list(node.values())
+            if parent is None:
+                return converted
+            parent[key] = converted
+    return root
+
+
+def flatten_columns(records, sep='_', lists=True):
+    '''
+    flatten a list of records straight into columns: {flattened key: [value per record]},
+    None where a record lacks the key. every column is allocated once at full length
+    '''
+    records = records if isinstance(records, list) else list(records)
+    columns = {}
+    for row, record in enumerate(records):
+        for key, value in flatten_json(record, sep=sep, lists=lists).items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = [None] * len(records)
+            column[row] = value
+    return columns
+
+
+# json lines: one document per line. reading, splitting and writing them lives in src/jsonl.py,
+# only the flattening into frames is done here
+
+def iter_json_lines_frames(path, chunk_size=10000, sep='_', lists=True):
+    '''
+    DataFrames of at most chunk_size flattened documents each, so a json lines file never has to
+    be held as python objects all at once
+    '''
+    for batch in iter_jsonl_batches(path, chunk_size):
+        yield pd.DataFrame(flatten_columns(batch, sep, lists))
+
+
+# path queries. a pattern like "$.customers[*].email" or "$..email" is compiled once into steps,
+# all the patterns of a query run together as one automaton whose states are the sets of
+# (pattern, step) still alive at a node. the transitions are built lazily and cached per
+# (state, key), so on a document (or a stream of them) sharing the same keys every node costs
+# one dict lookup and nothing is printed or lowercased more than needed
+
+_PATH_TOKEN = re.compile(r"""(\.\.|\.)?(?:\[(?:(\*)|(-?\d+)|'([^']*)'|"([^"]*)")\]|([^.\[\]]+))""")
+_OTHER = object()  # any key / index no pattern names
+
+
+def compile_path(pattern):
+    '''
+    steps of a JSONPath-like pattern: (kind, value, recursive) where kind is 'key', 'index' or
+    'any' (* or [*]) and recursive steps ("..name") may first skip any number of levels
+    '''
+    text = pattern[1:] if pattern.startswith('$') else pattern
+    steps, pos = [], 0
+    while pos < len(text):
+        token = _PATH_TOKEN.match(text, pos)
+        if token is None or (token.group(6) is not None and token.group(1) is None and pos > 0):
+            raise ValueError(f"invalid path {pattern!r} at position {pos + len(pattern) - len(text)}")
+        separator, star, index, quoted, double_quoted, name = token.groups()
+        if star is not None or name == '*':
+            step = ('any', None)
+        elif index is not None:
+            if index.startswith('-'):
+                # positions are matched as the walk enumerates a list, it never knows the length
+                raise ValueError(f"negative index in path {pattern!r} is not supported")
+            step = ('index', int(index))
+        else:
+            step = ('key', next(v for v in (quoted, double_quoted, name) if v is not None))
+        steps.append(step + (separator == '..',))
+        pos = token.end()
+    if not steps:
+        raise ValueError(f"path {pattern!r} selects nothing")
+    return steps
+
+
+class PathQuery:
+    '''
+    a set of named path patterns ({name: pattern}, or a list of patterns named by themselves)
+    matched against documents in a single walk. ignore_case compares keys lowercased, like
+    traverse_nested_json did
+    '''
+    def __init__(self, patterns, ignore_case=False):
+        if not isinstance(patterns, dict):
+            patterns = {pattern: pattern for pattern in patterns}
+        self.names = list(patterns)
+        self.ignore_case = ignore_case
+        self.steps = []
+        for pattern in patterns.values():
+            steps = compile_path(pattern)
+            if ignore_case:
+                steps = [(kind, value.lower() if kind == 'key' else value, recursive) for kind, value, recursive in steps]
+            self.steps.append(steps)
+        self.keys = {value for steps in self.steps for kind, value, _ in steps if kind == 'key'}
+        self.indexes = {value for steps in self.steps for kind, value, _ in steps if kind == 'index'}
+
+        self._states = []  # state id -> frozenset of (pattern, step)
+        self._state_ids = {}
+        self._transitions = {}  # (state id, label) -> (next state id or None, matched pattern numbers)
+        self.start = self._state(frozenset((p, 0) for p in range(len(self.steps))))
+
+    def _state(self, alive):
+        state = self._state_ids.get(alive)
+        if state is None:
+            state = self._state_ids[alive] = len(self._states)
+            self._states.append(alive)
+        return state
+
+    def _step(self, state, label, is_index):
+        alive, matched = set(), []
+        for p, k in self._states[state]:
+            kind, value, recursive = self.steps[p][k]
+            if recursive:
+                alive.add((p, k))
+            if kind == 'any' or (kind == 'index') == is_index and value == label:
+                if k + 1 == len(self.steps[p]):
+                    matched.append(p)
+                else:
+                    alive.add((p, k + 1))
+        transition = (self._state(frozenset(alive)) if alive else None, tuple(sorted(matched)))
+        self._transitions[(state, label, is_index)] = transition
+        return transition
+
+    def _label(self, key, is_index):
+        if is_index:
+            return key if key in self.indexes else _OTHER
+        if self.ignore_case and isinstance(key, str):
+            key = key.lower()
+        return key if key in self.keys else _OTHER
+
+    @staticmethod
+    def _enter(state, value):
+        if isinstance(value, dict):
+            return state, iter(value.items()), False
+        return state, enumerate(value), True
+
+    def iter_matches(self, document):
+        '''(name, value) of every match, in document order'''
+        names, transitions = self.names, self._transitions
+        stack = []
+        if isinstance(document, (dict, list)):
+            stack.append(self._enter(self.start, document))
+        while stack:
+            state, children, is_index = stack[-1]
+            for key, value in children:
+                label = self._label(key, is_index)
+                transition = transitions.get((state, label, is_index)) or self._step(state, label, is_index)
+                for p in transition[1]:
+                    yield names[p], value
+                if transition[0] is not None and value and isinstance(value, (dict, list)):
+                    stack.append(self._enter(transition[0], value))
+                    break
+            else:
+                stack.pop()
+
+    def extract(self, document):
+        '''{name: [values]} of one document'''
+        return self.extract_all([document])
+
+    def extract_all(self, documents):
+        '''{name: [values]} over an iterable of documents (e.g. a streamed array), in one pass'''
+        found = {name: [] for name in self.names}
+        for document in documents:
+            for name, value in self.iter_matches(document):
+                found[name].append(value)
+        return found
+
+
+@lru_cache(maxsize=128)
+def _attribute_query(attributes):
+    # "$..['name']" for every attribute, whatever characters the name has
+    patterns = []
+    for name in sorted(attributes):
+        quote = '"' if "'" in name else "'"
+        patterns.append(f"$..[{quote}{name}{quote}]")
+    return PathQuery(patterns, ignore_case=True)
+
+
+# alias resolution. heterogeneous records mostly come in a handful of key shapes, so instead of
+# trying every alias on every record an AliasPlan builds, per shape (the set of the record's keys),
+# one function that reads only the aliases that shape has. "contact.email" is a nested path
+
+def _dig(value, path):
+    # value at a nested path, None when some level is missing or not an object
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _absent(record):
+    # reader of an alias the shape doesn't have
+    return None
+
+
+class AliasPlan:
+    '''
+    fields: {output name: [aliases in order of preference]}; the first alias whose value is not
+    None (not falsy, with falsy_missing=True) wins, None when there is none. the resolvers of the
+    maxsize most recently seen shapes are kept
+    '''
+    def __init__(self, fields, falsy_missing=False, maxsize=256):
+        self.fields = {name: list(aliases) for name, aliases in fields.items()}
+        self.falsy_missing = falsy_missing
+        self._resolver = lru_cache(maxsize=maxsize)(self._compile)  # frozenset of keys -> resolver
+
+    @classmethod
+    def from_names(cls, actual_names, alternate_names, falsy_missing=False):
+        # the Jason.normalize arguments: each name first, then its alternates
+        return cls({name: [name] + list(alternate_names.get(name, [])) for name in actual_names}, falsy_missing)
+
+    def _compile(self, keys):
+        # fields with a single top-level alias in this shape are read together by one itemgetter,
+        # the others try their readers (itemgetter, or _dig for a nested path) in order. with
+        # falsy_missing ("or" semantics) a field whose values are all falsy gets its last alias's
+        # value, None when that alias is not in the shape, so only a last alias is read directly
+        direct, chained = [], []
+        for name, aliases in self.fields.items():
+            present = [alias for alias in aliases
+                       if alias in keys or ('.' in alias and alias.split('.', 1)[0] in keys)]
+            last_present = bool(present) and present[-1] == aliases[-1]
+            if len(present) == 1 and present[0] in keys and (last_present or not self.falsy_missing):
+                direct.append((name, present[0]))
+            else:
+                readers = [itemgetter(alias) if alias in keys else partial(_dig, path=tuple(alias.split('.')))
+                           for alias in present]
+                if self.falsy_missing and not last_present:
+                    readers.append(_absent)
+                chained.append((name, tuple(readers)))
+
+        names = [name for name, _ in direct]
+        get = itemgetter(*[alias for _, alias in direct]) if direct else None
+        single = len(direct) == 1
+        order = list(self.fields) if names + [name for name, _ in chained] != list(self.fields) else None
+        falsy_missing = self.falsy_missing
+
+        def resolve(record):
+            if get is None:
+                out = {}
+            else:
+                out = {names[0]: get(record)} if single else dict(zip(names, get(record)))
+            for name, readers in chained:
+                value = None
+                for read in readers:
+                    if value is None or (falsy_missing and not value):
+                        value = read(record)
+                out[name] = value
+            # keep the fields in the order they were given
+            return out if order is None else {name: out[name] for name in order}
+
+        return resolve
+
+    def resolver(self, record):
+        return self._resolver(frozenset(record))
+
+    def resolve(self, record):
+        return self._resolver(frozenset(record))(record)
+
+    def resolve_many(self, records):
+        '''resolve a batch; records sharing a shape share one resolver'''
+        # the key tuple is cheaper to build than a frozenset, so within a batch resolvers are
+        # looked up by it first
+        resolver, seen = self._resolver, {}
+        out = []
+        for record in records:
+            shape = tuple(record)
+            resolve = seen.get(shape)
+            if resolve is None:
+                resolve = seen[shape] = resolver(frozenset(shape))
+            out.append(resolve(record))
+        return out
+
+    def resolve_frame(self, df):
+        '''
+        a whole DataFrame at once: every field is its first alias column, filled column-wise from
+        the next ones. a nested alias is read from a flattened 'contact.email' column or from the
+        dicts of a 'contact' column
+        '''
+        out = {}
+        for name, aliases in self.fields.items():
+            value = None
+            for alias in aliases:
+                if alias in df.columns:
+                    column = df[alias]
+                elif '.' in alias and alias.split('.', 1)[0] in df.columns:
+                    path = tuple(alias.split('.'))
+                    column = df[path[0]].map(lambda v: _dig(v, path[1:]), na_action='ignore')
+                else:
+                    continue
+                column = column.astype(object)
+                if self.falsy_missing:
+                    column = column.where(column.astype(bool) & column.notna())
+                value = column if value is None else value.where(value.notna(), column)
+            out[name] = value if value is not None else pd.Series(None, index=df.index, dtype=object)
+        frame = pd.DataFrame(out, index=df.index, dtype=object)
+        return frame.where(frame.notna(), None)
+
+
+# normalize_user's aliases; "or" semantics, an empty name falls back to fullName
+_USER_PLAN = AliasPlan({'name': ['name', 'fullName'], 'email': ['email', 'contact']}, falsy_missing=True)
+
+
 # let's first implement a json parsing class that will handle a lot of the parsing and normalization logic for us.
 # this "Jason" class will be a data normalizer. Might as well be named JsonNormalizer
 # includes a bunch of utility classes as well as normalization functions like "normalize" def normalize 
 # we can either use concurrency or parallelism while parsing two different files (maybe it is a function that will call the different tool functions we have)
 class Jason:
-    def __init__(self, file_paths):
+    def __init__(self, file_paths, cache=None):
         self.file_paths = file_paths
+        # normalization results are shared between instances unless a cache is passed in
+        self.cache = cache if cache is not None else NORMALIZATION_CACHE
+        self.alias_plans = {}
+        self._last_alias_plan = None
 
-    def parse_json_from_file(self, file_path):
+    def parse_json_from_file(self, file_path, workers=1, array_key=None):
+        # a .jsonl / .ndjson file comes back as the list of its documents
+        if is_jsonl(file_path):
+            return load_jsonl(file_path, workers)
+        # a big array is memory mapped and parsed in byte ranges (only the array is kept)
+        if workers > 1:
+            records = load_array(file_path, workers, array_key)
+            return records if array_key is None else {array_key: records}
         with open(file_path, 'r') as f:
             data = json.load(f)
         if isinstance(data, dict):
@@ -128,40 +821,64 @@ class Jason:
     def parse_json_from_string(self, json_str: str):
         return json.loads(json_str)
 
+    def parse_json_columns(self, file_path, workers=1, array_key=None, chunk_mb=16, sep='_'):
+        # flattened {column: values} chunks of a big array, one per byte range, in file order
+        return list(iter_array_chunks(file_path, workers, array_key, transform=partial(flatten_columns, sep=sep),
+                                      chunk_mb=chunk_mb))
+
+    def iter_json_lines(self, file_path):
+        return iter_jsonl(file_path)
+
+    def json_lines_frames(self, file_path, chunk_size=10000, sep='_', lists=True):
+        return iter_json_lines_frames(file_path, chunk_size, sep, lists)
+
+    def write_json_lines(self, records, filename):
+        return write_jsonl(records, filename)
+
     def write_json_to_file(self, data, filename):
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(data, f, index=4)
 
     def traverse_nested_json(self, mapping: dict, wanted_attributes, arr):
-        for key, val in mapping.items():
-            if isinstance(val, list):
-                print('called isinstance nested 1')
-                for item in val: 
-                    self.traverse_nested_json(item, wanted_attributes, arr)
-            elif isinstance(val, dict):
-                print('called isinstance nested 2')
-                self.traverse_nested_json(val, wanted_attributes, arr)
-            else: # the value is finally not nested
-                if key.lower() in wanted_attributes:
-                    arr.append(val)
+        # values (not objects / arrays) of the wanted attributes at any depth, keys compared lowercased
+        query = _attribute_query(frozenset(wanted_attributes))
+        arr.extend(value for _, value in query.iter_matches(mapping) if not isinstance(value, (dict, list)))
+
+    def query_json(self, patterns, data, ignore_case=False):
+        '''
+        {name: [values]} of path patterns ("$.customers[*].email", "$..email", see PathQuery) over a
+        document, or over every document of an iterator in one pass
+        '''
+        query = PathQuery(patterns, ignore_case)
+        return query.extract_all(data) if isinstance(data, Iterator) else query.extract(data)
 
     def normalize_user(self, user):
-        return {
-            "name": user.get("name") or user.get("fullName"),
-            "email": user.get("email") or user.get("contact")
-        }
+        return _USER_PLAN.resolve(user)
+
+    def normalize_users(self, users):
+        return _USER_PLAN.resolve_many(users)
 
     def normalize(self, actual_names: list, alternate_names: dict, obj):
-        normalized = {}
-        for name in actual_names:
-            value = obj.get(name)
-            if value is None and name in alternate_names:
-                for alternate in alternate_names[name]:
-                    value = obj.get(alternate)
-                    if value is None:
-                        break
-            normalized[name] = value
-        return normalized
+        # the first of the name and its alternates that is not None
+        return self.alias_plan(actual_names, alternate_names).resolve(obj)
+
+    def normalize_many(self, actual_names: list, alternate_names: dict, records):
+        '''normalize a whole batch of records, or a DataFrame (column-wise), with one plan'''
+        plan = self.alias_plan(actual_names, alternate_names)
+        return plan.resolve_frame(records) if hasattr(records, 'columns') else plan.resolve_many(records)
+
+    def alias_plan(self, actual_names, alternate_names):
+        # plans (and the resolvers they compiled) are kept per set of names. per-record calls
+        # usually repeat the last names, which two C-level comparisons confirm
+        last = self._last_alias_plan
+        if last is not None and last[0] == actual_names and last[1] == alternate_names:
+            return last[2]
+        key = (tuple(actual_names), tuple((name, tuple(alternates)) for name, alternates in alternate_names.items()))
+        plan = self.alias_plans.get(key)
+        if plan is None:
+            plan = self.alias_plans[key] = AliasPlan.from_names(actual_names, alternate_names)
+        self._last_alias_plan = (list(actual_names), {name: list(alternates) for name, alternates in alternate_names.items()}, plan)
+        return plan
 
     def handle_types(correct_types, obj):
         for key, val in obj.items():
@@ -170,16 +887,35 @@ class Jason:
         return obj
 
     def clean_email(self, email):
+        return self.cache.lookup('email', email, self._clean_email)
+
+    def clean_emails(self, emails):
+        return self.cache.lookup_many('email', emails, self._clean_email)
+
+    def parse_name(self, name):
+        '''Parse different name formats and returns a standardized dictionary.'''
+        # copy so callers can't change the cached result
+        return dict(self.cache.lookup('name', name, self._parse_name))
+
+    def parse_names(self, names):
+        return [dict(result) for result in self.cache.lookup_many('name', names, self._parse_name)]
+
+    def cache_metrics(self):
+        '''hit / miss counters of the normalization cache'''
+        return {'normalization_cache': self.cache.stats()}
+
+    @staticmethod
+    def _clean_email(email):
         if email is None:
             return None
         cleaned_email = email.strip().lower()
-        cleaned_email = re.sub(r'(\+[^@]*)@', '@', cleaned_email)
-        if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', cleaned_email):
+        cleaned_email = EMAIL_TAG.sub('@', cleaned_email)
+        if not EMAIL_PATTERN.match(cleaned_email):
             return None
         return cleaned_email
 
-    def parse_name(self, name):
-        '''Parse different name formats and returns a standardized dictionary.'''
+    @staticmethod
+    def _parse_name(name):
         result = {
             'first_name': None,
             'last_name': None,
@@ -191,9 +927,6 @@ class Jason:
             return result
         
         name = ' '.join(name.strip().split())
-        titles = ['mr', 'mrs', 'miss', 'dr', 'prof', 'rev', 'hon']
-        suffixes = ['jr', 'sr', 'i', 'ii','iii', 'iv', 'v', 'phd', 'md', 'esq']
-        
         if ',' in name:
             # Last name first format: "Smith, John"
             parts = [p.strip() for p in name.split(',', 1)]
@@ -205,7 +938,7 @@ class Jason:
             if ',' in remaining:
                 name_part, suffix_part = [p.strip() for p in remaining.split(',', 1)]
                 remaining = name_part
-                if suffix_part.lower().replace('.', '') in suffixes:
+                if suffix_part.lower().replace('.', '') in SUFFIXES:
                     result['suffix'] = suffix_part
             
             name_parts = remaining.split()
@@ -217,18 +950,18 @@ class Jason:
             # Standard format: "John Smith"
             parts = name.split()
             
-            if parts and parts[0].lower().replace('.', '') in titles:
+            if parts and parts[0].lower().replace('.', '') in TITLES:
                 result['title'] = parts[0]
                 parts = parts[1:]
             
-            if parts and parts[-1].lower().replace('.', '') in suffixes:
+            if parts and parts[-1].lower().replace('.', '') in SUFFIXES:
                 result['suffix'] = parts[-1]
                 parts = parts[:-1]
             elif len(parts) >= 2 and ',' in parts[-1]:
                 last_part = parts[-1]
                 if ',' in last_part:
                     name_part, suffix = last_part.split(',', 1)
-                    if suffix.strip().lower().replace('.', '') in suffixes:
+                    if suffix.strip().lower().replace('.', '') in SUFFIXES:
                         result['suffix'] = suffix.strip()
                         parts[-1] = name_part
             
@@ -244,28 +977,32 @@ class Jason:
                 
         return result
 
-    def flatten_json(self, data, parent_key=''):
+    def flatten_json(self, data, parent_key='', sep='_', lists=True):
         """Flatten a nested JSON object into a single level dictionary."""
-        flattened = {}
-        
-        if isinstance(data, dict):
-            for key, value in data.items():
-                new_key = f"{parent_key}_{key}" if parent_key else key
-                if isinstance(value, (dict, list)):
-                    flattened.update(self.flatten_json(value, new_key))
-                else:
-                    flattened[new_key] = value
-        elif isinstance(data, list):
-            for i, item in enumerate(data):
-                new_key = f"{parent_key}_{i}" if parent_key else str(i)
-                if isinstance(item, (dict, list)):
-                    flattened.update(self.flatten_json(item, new_key))
-                else:
-                    flattened[new_key] = item
-        else:
-            flattened[parent_key] = data
-            
-        return flattened
+        return flatten_json(data, parent_key, sep, lists)
+
+    def unflatten_json(self, data, sep='_', lists=True):
+        """Rebuild the nested JSON object of a flattened dictionary."""
+        return unflatten_json(data, sep, lists)
+
+    def flatten_columns(self, records, sep='_', lists=True):
+        """Flatten a list of JSON records into {column: values}."""
+        return flatten_columns(records, sep, lists)
+
+    def diff_json(self, json1, json2, identity_keys=None, ignore_order=True, max_diffs=None):
+        '''
+        structural diff as a stream of json-patch style operations. list elements are matched
+        by identity_keys (e.g. ['id']) or content instead of position, see json_patch()
+        '''
+        return json_patch(json1, json2, identity_keys, ignore_order, max_diffs)
+
+    def iter_compare_json(self, json1, json2, identity_keys=None, ignore_order=True, max_diffs=None):
+        '''
+        compare_json without building the whole result: (json pointer, kind, json1 value, json2 value)
+        tuples yielded as they are found. json1 / json2 can be iterators over streamed top-level
+        arrays, see iter_json_diffs()
+        '''
+        return iter_json_diffs(json1, json2, identity_keys, ignore_order, max_diffs)
 
     def compare_json(self, json1, json2, ignore_order=True):
         """Compare two JSON objects and return a report of differences."""
@@ -290,13 +1027,18 @@ class Jason:
         
         elif isinstance(json1, list):
             if ignore_order:
+                # same elements in any order, counted by content (works for lists of dicts too)
                 try:
-                    sorted1 = sorted(json1)
-                    sorted2 = sorted(json2)
-                    if sorted1 == sorted2:
-                        return {}
-                except:
-                    pass
+                    key = partial(content_key, normalize_numbers=True)
+                    same = Counter(map(key, json1)) == Counter(map(key, json2))
+                except TypeError:
+                    # keys of mixed types can't be sorted into the text, compare the sorted elements
+                    try:
+                        same = sorted(json1) == sorted(json2)
+                    except TypeError:
+                        same = False
+                if same:
+                    return {}
             
             if len(json1) != len(json2):
                 return {'length_mismatch': {'json1_length': len(json1), 'json2_length': len(json2)}}
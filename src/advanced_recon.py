@@ -2,15 +2,29 @@ import json
 import logging
 import os
 import shutil
-import subprocess
+import tempfile
+import time
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Union, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Union, Any
 
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-from jsonschema import Draft7Validator
-from pandas import DataFrame, json_normalize
+from pandas import DataFrame
+
+from cache import FrameCache
+from casting import CAST_RULES, apply_cast_plan, cast_plan, schema_dtypes
+from canonical import canonical_path, load_canonical, write_canonical
+from fuzzy import DEFAULT_BLOCKS, match_unmatched
+from incremental import load_state, reconcile_incremental, save_state
+from instrumentation import Instrumentation, instrumented
+from jsonl import write_differences_jsonl
+from mismatch import compare_frames, row_fingerprints, summarize, to_differences
+from parallel import reconcile_parallel
+from partition import reconcile_partitioned
+from pipeline import InputPipeline, prepare_file
+from streaming import (flatten_document, iter_normalized_chunks, load_flattened, stream_schema_errors,
+                       write_canonical_stream)
+from validation import document_errors, item_schema, schema_errors
 
 class Reconciliation:
     def __init__(self, 
@@ -29,6 +43,8 @@ class Reconciliation:
         self.canon_files = []
         self.schema = schema
         self.dataframes = []
+        self._documents = {}  # parsed canonical documents waiting to be flattened
+        self._fingerprints = []  # (dataframe, signature, row fingerprints) from clean_and_cast()
         
         # Configuration management - use defaults if not provided
         self.config = {
@@ -38,9 +54,40 @@ class Reconciliation:
             'log_file': 'reconciliation.log',
             'notification_threshold': 10,  # Number of differences that trigger notification
             'notification_email': None,
-            'incremental': False,
+            'incremental': False,  # Only re-compare keys whose rows changed since the last run
             'last_run_file': '.last_run.json',
-            'chunk_size': 10000  # For large file processing
+            'state_file': '.last_run_state.pkl',  # Row fingerprints and result kept for incremental runs
+            'chunk_size': 10000,  # For large file processing
+            'stream_threshold_mb': 50,  # Files above this size are streamed
+            'parse_workers': 1,  # Processes parsing an input in byte ranges of whole records (lines for JSON Lines)
+            'out_of_core': False,  # Spill both sides to disk partitions instead of loading them
+            'partitions': 64,
+            'spill_dir': None,  # Defaults to the system temp directory
+            'workers': 1,  # Worker processes for reconcile; 1 keeps everything in-process
+            'write_canonical': False,  # Also write sorted-key *_canon.json copies of the inputs
+            'validation_max_errors': None,  # Stop validating a file after this many errors
+            'validation_sample_every': None,  # Only validate every k-th record (trusted feeds)
+            'validation_sample_fraction': None,  # ...or a random fraction of the records
+            'validation_workers': 1,  # Processes validating record chunks of in-memory documents
+            'cast_rules': CAST_RULES,  # Name-based casts for columns the schema does not type
+            'dtypes': {},  # Explicit {column: dtype} overrides of the cast plan
+            'category_max_unique': 1000,  # Strings with at most this many distinct values become categorical
+            'downcast_floats': False,  # Store floats as float32 when numeric_tolerance allows it
+            'fingerprint_prefilter': True,  # Skip the per-column comparison for rows with equal fingerprints
+            'cache_dir': None,  # Directory of the flattened-frame cache; None disables it
+            'cache_max_mb': 1024,  # Least recently used cache entries are evicted above this size
+            'fuzzy_matching': False,  # Pair up records left without an exact key match
+            'fuzzy_blocks': DEFAULT_BLOCKS,  # Blocking keys ((column, method) or lists of them) pairs must share
+            'fuzzy_columns': None,  # Columns scored for a candidate pair; None scores all shared columns
+            'fuzzy_threshold': 0.85,  # Minimum weighted column similarity of a probable match
+            'fuzzy_max_block_pairs': 10000,  # Blocking keys producing more pairs than this are skipped
+            'instrumentation': True,  # Time every stage and collect counters (see Instrumentation)
+            'profile': False,  # Run every stage under cProfile (slow)
+            'trace_memory': False,  # Record per-stage peaks of Python allocations with tracemalloc (slow)
+            'profile_dir': None,  # Dump the cProfile stats of every stage to this directory
+            'metrics_jsonl': None,  # Append the collected metrics as JSON lines to this file
+            'metrics_prometheus': None,  # Write the collected metrics in Prometheus text format to this file
+            'report_jsonl': False  # Also write every difference as a line of differences.jsonl in the report
         }
         if config:
             self.config.update(config)
@@ -61,92 +108,180 @@ class Reconciliation:
             'mismatches': {},
             'run_time': 0
         }
+        self.instruments = Instrumentation(
+            enabled=self.config['instrumentation'],
+            profile=self.config['profile'],
+            trace_memory=self.config['trace_memory'],
+            profile_dir=self.config['profile_dir'],
+            labels={'pipeline': 'reconciliation'}
+        )
 
-    def jq_canonicalize(self) -> None:
-        """Canonicalize JSON files using jq in a secure way."""
+    @instrumented('canonicalize')
+    def canonicalize(self) -> None:
+        """
+        Canonicalize the input files in-process.
+        
+        Each file is parsed exactly once with its keys sorted while the objects are built; the
+        parsed document is kept for `validate_with_schema()` and `load_and_flatten()` so neither
+        has to read the file again (files above `stream_threshold_mb` are streamed instead and
+        nothing is kept). A `_canon.json` copy (sorted keys, no extra whitespace) is
+        only written when `write_canonical` is set; otherwise the source path stands in for it
+        in `self.canon_files`.
+        """
         self.logger.info("Starting canonicalization")
         
         for file in self.files:
-            try:
-                out = file.replace(".json", "_canon.json")
-                # Security improvement: avoid shell=True
-                subprocess.run(
-                    ["jq", "--sort-keys", ".", file], 
-                    stdout=open(out, 'w'),
-                    check=True
-                )
-                self.canon_files.append(out)
-                self.logger.info(f"Canonicalized {file} to {out}")
-            except subprocess.CalledProcessError as e:
-                self.logger.error(f"Error canonicalizing {file}: {str(e)}")
-                raise RuntimeError(f"Failed to canonicalize {file}") from e
-            except Exception as e:
-                self.logger.error(f"Unexpected error with {file}: {str(e)}")
-                raise
+            self.canon_files.append(self._canonicalize_file(file))
+
+    def jq_canonicalize(self) -> None:
+        """Kept for existing callers; canonicalization no longer shells out to jq."""
+        self.canonicalize()
+
+    def _canonicalize_file(self, file: str) -> str:
+        """
+        Parse and canonicalize a single file and return the path standing for its canonical form.
+
+        Files above `stream_threshold_mb` are not parsed whole (unless `parse_workers` > 1):
+        their canonical copy (if requested) is written record by record and they are streamed
+        again when validated and loaded, so memory stays bounded by the chunk size.
+        """
+        try:
+            if self._is_large(file):
+                out = file
+                if self.config['write_canonical']:
+                    out = canonical_path(file)
+                    write_canonical_stream(file, out)
+                self.logger.info(f"Large file detected ({file}). Canonicalized record by record"
+                                 + (f" to {out}" if out != file else ", nothing kept in memory"))
+                return out
+
+            data = load_canonical(file, workers=self.config['parse_workers'])
+            out = file
+            if self.config['write_canonical']:
+                out = canonical_path(file)
+                write_canonical(data, out)
+            self._documents[out] = data
+            self.logger.info(f"Canonicalized {file}" + (f" to {out}" if out != file else ""))
+            return out
+        except json.JSONDecodeError as e:
+            self.logger.error(f"Invalid JSON in {file}: {str(e)}")
+            raise RuntimeError(f"Failed to canonicalize {file}") from e
+        except Exception as e:
+            self.logger.error(f"Unexpected error with {file}: {str(e)}")
+            raise
 
+    @instrumented('validate')
     def validate_with_schema(self) -> None:
         """Validate canonicalized files against schema with better error handling."""
         self.logger.info("Starting schema validation")
         
         if not self.canon_files:
-            self.logger.warning("No canonicalized files found. Run jq_canonicalize first.")
+            self.logger.warning("No canonicalized files found. Run canonicalize first.")
             return
             
         for canon in self.canon_files:
-            try:
-                with open(canon, 'r') as f:
-                    data = json.load(f)
-                
-                errors = list(Draft7Validator(self.schema).iter_errors(data))
-                if errors: 
-                    self.logger.error(f"Schema validation failed for {canon}: {len(errors)} errors")
-                    for e in errors[:5]:
-                        self.logger.error(f"  {e.message}")
-                    raise ValueError(f"Schema validation failed for {canon}")
-                else:
-                    self.logger.info(f"Schema validation passed for {canon}")
-            except json.JSONDecodeError as e:
-                self.logger.error(f"Invalid JSON in {canon}: {str(e)}")
-                raise
-            except Exception as e:
-                self.logger.error(f"Error validating {canon}: {str(e)}")
-                raise
+            self._validate_file(canon)
+
+    def _validate_file(self, canon: str) -> str:
+        """Validate a single canonical file, reusing its parsed document when we have it."""
+        try:
+            if canon in self._documents:
+                n_errors, messages = document_errors(self._documents[canon], self.schema,
+                                                     **self._validation_options())
+            elif self._is_large(canon):
+                n_errors, messages = stream_schema_errors(canon, self.schema, self.config['chunk_size'],
+                                                          **self._validation_options())
+            else:
+                n_errors, messages = schema_errors(canon, self.schema, **self._validation_options())
+            self._log_schema_result(canon, n_errors, messages)
+            return canon
+        except json.JSONDecodeError as e:
+            self.logger.error(f"Invalid JSON in {canon}: {str(e)}")
+            raise
+        except Exception as e:
+            self.logger.error(f"Error validating {canon}: {str(e)}")
+            raise
 
+    def _is_large(self, path: str) -> bool:
+        """
+        Whether `path` must be streamed rather than parsed whole: it is above
+        `stream_threshold_mb` and `parse_workers` <= 1 (with more workers it is parsed in byte
+        ranges instead, as `load_flattened` does).
+        """
+        if self.config['parse_workers'] > 1:
+            return False
+        return os.path.getsize(path) > self.config['stream_threshold_mb'] * 1024 * 1024
+
+    def _validation_options(self) -> Dict:
+        """Early-exit, sampling and parallelism options for `document_errors`/`prepare_file`."""
+        return {
+            'max_errors': self.config['validation_max_errors'],
+            'sample_every': self.config['validation_sample_every'],
+            'sample_fraction': self.config['validation_sample_fraction'],
+            'workers': self.config['validation_workers']
+        }
+
+    def _log_schema_result(self, canon: str, n_errors: int, messages: List[str]) -> None:
+        if n_errors: 
+            max_errors = self.config['validation_max_errors']
+            stopped = " (stopped early)" if max_errors is not None and n_errors >= max_errors else ""
+            self.logger.error(f"Schema validation failed for {canon}: {n_errors} errors{stopped}")
+            for message in messages:
+                self.logger.error(f"  {message}")
+            raise ValueError(f"Schema validation failed for {canon}")
+        else:
+            sampled = self.config['validation_sample_every'] or self.config['validation_sample_fraction'] is not None
+            self.logger.info(f"Schema validation passed for {canon}{' (sampled)' if sampled else ''}")
+
+    def _flatten_kwargs(self) -> Dict:
+        """`json_normalize` arguments for the customer/orders layout."""
+        # More flexible flattening with dynamic meta fields
+        return {
+            'record_path': "orders",
+            'meta': self.config.get('meta_fields', [["customer", "id"], ["customer", "name"]]),
+            'record_prefix': "order_",
+            'meta_prefix': "cust_"
+        }
+
+    def iter_flattened_chunks(self, path: str) -> Iterator[DataFrame]:
+        """
+        Stream `path` and yield flattened DataFrames of at most `chunk_size` customers.
+        
+        Only one chunk of parsed records is held in memory at a time.
+        """
+        return iter_normalized_chunks(path, self.config['chunk_size'], schema=self.schema,
+                                      **self._flatten_kwargs())
+
+    @instrumented('load_and_flatten')
     def load_and_flatten(self, path: str) -> DataFrame:
         """
-        Load and flatten JSON with better error handling and incremental processing.
+        Load and flatten JSON with better error handling.
+        
+        A document already parsed by `canonicalize()` is flattened straight from memory (and
+        released); otherwise the file is read, streaming it in `chunk_size` batches when it is
+        larger than `stream_threshold_mb`. With `parse_workers` > 1 the file is memory-mapped
+        and parsed in byte ranges of whole records over that many processes; JSON Lines files
+        are always read line by line, split over `parse_workers` processes.
         """
         self.logger.info(f"Loading and flattening {path}")
         
         try:
-            # Performance improvement: Handle large files with chunking if needed
-            if os.path.getsize(path) > 50 * 1024 * 1024:  # If file > 50MB
-                self.logger.info(f"Large file detected ({path}). Using chunked processing.")
-                # This would need a custom implementation for very large files
-                # For simplicity, we'll still load it all at once but log the concern
-            
-            # Incremental processing check
-            if self.config['incremental'] and os.path.exists(self.config['last_run_file']):
-                with open(self.config['last_run_file'], 'r') as f:
-                    last_run = json.load(f)
-                    last_timestamp = last_run.get('timestamp')
-                    self.logger.info(f"Incremental processing from {last_timestamp}")
-                    # Logic for incremental processing would go here
-            
-            with open(path, 'r') as f:
-                data = json.load(f)
-            
-            # More flexible flattening with dynamic meta fields
-            meta_fields = self.config.get('meta_fields', [["customer", "id"], ["customer", "name"]])
-            
-            df = json_normalize(
-                data, 
-                record_path="orders", 
-                meta=meta_fields,
-                record_prefix="order_", 
-                meta_prefix="cust_"
-            )
+            if path in self._documents:
+                df = flatten_document(self._documents.pop(path), schema=self.schema, **self._flatten_kwargs())
+            else:
+                # Performance improvement: stream large files instead of json.load-ing them whole
+                if self._is_large(path):
+                    self.logger.info(f"Large file detected ({path}). Streaming in chunks of {self.config['chunk_size']}.")
+                df = load_flattened(
+                    path,
+                    self.config['chunk_size'],
+                    self.config['stream_threshold_mb'],
+                    schema=self.schema,
+                    workers=self.config['parse_workers'],
+                    **self._flatten_kwargs()
+                )
             
+            self.instruments.count('rows_read', len(df))
             self.dataframes.append(df)
             return df
             
@@ -154,6 +289,96 @@ class Reconciliation:
             self.logger.error(f"Error loading {path}: {str(e)}")
             raise
 
+    def _frame_cache(self) -> Optional[FrameCache]:
+        """The on-disk cache of flattened, typed frames, or None when `cache_dir` is not set."""
+        if not self.config['cache_dir']:
+            return None
+        return FrameCache(self.config['cache_dir'], int(self.config['cache_max_mb'] * 1024 * 1024))
+
+    def _cache_key(self, cache: FrameCache, file: str) -> str:
+        """Key a file's frame on its content plus everything that shapes the typed frame."""
+        return cache.key(
+            file,
+            schema=self.schema,
+            flatten=self._flatten_kwargs(),
+            validation={k: v for k, v in self._validation_options().items() if k != 'workers'},
+            cast_rules=self._cast_settings()
+        )
+
+    @instrumented('prepare_inputs')
+    def prepare_inputs(self) -> List[DataFrame]:
+        """
+        Canonicalize, validate and flatten all input files concurrently.
+        
+        Every file is handled by its own thread, which hands the whole parse ->
+        canonicalize -> validate -> flatten chain for that file to a worker process, so each
+        file is parsed once and only the flattened frame travels back. The frames are stored
+        in `self.dataframes` in input order, ready for `clean_and_cast()`/`reconcile()`, and
+        per-file stage timings go to `self.metrics['stage_timings']`.
+        
+        With `cache_dir` set, the frames are also cast here and stored in a content-addressed
+        cache, so an input whose content, schema, meta fields and cast rules are unchanged is
+        loaded from disk on the next run without being parsed again.
+        """
+        start_time = datetime.now()
+        self.logger.info(f"Preparing {len(self.files)} inputs concurrently")
+        
+        pipeline = InputPipeline()
+        cache = self._frame_cache()
+        
+        def prepare(file: str) -> Tuple[str, Dict]:
+            out = canonical_path(file) if self.config['write_canonical'] else file
+            
+            if cache is not None:
+                started = time.perf_counter()
+                key = self._cache_key(cache, file)
+                df = cache.get(key)
+                # a cache hit never writes the canonical copy, so only use it if that exists
+                if df is not None and (out == file or os.path.exists(out)):
+                    self.logger.info(f"Loaded {file} from cache")
+                    df.attrs['cast'] = True
+                    return out, {'dataframe': df, 'timings': {'cache_load': time.perf_counter() - started}}
+            
+            result = pipeline.in_process(
+                prepare_file,
+                file,
+                self.schema,
+                self.config['chunk_size'],
+                self.config['stream_threshold_mb'],
+                canonical_out=out if out != file else None,
+                validation=self._validation_options(),
+                workers=self.config['parse_workers'],
+                **self._flatten_kwargs()
+            )
+            self._log_schema_result(out, result['n_errors'], result['messages'])
+            
+            if cache is not None:
+                started = time.perf_counter()
+                df = self._clean_frame(result['dataframe'])
+                result['timings']['clean_and_cast'] = time.perf_counter() - started
+                cache.put(key, df)
+                df.attrs['cast'] = True
+                result['dataframe'] = df
+            return out, result
+        
+        outputs, _ = pipeline.run(self.files, [('prepare', prepare)])
+        
+        self.metrics['stage_timings'] = {}
+        for file, (canon, result) in zip(self.files, outputs):
+            self.canon_files.append(canon)
+            self.dataframes.append(result['dataframe'])
+            self.metrics['stage_timings'][file] = result['timings']
+            self.instruments.count('rows_read', len(result['dataframe']))
+        if cache is not None:
+            self.metrics['cache'] = cache.stats()
+            self.instruments.count('frame_cache_hits', cache.hits)
+            self.instruments.count('frame_cache_misses', cache.misses)
+        
+        self.metrics['prepare_time'] = (datetime.now() - start_time).total_seconds()
+        self.logger.info(f"Prepared inputs in {self.metrics['prepare_time']:.3f}s")
+        return self.dataframes
+
+    @instrumented('clean_and_cast')
     def clean_and_cast(self) -> None:
         """Clean dataframes and cast types with error handling."""
         self.logger.info("Cleaning and casting data types")
@@ -164,36 +389,76 @@ class Reconciliation:
             
         try:
             for i, df in enumerate(self.dataframes):
-                # Timestamps
-                for col in [c for c in df.columns if 'ts' in c or 'time' in c or 'date' in c]:
-                    df[col] = pd.to_datetime(df[col])
-                
-                # Numeric values - with proper error handling
-                for col in [c for c in df.columns if 'amt' in c or 'total' in c or 'price' in c]:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-                    # Flag any values that couldn't be converted
-                    if df[col].isna().any():
-                        self.logger.warning(f"Found {df[col].isna().sum()} non-numeric values in {col}")
-                
-                # IDs to integers
-                for col in [c for c in df.columns if 'id' in c.lower() and 'guid' not in c.lower()]:
-                    df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')  # nullable integer
-                
-                # Strings
-                for col in [c for c in df.columns if 'name' in c or 'desc' in c or 'text' in c]:
-                    df[col] = df[col].astype("string")
-                
-                self.dataframes[i] = df
-                self.logger.info(f"Cleaned dataframe {i}: {len(df)} rows, {len(df.columns)} columns")
+                if not df.attrs.get('cast'):  # frames from the cache are already cast
+                    df = self._clean_frame(df)
+                    self.dataframes[i] = df
+                    self.logger.info(f"Cleaned dataframe {i}: {len(df)} rows, {len(df.columns)} columns")
+            
+            # Tolerance-bucketed row hashes so reconcile() can skip rows that obviously match
+            self._fingerprints = []
+            if self.config['fingerprint_prefilter']:
+                for df in self.dataframes:
+                    signature, fingerprints = row_fingerprints(
+                        df, self.config['key_cols'],
+                        self.config['numeric_tolerance'],
+                        self.config['time_tolerance_seconds']
+                    )
+                    self._fingerprints.append((df, signature, fingerprints))
         
         except Exception as e:
             self.logger.error(f"Error in clean_and_cast: {str(e)}")
             raise
 
+    def _cast_settings(self) -> Dict:
+        """Everything that decides the dtypes `clean_and_cast()` produces."""
+        return {
+            'rules': self.config['cast_rules'],
+            'dtypes': self.config['dtypes'],
+            'category_max_unique': self.config['category_max_unique'],
+            'downcast_floats': self.config['downcast_floats'],
+            'numeric_tolerance': self.config['numeric_tolerance']
+        }
+
+    def cast_plan(self, columns: List[str]) -> Dict[str, str]:
+        """
+        Target dtype of each column: `dtypes` overrides first, then the leaf types of the JSON
+        schema (integer -> Int64, number -> float64, date-time strings -> UTC timestamps,
+        strings -> string/categorical), then the name-based `cast_rules`.
+        """
+        targets = schema_dtypes(item_schema(self.schema), **self._flatten_kwargs())
+        return cast_plan(columns, targets, self.config['cast_rules'], self.config['dtypes'])
+
+    def _clean_frame(self, df: DataFrame, categories: bool = True) -> DataFrame:
+        """
+        Cast the columns of a single (possibly partial) dataframe following `cast_plan()`.
+        
+        Every column is converted once, straight to its target. Pass `categories=False` for
+        chunks of a larger frame, whose distinct values are not known chunk by chunk.
+        """
+        df, missing = apply_cast_plan(
+            df,
+            self.cast_plan(list(df.columns)),
+            category_max_unique=self.config['category_max_unique'] if categories else 0,
+            float32_tolerance=self.config['numeric_tolerance'] if self.config['downcast_floats'] else None
+        )
+        # Flag any values that couldn't be converted
+        for col, n_missing in missing.items():
+            self.logger.warning(f"Found {n_missing} non-numeric values in {col}")
+            self.instruments.count('rows_cast_failed', n_missing)
+        return df
+
+    @instrumented('reconcile')
     def reconcile(self) -> Dict:
         """
         Reconcile dataframes with enhanced comparison and metrics.
         """
+        if self.config['out_of_core']:
+            if self.config['incremental']:
+                self.logger.warning("Incremental mode is not supported out of core; running a full comparison")
+            if self.config['fuzzy_matching']:
+                self.logger.warning("Fuzzy matching is not supported out of core; skipping it")
+            return self.reconcile_out_of_core(self.canon_files or self.files)
+        
         start_time = datetime.now()
         self.logger.info("Starting reconciliation")
         
@@ -210,75 +475,157 @@ class Reconciliation:
                 self.logger.error(f"Key column {col} not found in both dataframes")
                 raise ValueError(f"Key column {col} missing")
         
-        # Set index for comparison
-        df1 = df1.set_index(key_cols)
-        df2 = df2.set_index(key_cols)
-        
         # Track metrics
         self.metrics['total_records'] = len(df1) + len(df2)
         
-        # Find keys in one dataframe but not the other
-        only_in_df1 = df1.index.difference(df2.index)
-        only_in_df2 = df2.index.difference(df1.index)
-        
-        # Compare common records with tolerance
-        common_keys = df1.index.intersection(df2.index)
-        common_cols = set(df1.columns).intersection(set(df2.columns))
+        # Align both frames once and compare every common column as a whole
+        if self.config['incremental']:
+            result = self._reconcile_incremental(df1, df2)
+        elif self.config['workers'] > 1:
+            self.logger.info(f"Comparing key shards on {self.config['workers']} worker processes")
+            result = reconcile_parallel(
+                df1, df2, key_cols,
+                workers=self.config['workers'],
+                numeric_tolerance=self.config['numeric_tolerance'],
+                time_tolerance_seconds=self.config['time_tolerance_seconds']
+            )
+        else:
+            result = compare_frames(
+                df1, df2, key_cols,
+                numeric_tolerance=self.config['numeric_tolerance'],
+                time_tolerance_seconds=self.config['time_tolerance_seconds'],
+                fingerprints=self._prefilter_fingerprints(df1, df2)
+            )
+            if 'prefiltered_keys' in result:
+                self.metrics['prefiltered_keys'] = result['prefiltered_keys']
+                self.instruments.count('prefiltered_keys', result['prefiltered_keys'])
+                self.logger.info(f"Fingerprint pre-filter skipped {result['prefiltered_keys']} "
+                                 f"of {result['common_keys']} common keys")
+        if self.config['fuzzy_matching']:
+            result['probable_matches'] = self._probable_matches(df1, df2, result)
+        return self._finish_reconcile(result, start_time)
+
+    def _probable_matches(self, df1: DataFrame, df2: DataFrame, result: Dict) -> DataFrame:
+        """
+        Fuzzy second pass over the records found in only one file: candidate pairs sharing
+        a blocking key are scored and the best ones above `fuzzy_threshold` reported.
+        """
+        matches = match_unmatched(
+            df1, df2, self.config['key_cols'], result,
+            blocks=self.config['fuzzy_blocks'],
+            columns=self.config['fuzzy_columns'],
+            threshold=self.config['fuzzy_threshold'],
+            max_block_pairs=self.config['fuzzy_max_block_pairs']
+        )
+        self.metrics['probable_matches'] = len(matches)
+        self.logger.info(f"Probable matches among unmatched records: {len(matches)}")
+        return matches
+
+    def _prefilter_fingerprints(self, df1: DataFrame, df2: DataFrame) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        The row fingerprints computed by `clean_and_cast()`, if they belong to these exact
+        frames and were hashed over the same columns with the current tolerances.
+        """
+        if len(self._fingerprints) != 2:
+            return None
+        (frame1, signature1, fp1), (frame2, signature2, fp2) = self._fingerprints
+        current = row_fingerprints(df1.iloc[:0], self.config['key_cols'],
+                                   self.config['numeric_tolerance'],
+                                   self.config['time_tolerance_seconds'])[0]
+        if frame1 is not df1 or frame2 is not df2 or not signature1 == signature2 == current:
+            return None
+        return fp1, fp2
+
+    def _reconcile_incremental(self, df1: DataFrame, df2: DataFrame) -> Dict:
+        """
+        Compare only the keys whose rows changed since the last run, reusing the rest of
+        the previous result kept in `state_file`, and record the delta against it.
+        """
+        state = load_state(self.config['state_file'])
+        if state is not None and os.path.exists(self.config['last_run_file']):
+            with open(self.config['last_run_file'], 'r') as f:
+                last_timestamp = json.load(f).get('timestamp')
+            self.logger.info(f"Incremental processing from {last_timestamp}")
+        
+        result, state = reconcile_incremental(
+            df1, df2, self.config['key_cols'], state,
+            numeric_tolerance=self.config['numeric_tolerance'],
+            time_tolerance_seconds=self.config['time_tolerance_seconds']
+        )
+        save_state(self.config['state_file'], state)
         
-        # Track differences by column
-        differences = {
-            'only_in_df1': list(only_in_df1),
-            'only_in_df2': list(only_in_df2),
-            'value_mismatches': {}
+        delta = result['delta']
+        self.metrics['incremental'] = {
+            'compared_keys': result['compared_keys'],
+            'new_mismatches': len(delta['mismatches']['added']) if delta else None,
+            'resolved_mismatches': len(delta['mismatches']['resolved']) if delta else None
         }
+        self.logger.info(f"Incremental run re-compared {result['compared_keys']} keys")
+        return result
+
+    def reconcile_out_of_core(self, paths: List[str]) -> Dict:
+        """
+        Reconcile two files that do not fit in memory.
         
-        # Compare values for common keys
-        for col in common_cols:
-            col_diffs = []
-            
-            # Handle different comparison types based on data type
-            if pd.api.types.is_numeric_dtype(df1[col]):
-                # Numeric comparison with tolerance
-                tolerance = self.config['numeric_tolerance']
-                mask = ~((df1.loc[common_keys, col] - df2.loc[common_keys, col]).abs() <= tolerance)
-                col_diffs = [(k, df1.loc[k, col], df2.loc[k, col]) 
-                             for k in common_keys[mask]]
-                
-            elif pd.api.types.is_datetime64_dtype(df1[col]):
-                # Timestamp comparison with tolerance
-                time_tol = pd.Timedelta(seconds=self.config['time_tolerance_seconds'])
-                mask = ~((df1.loc[common_keys, col] - df2.loc[common_keys, col]).abs() <= time_tol)
-                col_diffs = [(k, df1.loc[k, col], df2.loc[k, col]) 
-                             for k in common_keys[mask]]
-                
-            else:
-                # String/other comparison (exact match)
-                mask = df1.loc[common_keys, col] != df2.loc[common_keys, col]
-                col_diffs = [(k, df1.loc[k, col], df2.loc[k, col]) 
-                             for k in common_keys[mask]]
-            
-            if col_diffs:
-                differences['value_mismatches'][col] = col_diffs
-        
-        # Calculate match rate
-        total_comparisons = len(common_keys) * len(common_cols)
-        total_mismatches = sum(len(diffs) for diffs in differences['value_mismatches'].values())
-        match_rate = 1 - (total_mismatches / total_comparisons) if total_comparisons > 0 else 0
-        
-        self.metrics['matching_records'] = len(common_keys) - len(set().union(*[
-            set([k[0] for k in v]) for v in differences['value_mismatches'].values()
-        ])) if differences['value_mismatches'] else len(common_keys)
-        
-        self.metrics['mismatches'] = {
-            'only_in_df1': len(only_in_df1),
-            'only_in_df2': len(only_in_df2),
-            'value_mismatches': total_mismatches
-        }
+        Both files are streamed in `chunk_size` batches, cast chunk by chunk and spilled into
+        `partitions` on-disk hash partitions by `key_cols`; partition pairs are then reconciled
+        one at a time and their differences and metrics merged.
         
-        self.metrics['match_rate'] = match_rate
+        Args:
+            paths: The two JSON files to reconcile
+        """
+        start_time = datetime.now()
+        self.logger.info(f"Starting out-of-core reconciliation with {self.config['partitions']} partitions")
+        
+        if len(paths) != 2:
+            self.logger.error(f"Expected 2 files, found {len(paths)}")
+            raise ValueError("Reconciliation requires exactly 2 files")
+        
+        spill_dir = tempfile.mkdtemp(prefix='recon_spill_', dir=self.config['spill_dir'])
+        try:
+            left, right = [(self._clean_frame(chunk, categories=False)
+                            for chunk in self.iter_flattened_chunks(path))
+                           for path in paths]
+            result = reconcile_partitioned(
+                left, right,
+                self.config['key_cols'],
+                spill_dir,
+                n_partitions=self.config['partitions'],
+                numeric_tolerance=self.config['numeric_tolerance'],
+                time_tolerance_seconds=self.config['time_tolerance_seconds'],
+                workers=self.config['workers']
+            )
+        except Exception as e:
+            self.logger.error(f"Error in out-of-core reconciliation: {str(e)}")
+            raise
+        finally:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+        
+        self.metrics['total_records'] = result['rows_df1'] + result['rows_df2']
+        return self._finish_reconcile(result, start_time)
+
+    def _finish_reconcile(self, result: Dict, start_time: datetime) -> Dict:
+        """Turn a comparison result into `differences`, update metrics, log and notify."""
+        if result['duplicate_keys']:
+            self.logger.warning(f"Ignoring {result['duplicate_keys']} rows with duplicate keys")
+        
+        differences = to_differences(result)
+        if 'delta' in result:
+            differences['delta'] = result['delta']
+        if 'probable_matches' in result:
+            differences['probable_matches'] = result['probable_matches']
+        self.metrics.update(summarize(result))
+        
+        only_in_df1 = differences['only_in_df1']
+        only_in_df2 = differences['only_in_df2']
+        total_mismatches = self.metrics['mismatches']['value_mismatches']
+        match_rate = self.metrics['match_rate']
         
         # Execution time
         self.metrics['run_time'] = (datetime.now() - start_time).total_seconds()
+        self.instruments.count('rows_compared', self.metrics['total_records'])
+        self.instruments.count('value_mismatches', total_mismatches)
+        self.instruments.gauge('match_rate', match_rate)
         
         # Log results
         self.logger.info(f"Reconciliation complete: {match_rate:.2%} match rate")
@@ -299,6 +646,7 @@ class Reconciliation:
             
         return differences
 
+    @instrumented('generate_report')
     def generate_report(self, differences: Dict) -> None:
         """Generate comprehensive reconciliation report with visualizations."""
         self.logger.info("Generating reconciliation report")
@@ -320,31 +668,65 @@ class Reconciliation:
             f.write(f"- Match Rate: {self.metrics['match_rate']:.2%}\n")
             f.write(f"- Records only in first file: {len(differences['only_in_df1'])}\n")
             f.write(f"- Records only in second file: {len(differences['only_in_df2'])}\n")
+            if 'probable_matches' in differences:
+                f.write(f"- Probable matches among them: {len(differences['probable_matches'])}\n")
             
             f.write(f"- Fields with mismatches: {len(differences['value_mismatches'])}\n\n")
-            f.write(f"- Actual fields with mismatches: {differences['value_mismatches']}\n\n")
+            counts = differences['value_mismatches'].counts()
+            f.write(f"- Actual fields with mismatches: {counts}\n\n")
 
-            # Write detailed mismatches
+            # Write detailed mismatches straight from the long-format frame
             f.write(f"Detailed Mismatches:\n")
-            for col, mismatches in differences['value_mismatches'].items():
+            mismatches = differences['mismatches']
+            for col, count in counts.items():
                 f.write(f"\n{col}:\n")
-                for i, (key, val1, val2) in enumerate(mismatches[:10]):  # Limit to first 10
+                head = mismatches[mismatches['column'].to_numpy() == col].head(10)  # Limit to first 10
+                for i, (key, val1, val2) in enumerate(zip(head.index, head['value_A'], head['value_B'])):
                     f.write(f"  {i+1}. Key: {key}, File1: {val1}, File2: {val2}\n")
-                if len(mismatches) > 10:
-                    f.write(f"  ... and {len(mismatches) - 10} more\n")
-        
+                if count > 10:
+                    f.write(f"  ... and {count - 10} more\n")
+
+            # Unmatched records paired up by the fuzzy second pass, best first
+            if differences.get('probable_matches') is not None:
+                matches = differences['probable_matches']
+                f.write(f"\nProbable Matches:\n")
+                for i, (key1, key2, score) in enumerate(zip(matches['key_A'], matches['key_B'], matches['score'])):
+                    if i == 10:
+                        f.write(f"  ... and {len(matches) - 10} more\n")
+                        break
+                    f.write(f"  {i+1}. File1: {key1}, File2: {key2}, Score: {score:.3f}\n")
+        
+        # Every difference as one JSON line, for consumers that stream the result
+        if self.config['report_jsonl']:
+            write_differences_jsonl(differences, f"{report_dir}/differences.jsonl", self.config['key_cols'])
+
         # Generate visualizations
         self._generate_visualizations(report_dir, differences)
         
         self.logger.info(f"Report generated in {report_dir}")
         print(f"Report generated in {report_dir}")
 
+    def export_metrics(self) -> Dict:
+        """
+        Store the instrumentation collected so far in `self.metrics['instrumentation']` and
+        write it to the `metrics_jsonl` / `metrics_prometheus` files when they are set.
+        """
+        snapshot = self.instruments.snapshot()
+        self.metrics['instrumentation'] = snapshot
+        if self.instruments.enabled:
+            if self.config['metrics_jsonl']:
+                self.instruments.export_jsonl(self.config['metrics_jsonl'])
+            if self.config['metrics_prometheus']:
+                self.instruments.export_prometheus(self.config['metrics_prometheus'])
+        return snapshot
+
     def _generate_visualizations(self, report_dir: str, differences: Dict) -> None:
         """Generate visualization charts for the report."""
         # Create bar chart of mismatches by column
         plt.figure(figsize=(10, 6))
-        cols = list(differences['value_mismatches'].keys())
-        counts = [len(differences['value_mismatches'][col]) for col in cols]
+        col_counts = differences['value_mismatches'].counts()
+        cols = list(col_counts.keys())
+        counts = list(col_counts.values())
         
         if cols:  # Only create chart if there are mismatches
             plt.bar(cols, counts)
@@ -514,15 +896,8 @@ def main():
         recon = Reconciliation(files=files, schema=schema, config=config)
         
         # Execute reconciliation workflow
-        print("Canonicalizing files...")
-        recon.jq_canonicalize()
-        
-        print("Validating against schema...")
-        recon.validate_with_schema()
-        
-        print("Loading and flattening data...")
-        for file in recon.canon_files:
-            recon.load_and_flatten(file)
+        print("Canonicalizing, validating and flattening files...")
+        recon.prepare_inputs()
         
         print("Cleaning and casting data types...")
         recon.clean_and_cast()
@@ -532,6 +907,7 @@ def main():
         
         print("Generating report...")
         recon.generate_report(differences)
+        recon.export_metrics()
         
     except Exception as e:
         print(f"Error during reconciliation: {str(e)}")
@@ -545,7 +921,7 @@ def main():
                 
         # Also remove canonicalized files
         for file in recon.canon_files:
-            if os.path.exists(file):
+            if file not in files and os.path.exists(file):
                 os.remove(file)
 
 if __name__ == "__main__":
@@ -1,21 +1,21 @@
 import json
 import os
-import sys
 import logging
-import subprocess
 from datetime import datetime
 import pandas as pd
-from typing import Dict, List, Optional, Tuple, Union, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Union, Any
+from canonical import canonical_path, load_canonical, write_canonical
 from config import predefined_config, predefined_metrics
-from pandas import DataFrame, json_normalize
-
-parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-
-# Append the `pyscripts` directory to sys.path
-pyscripts_dir = os.path.join(parent_dir, 'pyscripts')
-sys.path.append(pyscripts_dir)
-
-from jason import parse_name
+from fuzzy import match_unmatched
+from instrumentation import Instrumentation, instrumented
+from jsonl import write_differences_jsonl
+from mismatch import compare_frames, summarize, to_differences
+from names import parse_name_series
+from parallel import reconcile_parallel
+from pipeline import InputPipeline, prepare_file
+from streaming import flatten_document, iter_normalized_chunks, load_flattened, stream_schema_errors, write_canonical_stream
+from validation import document_errors, schema_errors
+from pandas import DataFrame
 
 
 # for reconciliation for this specific file structure, we must first load the file into dataframes. flatten the structure, normalize fields, canonicalize, validate with schema.
@@ -34,62 +34,163 @@ class BankRecon:
         self.canon_files = []
         self.schema = schema
         self.dataframes = []
+        self._documents = {}  # parsed canonical documents waiting to be flattened
 
-        if not custom_config:
-            self.config = predefined_config
-        else:
+        self.config = dict(predefined_config)
+        if custom_config:
             self.config.update(custom_config)
 
         logging.basicConfig(filename=self.config['log_file'], level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
         self.logger = logging.getLogger('reconciliation')
         self.logger.info(f"Starting reconciliation with files: {', '.join(files)}")
 
-        self.metrics = predefined_metrics
-
-    def jq_canonicalize(self) -> None:
+        self.metrics = dict(predefined_metrics)
+        self.instruments = Instrumentation(
+            enabled=self.config['instrumentation'],
+            profile=self.config['profile'],
+            trace_memory=self.config['trace_memory'],
+            profile_dir=self.config['profile_dir'],
+            labels={'pipeline': 'bank'}
+        )
+
+    @instrumented('canonicalize')
+    def canonicalize(self) -> None:
+        # parse every file once with sorted keys and keep the document for validation/loading.
+        # a *_canon.json copy is only written when write_canonical is set
         self.logger.info("Starting canonicalization")
 
         for file in self.files:
-            try:
-                out = file.replace(".json", "_canon.json")
-                # Security improvement: avoid shell=True
-                subprocess.run(
-                    ["jq", "--sort-keys", ".", file], 
-                    stdout=open(out, 'w'),
-                    check=True
-                )
-                self.canon_files.append(out)
-                self.logger.info(f"Canonicalized {file} to {out}")
-            except subprocess.CalledProcessError as e:
-                self.logger.error(f"Error canonicalizing {file}: {str(e)}")
-                raise RuntimeError(f"Failed to canononicalize {file}") from e
-            except Exception as e:
-                self.logger.error(f"Unexpected error with {file}: {str(e)}")
-                raise
+            self.canon_files.append(self._canonicalize_file(file))
 
-    def validate_with_schema(self) -> None:
-        return
+    def jq_canonicalize(self) -> None:
+        # kept for existing callers, jq is no longer needed
+        self.canonicalize()
+
+    def _canonicalize_file(self, file: str) -> str:
+        try:
+            # large files are never parsed whole: the canonical copy (if any) is written record by
+            # record and validation / loading stream the file again
+            if self._is_large(file):
+                out = file
+                if self.config['write_canonical']:
+                    out = canonical_path(file)
+                    write_canonical_stream(file, out, array_key="customers")
+                self.logger.info(f"Large file detected ({file}). Canonicalized record by record")
+                return out
+
+            data = load_canonical(file, array_key="customers", workers=self.config['parse_workers'])
+            out = file
+            if self.config['write_canonical']:
+                out = canonical_path(file)
+                write_canonical(data, out, array_key="customers")
+            self._documents[out] = data
+            self.logger.info(f"Canonicalized {file}")
+            return out
+        except json.JSONDecodeError as e:
+            self.logger.error(f"Error canonicalizing {file}: {str(e)}")
+            raise RuntimeError(f"Failed to canononicalize {file}") from e
+        except Exception as e:
+            self.logger.error(f"Unexpected error with {file}: {str(e)}")
+            raise
 
+    @instrumented('validate')
+    def validate_with_schema(self) -> None:
+        for canon in self.canon_files:
+            self._validate_file(canon)
+
+    def _validate_file(self, canon: str) -> str:
+        # an empty schema means the feed is trusted, nothing to check
+        if not self.schema:
+            return canon
+        if canon in self._documents:
+            n_errors, messages = document_errors(self._documents[canon], self.schema)
+        elif self._is_large(canon):
+            n_errors, messages = stream_schema_errors(canon, self.schema, self.config['chunk_size'], array_key="customers")
+        else:
+            n_errors, messages = schema_errors(canon, self.schema, array_key="customers")
+        self._log_schema_result(canon, n_errors, messages)
+        return canon
+
+    def _is_large(self, path: str) -> bool:
+        # above stream_threshold_mb a file is streamed instead of parsed whole, unless it is
+        # parsed in byte ranges over parse_workers processes (as load_flattened does)
+        if self.config['parse_workers'] > 1:
+            return False
+        return os.path.getsize(path) > self.config['stream_threshold_mb'] * 1024 * 1024
+
+    def _log_schema_result(self, canon: str, n_errors: int, messages: List[str]) -> None:
+        if n_errors:
+            self.logger.error(f"Schema validation failed for {canon}: {n_errors} errors")
+            for message in messages:
+                self.logger.error(f"  {message}")
+            raise ValueError(f"Schema validation failed for {canon}")
+
+    def iter_flattened_chunks(self, path: str) -> Iterator[DataFrame]:
+        # stream the customers array and flatten chunk_size customers at a time
+        return iter_normalized_chunks(path, self.config['chunk_size'], array_key="customers", schema=self.schema)
+
+    @instrumented('load_and_flatten')
     def load_and_flatten(self, path: str) -> DataFrame:
         print("lf called")
         try:
-            with open(path, 'r') as f:
-                data = json.load(f)
-            
-            # turn into dataframe
-            meta_fields = self.config.get('meta_fields', [["name", "given"], ["contact", "email"], ["bankDetails", "accNumMasked"], ["bankDetails", "rtgNum"]])
-
-            df = json_normalize(
-                data,
-                record_path=["customers"], # which LIST becomes a column? 
-                record_prefix=""
-            )
+            if path in self._documents:
+                # already parsed by canonicalize(), flatten it from memory and let it go
+                df = flatten_document(self._documents.pop(path), array_key="customers", schema=self.schema)
+            else:
+                if self._is_large(path):
+                    self.logger.info(f"Large file detected ({path}). Streaming in chunks of {self.config['chunk_size']}.")
+                # turn the customers list into a dataframe
+                df = load_flattened(
+                    path,
+                    self.config['chunk_size'],
+                    self.config['stream_threshold_mb'],
+                    array_key="customers",
+                    schema=self.schema,
+                    workers=self.config['parse_workers']
+                )
+            self.instruments.count('rows_read', len(df))
             self.dataframes.append(df)
             return df
         except Exception as e:
             self.logger.info(f"error in load_and_flatten: {e}")
         return 
 
+    @instrumented('prepare_inputs')
+    def prepare_inputs(self) -> List[DataFrame]:
+        # canonicalize, validate and flatten both files concurrently: one thread per file hands
+        # the whole parse -> canonicalize -> validate -> flatten chain to a worker process, so
+        # every file is parsed once. stage timings end up in self.metrics
+        start_time = datetime.now()
+        pipeline = InputPipeline()
+
+        def prepare(file: str) -> Tuple[str, Dict]:
+            out = canonical_path(file) if self.config['write_canonical'] else file
+            result = pipeline.in_process(
+                prepare_file,
+                file,
+                self.schema,
+                self.config['chunk_size'],
+                self.config['stream_threshold_mb'],
+                array_key="customers",
+                canonical_out=out if out != file else None,
+                workers=self.config['parse_workers']
+            )
+            self._log_schema_result(out, result['n_errors'], result['messages'])
+            return out, result
+
+        outputs, _ = pipeline.run(self.files, [('prepare', prepare)])
+
+        self.metrics['stage_timings'] = {}
+        for file, (canon, result) in zip(self.files, outputs):
+            self.canon_files.append(canon)
+            self.dataframes.append(result['dataframe'])
+            self.metrics['stage_timings'][file] = result['timings']
+            self.instruments.count('rows_read', len(result['dataframe']))
+
+        self.metrics['prepare_time'] = (datetime.now() - start_time).total_seconds()
+        return self.dataframes
+
+    @instrumented('normalize')
     def normalize_legacy(self, df):
         out = pd.DataFrame({
             "id": df["customerId"].astype(str),
@@ -104,20 +205,15 @@ class BankRecon:
         self.dataframes[1] = out
         return out
     
+    @instrumented('normalize')
     def normalize_core(self, df):
-        # normalize the names first
-        names = df["name.given"]
-        first_names = []
-        last_names = []
-        for i in range(len(names)):
-            result = parse_name(names[i])
-            first_names.append(result['first_name'].strip().lower())
-            last_names.append(result['last_name'].strip().lower())
+        # normalize the names first, parsing each distinct raw name once
+        names = parse_name_series(df["name.given"])
 
         out = pd.DataFrame({
             "id": df["id"].astype(str),
-            "first_name": first_names,
-            "last_name": last_names,
+            "first_name": names["first_name"].str.strip().str.lower(),
+            "last_name": names["last_name"].str.strip().str.lower(),
             "email": df["contact.email"].str.strip().str.lower(),
             # "account_number": [None for _ in df["id"]],
             # "account_number_masked": df["bankDetails.acctNumMasked"].str.strip().str.lower(),
@@ -131,9 +227,11 @@ class BankRecon:
         return self.dataframes
 
 
+    @instrumented('clean_and_cast')
     def clean_and_cast(self) -> None:
         return
 
+    @instrumented('reconcile')
     def reconcile(self) -> Dict:
         start_time = datetime.now()
         print(f"Starting reconciliation")
@@ -151,69 +249,51 @@ class BankRecon:
                 print(f"Key column {col} not found in both dataframes")
                 raise ValueError(f"Key column {col} missing")
 
-        df1 = df1.set_index(key_cols)
-        df2 = df2.set_index(key_cols)
-
         self.metrics['total_records'] = len(df1) + len(df2)
-        only_in_df1 = df1.index.difference(df2.index)
-        only_in_df2 = df2.index.difference(df1.index)
 
-        common_keys = df1.index.intersection(df2.index)
-        common_cols = set(df1.columns).intersection(set(df2.columns))
-
-        differences = {
-            'only_in_df1': list(only_in_df1),
-            'only_in_df2': list(only_in_df2),
-            'value_mismatches': {}
-        }
-
-   # Compare values for common keys
-        for col in common_cols:
-            col_diffs = []
-            
-            # Handle different comparison types based on data type
-            if pd.api.types.is_numeric_dtype(df1[col]):
-                # Numeric comparison with tolerance
-                tolerance = self.config['numeric_tolerance']
-                mask = ~((df1.loc[common_keys, col] - df2.loc[common_keys, col]).abs() <= tolerance)
-                col_diffs = [(k, df1.loc[k, col], df2.loc[k, col]) 
-                             for k in common_keys[mask]]
-                
-            elif pd.api.types.is_datetime64_dtype(df1[col]):
-                # Timestamp comparison with tolerance
-                time_tol = pd.Timedelta(seconds=self.config['time_tolerance_seconds'])
-                mask = ~((df1.loc[common_keys, col] - df2.loc[common_keys, col]).abs() <= time_tol)
-                col_diffs = [(k, df1.loc[k, col], df2.loc[k, col]) 
-                             for k in common_keys[mask]]
-                
-            else:
-                # String/other comparison (exact match)
-                mask = df1.loc[common_keys, col] != df2.loc[common_keys, col]
-                col_diffs = [(k, df1.loc[k, col], df2.loc[k, col]) 
-                             for k in common_keys[mask]]
-            
-            if col_diffs:
-                differences['value_mismatches'][col] = col_diffs
-        
-        # Calculate match rate
-        total_comparisons = len(common_keys) * len(common_cols)
-        total_mismatches = sum(len(diffs) for diffs in differences['value_mismatches'].values())
-        match_rate = 1 - (total_mismatches / total_comparisons) if total_comparisons > 0 else 0
-        
-        self.metrics['matching_records'] = len(common_keys) - len(set().union(*[
-            set([k[0] for k in v]) for v in differences['value_mismatches'].values()
-        ])) if differences['value_mismatches'] else len(common_keys)
-        
-        self.metrics['mismatches'] = {
-            'only_in_df1': len(only_in_df1),
-            'only_in_df2': len(only_in_df2),
-            'value_mismatches': total_mismatches
-        }
-        
-        self.metrics['match_rate'] = match_rate
+        # align both frames once and compare every common column as a whole
+        if self.config['workers'] > 1:
+            result = reconcile_parallel(
+                df1, df2, key_cols,
+                workers=self.config['workers'],
+                numeric_tolerance=self.config['numeric_tolerance'],
+                time_tolerance_seconds=self.config['time_tolerance_seconds']
+            )
+        else:
+            result = compare_frames(
+                df1, df2, key_cols,
+                numeric_tolerance=self.config['numeric_tolerance'],
+                time_tolerance_seconds=self.config['time_tolerance_seconds']
+            )
+        if result['duplicate_keys']:
+            self.logger.warning(f"Ignoring {result['duplicate_keys']} rows with duplicate keys")
+
+        differences = to_differences(result)
+        self.metrics.update(summarize(result))
+
+        # fuzzy second pass over the records that found no exact key match
+        if self.config['fuzzy_matching']:
+            matches = match_unmatched(
+                df1, df2, key_cols, result,
+                blocks=self.config['fuzzy_blocks'],
+                columns=self.config['fuzzy_columns'],
+                threshold=self.config['fuzzy_threshold'],
+                max_block_pairs=self.config['fuzzy_max_block_pairs']
+            )
+            differences['probable_matches'] = matches
+            self.metrics['probable_matches'] = len(matches)
+            self.logger.info(f"Probable matches among unmatched records: {len(matches)}")
+
+        only_in_df1 = differences['only_in_df1']
+        only_in_df2 = differences['only_in_df2']
+        total_mismatches = self.metrics['mismatches']['value_mismatches']
+        match_rate = self.metrics['match_rate']
         
         # Execution time
         self.metrics['run_time'] = (datetime.now() - start_time).total_seconds()
+        self.instruments.count('rows_compared', self.metrics['total_records'])
+        self.instruments.count('value_mismatches', total_mismatches)
+        self.instruments.gauge('match_rate', match_rate)
         
         # Log results
         self.logger.info(f"Reconciliation complete: {match_rate:.2%} match rate")
@@ -235,6 +315,7 @@ class BankRecon:
         print("differences: ", differences)
         return differences
     
+    @instrumented('generate_report')
     def generate_report(self, differences: Dict) -> None:
         """Generate comprehensive reconciliation report with visualizations."""
         self.logger.info("Generating reconciliation report")
@@ -256,25 +337,55 @@ class BankRecon:
             f.write(f"- Match Rate: {self.metrics['match_rate']:.2%}\n")
             f.write(f"- Records only in first file: {len(differences['only_in_df1'])}\n")
             f.write(f"- Records only in second file: {len(differences['only_in_df2'])}\n")
+            if 'probable_matches' in differences:
+                f.write(f"- Probable matches among them: {len(differences['probable_matches'])}\n")
             
             f.write(f"- Fields with mismatches: {len(differences['value_mismatches'])}\n\n")
-            f.write(f"- Actual fields with mismatches: {differences['value_mismatches']}\n\n")
+            counts = differences['value_mismatches'].counts()
+            f.write(f"- Actual fields with mismatches: {counts}\n\n")
 
-            # Write detailed mismatches
+            # Write detailed mismatches straight from the long-format frame
             f.write(f"Detailed Mismatches:\n")
-            for col, mismatches in differences['value_mismatches'].items():
+            mismatches = differences['mismatches']
+            for col, count in counts.items():
                 f.write(f"\n{col}:\n")
-                for i, (key, val1, val2) in enumerate(mismatches[:10]):  # Limit to first 10
+                head = mismatches[mismatches['column'].to_numpy() == col].head(10)  # Limit to first 10
+                for i, (key, val1, val2) in enumerate(zip(head.index, head['value_A'], head['value_B'])):
                     f.write(f"  {i+1}. Key: {key}, File1: {val1}, File2: {val2}\n")
-                if len(mismatches) > 10:
-                    f.write(f"  ... and {len(mismatches) - 10} more\n")
+                if count > 10:
+                    f.write(f"  ... and {count - 10} more\n")
+
+            # Unmatched records paired up by the fuzzy second pass, best first
+            if differences.get('probable_matches') is not None:
+                matches = differences['probable_matches']
+                f.write(f"\nProbable Matches:\n")
+                for i, (key1, key2, score) in enumerate(zip(matches['key_A'], matches['key_B'], matches['score'])):
+                    if i == 10:
+                        f.write(f"  ... and {len(matches) - 10} more\n")
+                        break
+                    f.write(f"  {i+1}. File1: {key1}, File2: {key2}, Score: {score:.3f}\n")
         
+        # every difference as one JSON line, for consumers that stream the result
+        if self.config['report_jsonl']:
+            write_differences_jsonl(differences, f"{report_dir}/differences.jsonl", self.config['key_cols'])
+
         # Generate visualizations
         # self._generate_visualizations(report_dir, differences)
         
         self.logger.info(f"Report generated in {report_dir}")
         print(f"Report generated in {report_dir}")
 
+    def export_metrics(self) -> Dict:
+        # keep the stage timings / counters in self.metrics and write the configured metrics files
+        snapshot = self.instruments.snapshot()
+        self.metrics['instrumentation'] = snapshot
+        if self.instruments.enabled:
+            if self.config['metrics_jsonl']:
+                self.instruments.export_jsonl(self.config['metrics_jsonl'])
+            if self.config['metrics_prometheus']:
+                self.instruments.export_prometheus(self.config['metrics_prometheus'])
+        return snapshot
+
 
 def main():
     files = ['./json_files/customers_core.json', './json_files/customers_legacy.json']
@@ -292,6 +403,7 @@ def main():
 
     diffs = bankRecon.reconcile()
     bankRecon.generate_report(diffs)
+    bankRecon.export_metrics()
 
 
 if __name__ == "__main__":
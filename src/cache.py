@@ -0,0 +1,106 @@
+import hashlib
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from pandas import DataFrame
+
+from canonical import canonical_dumps
+
+try:
+    import pyarrow  # noqa: F401  (only needed for Feather)
+    FRAME_FORMAT = 'feather'
+except ImportError:
+    FRAME_FORMAT = 'pickle'
+
+# bump when the layout of cached frames changes
+CACHE_VERSION = 1
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's content, read in blocks."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class FrameCache:
+    """
+    Content-addressed on-disk cache of flattened, typed DataFrames.
+
+    Entries are keyed by the hash of the input file plus everything that shapes the
+    resulting frame (schema, flatten arguments, cast rules), so an unchanged snapshot is
+    loaded straight from a columnar file instead of being parsed, validated, flattened and
+    cast again. Frames are stored as Feather when pyarrow is installed and as pickles
+    otherwise. When the cache grows past `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, path: str, **parts: Any) -> str:
+        """Cache key for `path` given the settings (`parts`) that produce its frame."""
+        settings = canonical_dumps({
+            'version': CACHE_VERSION,
+            'pandas': pd.__version__,
+            'format': FRAME_FORMAT,
+            **parts
+        })
+        return hashlib.sha256((file_digest(path) + settings).encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{FRAME_FORMAT}")
+
+    def get(self, key: str) -> Optional[DataFrame]:
+        """Return the cached frame for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            df = pd.read_feather(path) if FRAME_FORMAT == 'feather' else pd.read_pickle(path)
+        except (FileNotFoundError, OSError):
+            self.misses += 1
+            return None
+        # the file's mtime doubles as its last access time for LRU eviction
+        os.utime(path)
+        self.hits += 1
+        return df
+
+    def put(self, key: str, df: DataFrame) -> None:
+        """Store `df` under `key` (written atomically) and evict old entries if needed."""
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            if FRAME_FORMAT == 'feather':
+                df.reset_index(drop=True).to_feather(tmp)
+            else:
+                df.to_pickle(tmp)
+            os.replace(tmp, self._path(key))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits in `max_bytes`."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(f".{FRAME_FORMAT}"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
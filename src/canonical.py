@@ -0,0 +1,66 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+from byteranges import load_array
+from jsonl import is_jsonl, load_jsonl
+
+
+def sorted_object(pairs: List[Tuple[str, Any]]) -> dict:
+    """`object_pairs_hook` that builds every JSON object with its keys sorted (last duplicate wins)."""
+    return dict(sorted(pairs, key=lambda kv: kv[0]))
+
+
+def canonicalize(obj: Any) -> Any:
+    """Return `obj` with the keys of every nested object sorted, like `jq --sort-keys`."""
+    if isinstance(obj, dict):
+        return {key: canonicalize(obj[key]) for key in sorted(obj)}
+    if isinstance(obj, list):
+        return [canonicalize(item) for item in obj]
+    return obj
+
+
+def load_json(path: str, array_key: Optional[str] = None, object_pairs_hook: Optional[Any] = None,
+              workers: int = 1) -> Any:
+    """
+    Parse a JSON or JSON Lines file.
+
+    A JSON Lines file is read line by line into the list of its records, wrapped as
+    `{array_key: records}` when `array_key` is given, so it has the same shape as the
+    JSON document it stands for (split at line boundaries over `workers` processes, see
+    `jsonl.load_jsonl`). With `workers` > 1 the array of a JSON file is parsed in
+    byte ranges over that many processes (see `byteranges.load_array`) and comes back in
+    the same shape; other members of the top-level object are not kept.
+    """
+    if is_jsonl(path):
+        records = load_jsonl(path, workers, object_pairs_hook=object_pairs_hook)
+        return {array_key: records} if array_key is not None else records
+    if workers > 1:
+        records = load_array(path, workers, array_key=array_key, object_pairs_hook=object_pairs_hook)
+        return {array_key: records} if array_key is not None else records
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f, object_pairs_hook=object_pairs_hook)
+
+
+def load_canonical(path: str, array_key: Optional[str] = None, workers: int = 1) -> Any:
+    """Parse a JSON (or JSON Lines) file once, sorting keys while the objects are being built."""
+    return load_json(path, array_key=array_key, object_pairs_hook=sorted_object, workers=workers)
+
+
+def canonical_dumps(obj: Any) -> str:
+    """Serialize with sorted keys and no insignificant whitespace."""
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def write_canonical(obj: Any, path: str, array_key: Optional[str] = None) -> None:
+    """Write `obj` canonically; to a JSON Lines path only its records are written, one per line."""
+    with open(path, 'w', encoding='utf-8') as f:
+        if is_jsonl(path):
+            for record in (obj[array_key] if array_key is not None else obj):
+                f.write(canonical_dumps(record) + '\n')
+        else:
+            f.write(canonical_dumps(obj))
+
+
+def canonical_path(path: str) -> str:
+    """Where the canonical copy of `path` is written when one is requested."""
+    return path.replace(".json", "_canon.json")
@@ -0,0 +1,161 @@
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+# substrings of a column name that select its cast when the schema does not type the column;
+# columns containing an 'exclude' substring are skipped and later rules win over earlier ones
+CAST_RULES = {
+    'datetime': {'match': ['ts', 'time', 'date']},
+    'numeric': {'match': ['amt', 'total', 'price']},
+    'Int64': {'match': ['id'], 'exclude': ['guid'], 'ignore_case': True},
+    'string': {'match': ['name', 'desc', 'text']}
+}
+
+# target of each JSON schema leaf type ('string' with a date/time format becomes 'datetime')
+SCHEMA_TYPES = {
+    'integer': 'Int64',
+    'number': 'float64',
+    'boolean': 'boolean',
+    'string': 'string'
+}
+
+DATETIME_FORMATS = {'date-time', 'date'}
+DATETIME_DTYPE = 'datetime64[ns, UTC]'
+
+
+def _leaf_target(schema: Dict) -> Optional[str]:
+    kind = schema.get('type')
+    if isinstance(kind, list):
+        kinds = [k for k in kind if k != 'null']
+        kind = kinds[0] if len(kinds) == 1 else None
+    if kind == 'string' and schema.get('format') in DATETIME_FORMATS:
+        return 'datetime'
+    return SCHEMA_TYPES.get(kind)
+
+
+def _leaf_targets(schema: Dict, path: Tuple[str, ...] = ()) -> Iterable[Tuple[Tuple[str, ...], str]]:
+    """(path, target) of every typed leaf under an object schema."""
+    for key, sub in schema.get('properties', {}).items():
+        if 'properties' in sub:
+            yield from _leaf_targets(sub, path + (key,))
+        else:
+            target = _leaf_target(sub)
+            if target is not None:
+                yield path + (key,), target
+
+
+def _at_path(schema: Dict, path: List[str]) -> Dict:
+    for key in path:
+        schema = schema.get('properties', {}).get(key, {})
+    return schema
+
+
+def schema_dtypes(record_schema: Dict, record_path: Optional[Union[str, List[str]]] = None,
+                  meta: Optional[List] = None, record_prefix: Optional[str] = None,
+                  meta_prefix: Optional[str] = None, sep: str = '.') -> Dict[str, str]:
+    """
+    Target of every flattened column the schema types, named as `json_normalize` names them
+    for the same arguments (`record_schema` is the schema of one top-level record).
+    """
+    targets = {}
+    leaves = record_schema
+    if record_path is not None:
+        path = record_path if isinstance(record_path, list) else [record_path]
+        leaves = _at_path(record_schema, path[:-1]).get('properties', {}).get(path[-1], {}).get('items', {})
+    for path, target in _leaf_targets(leaves):
+        targets[(record_prefix or '') + sep.join(path)] = target
+
+    if record_path is not None:
+        for m in meta or []:
+            m = m if isinstance(m, list) else [m]
+            target = _leaf_target(_at_path(record_schema, m))
+            if target is not None:
+                targets[(meta_prefix or '') + sep.join(m)] = target
+    return targets
+
+
+def rule_dtypes(columns: Iterable[str], rules: Dict[str, Dict]) -> Dict[str, str]:
+    """Target of every column selected by the name-substring `rules`."""
+    targets = {}
+    for kind, rule in rules.items():
+        for col in columns:
+            name = col.lower() if rule.get('ignore_case') else col
+            if (any(m in name for m in rule.get('match', []))
+                    and not any(e in name for e in rule.get('exclude', []))):
+                targets[col] = kind
+    return targets
+
+
+def cast_plan(columns: Iterable[str], schema_targets: Dict[str, str], rules: Dict[str, Dict],
+              overrides: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    The single target of every column to cast: explicit `overrides` first, then the schema,
+    then the name rules. Columns none of them selects are left as they are.
+    """
+    columns = list(columns)
+    targets = rule_dtypes(columns, rules)
+    targets.update({c: t for c, t in schema_targets.items() if c in columns})
+    targets.update({c: t for c, t in (overrides or {}).items() if c in columns})
+    return {col: targets[col] for col in columns if col in targets}
+
+
+def _to_strings(s: Series, category_max_unique: int) -> Series:
+    """`string` dtype, or categorical when there are few distinct values compared to the rows."""
+    if category_max_unique > 0:
+        codes, uniques = pd.factorize(s)
+        if len(uniques) <= category_max_unique and 2 * len(uniques) <= len(s):
+            categories = pd.Index(uniques, dtype='string')
+            return Series(pd.Categorical.from_codes(codes, categories=categories), index=s.index, name=s.name)
+    return s.astype('string')
+
+
+def _float_fits(values: np.ndarray, tolerance: float) -> bool:
+    """float32 rounding (half an ulp per side) stays under a tenth of the comparison tolerance."""
+    finite = values[np.isfinite(values)]
+    if tolerance <= 0 or not len(finite):
+        return False
+    return float(np.abs(finite).max()) * 2.0 ** -23 <= tolerance / 10
+
+
+def apply_cast_plan(df: DataFrame, plan: Dict[str, str], category_max_unique: int = 0,
+                    float32_tolerance: Optional[float] = None) -> Tuple[DataFrame, Dict[str, int]]:
+    """
+    Convert every planned column once, straight to its target dtype.
+
+    Args:
+        plan: {column: target} with targets 'datetime' (UTC, ns), 'numeric', 'float64',
+            'Int64', 'boolean', 'string' or any pandas dtype name
+        category_max_unique: String columns with at most this many distinct values (and
+            at least two rows per value) become categorical; 0 disables it
+        float32_tolerance: Numeric tolerance under which float columns may be stored as
+            float32; None keeps float64
+
+    Returns:
+        (cast frame, {numeric column: number of missing values after coercion})
+    """
+    converted = {}
+    missing = {}
+    for col, target in plan.items():
+        s = df[col]
+        if target == 'datetime':
+            converted[col] = pd.to_datetime(s, utc=True).astype(DATETIME_DTYPE)
+        elif target in ('numeric', 'float64', 'Int64'):
+            values = pd.to_numeric(s, errors='coerce')
+            if target == 'Int64':
+                values = values.astype('Int64')  # nullable integer
+            elif target == 'float64':
+                values = values.astype('float64')
+                if float32_tolerance is not None and _float_fits(values.to_numpy(), float32_tolerance):
+                    values = values.astype('float32')
+            if target != 'Int64':
+                n_missing = int(values.isna().sum())
+                if n_missing:
+                    missing[col] = n_missing
+            converted[col] = values
+        elif target == 'string':
+            converted[col] = _to_strings(s, category_max_unique)
+        else:
+            converted[col] = s.astype(target)
+    return df.assign(**converted), missing
@@ -7,7 +7,34 @@ predefined_config = {
     'notification_email': None,
     'incremental': False,
     'last_run_file': '.last_run.json',
-    'chunk_size': 10000  
+    'chunk_size': 10000,
+    'stream_threshold_mb': 50,
+    # processes parsing an input, each one a byte range of whole records (of whole lines for JSON Lines)
+    'parse_workers': 1,
+    'workers': 1,
+    'write_canonical': False,
+    # second pass over the records left in only_in_df1/only_in_df2: pairs sharing a blocking key
+    # ((column, method), or a list of them combined) are scored by column similarity and
+    # reported as probable matches (off by default, like in AdvancedRecon)
+    'fuzzy_matching': False,
+    'fuzzy_blocks': [
+        [('last_name', 'soundex'), ('email', 'domain')],
+        [('last_name', 'soundex'), ('routing_number', 'exact')],
+        ('email', 'lower')
+    ],
+    'fuzzy_columns': None,
+    'fuzzy_threshold': 0.85,
+    'fuzzy_max_block_pairs': 10000,
+    # per-stage timings and counters; cProfile / tracemalloc captures are slow and off by default.
+    # the metrics files are only written when a path is set
+    'instrumentation': True,
+    'profile': False,
+    'trace_memory': False,
+    'profile_dir': None,
+    'metrics_jsonl': None,
+    'metrics_prometheus': None,
+    # also write every difference as a line of differences.jsonl in the report directory
+    'report_jsonl': False
 }
 
 
@@ -0,0 +1,217 @@
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, json_normalize
+
+from canonical import canonical_dumps
+from validation import item_schema
+
+
+class _Fallback(Exception):
+    """The data does not fit the fast path; `json_normalize` handles it (and raises its usual errors)."""
+
+
+class _Node:
+    """One key of the compiled layout: its flattened column name and its known children."""
+    __slots__ = ('name', 'children')
+
+    def __init__(self, name: Optional[str]):
+        self.name = name
+        self.children: Dict[str, '_Node'] = {}
+
+
+class _RecordWriter:
+    """
+    Writes the leaves of flat-or-nested records straight into per-column lists.
+
+    The tree of column names is compiled from the record schema's `properties`; keys the
+    schema does not declare are added to it the first time they are seen. Whether a key
+    is a leaf or a nested object is decided by its value, exactly as `json_normalize` does.
+    """
+
+    def __init__(self, schema: Dict, sep: str):
+        self.sep = sep
+        self.root = _Node(None)
+        self._compile(schema, self.root)
+
+    def _compile(self, schema: Dict, node: _Node) -> None:
+        for key, sub in schema.get('properties', {}).items():
+            self._compile(sub, self._child(node, key))
+
+    def _child(self, node: _Node, key: str) -> _Node:
+        child = node.children.get(key)
+        if child is None:
+            child = node.children[key] = _Node(key if node.name is None else f"{node.name}{self.sep}{key}")
+        return child
+
+    @staticmethod
+    def _put(columns: Dict[str, List], name: str, value: Any, row: int) -> None:
+        col = columns.get(name)
+        if col is None:
+            col = columns[name] = []
+        if len(col) != row:
+            if len(col) > row:
+                raise _Fallback  # two keys flattening to the same name
+            col.extend([np.nan] * (row - len(col)))  # missing in the previous records
+        col.append(value)
+
+    def write(self, record: Dict, columns: Dict[str, List], row: int) -> None:
+        # json_normalize puts the top-level scalars before the flattened nested objects
+        nested = None
+        children = self.root.children
+        for key, value in record.items():
+            node = children.get(key) or self._child(self.root, key)
+            if isinstance(value, dict):
+                if nested is None:
+                    nested = []
+                nested.append((value, node))
+                continue
+            # fast path: the column exists and has a value for every previous record
+            col = columns.get(node.name)
+            if col is not None and len(col) == row:
+                col.append(value)
+            else:
+                self._put(columns, node.name, value, row)
+        if nested:
+            for value, node in nested:
+                self._write_nested(value, node, columns, row)
+
+    def _write_nested(self, obj: Dict, node: _Node, columns: Dict[str, List], row: int) -> None:
+        children = node.children
+        for key, value in obj.items():
+            child = children.get(key) or self._child(node, key)
+            if isinstance(value, dict):
+                self._write_nested(value, child, columns, row)
+                continue
+            col = columns.get(child.name)
+            if col is not None and len(col) == row:
+                col.append(value)
+            else:
+                self._put(columns, child.name, value, row)
+
+
+class Flattener:
+    """
+    Flattener compiled for one layout, producing the same frame as
+    `json_normalize(data, record_path=..., meta=..., record_prefix=..., meta_prefix=...)`.
+
+    Each leaf is appended to its column list in a single pass over the parsed records, so
+    no flattened copy of every record is built, and each column is typed once when the
+    frame is assembled. Layouts it does not cover (deeper record paths, non-dict records,
+    missing record paths or meta fields, ...) are handed to `json_normalize`.
+    """
+
+    def __init__(self, record_schema: Dict, record_path: Optional[Union[str, List[str]]] = None,
+                 meta: Optional[List] = None, record_prefix: Optional[str] = None,
+                 meta_prefix: Optional[str] = None, sep: str = '.'):
+        self.normalize_kwargs = {'record_path': record_path, 'meta': meta, 'record_prefix': record_prefix,
+                                 'meta_prefix': meta_prefix, 'sep': sep}
+        if isinstance(record_path, list) and len(record_path) == 1:
+            record_path = record_path[0]
+        self.record_path = record_path
+        self.meta = [m if isinstance(m, list) else [m] for m in (meta if isinstance(meta, list) else
+                                                                 [meta] if meta is not None else [])]
+        self.record_prefix = record_prefix
+        self.meta_prefix = meta_prefix
+        self.sep = sep
+
+        if isinstance(record_path, str):
+            record_schema = record_schema.get('properties', {}).get(record_path, {}).get('items', {})
+        self.writer = _RecordWriter(record_schema, sep)
+
+    def flatten(self, data: Any) -> DataFrame:
+        try:
+            return self._flatten(data)
+        except _Fallback:
+            return json_normalize(data, **self.normalize_kwargs)
+
+    def _flatten(self, data: Any) -> DataFrame:
+        if not isinstance(data, list) or not data or isinstance(self.record_path, list):
+            raise _Fallback
+
+        columns: Dict[str, List] = {}
+        row = 0
+        if self.record_path is None:
+            if self.meta:
+                raise _Fallback
+            for record in data:
+                if not isinstance(record, dict):
+                    if not (pd.api.types.is_scalar(record) and pd.isna(record)):
+                        raise _Fallback
+                    record = {}
+                self.writer.write(record, columns, row)
+                row += 1
+            return self._frame(columns, row)
+
+        lengths = []
+        meta_vals: List[List] = [[] for _ in self.meta]
+        for obj in data:
+            if not isinstance(obj, dict) or self.record_path not in obj:
+                raise _Fallback
+            records = obj[self.record_path]
+            if not isinstance(records, list):
+                if records is not None:
+                    raise _Fallback
+                records = []
+            for record in records:
+                if not isinstance(record, dict):
+                    raise _Fallback
+                self.writer.write(record, columns, row)
+                row += 1
+            lengths.append(len(records))
+
+            for values, path in zip(meta_vals, self.meta):
+                value = obj
+                for field in path:
+                    if not isinstance(value, dict) or field not in value:
+                        raise _Fallback
+                    value = value[field]
+                values.append(value)
+
+        result = self._frame(columns, row)
+        for path, v in zip(self.meta, meta_vals):
+            k = (self.meta_prefix or '') + self.sep.join(path)
+            if k in result:
+                raise _Fallback  # json_normalize reports the conflicting name
+            values = np.array(v, dtype=object)
+            if values.ndim > 1:
+                values = np.empty((len(v),), dtype=object)
+                for i, val in enumerate(v):
+                    values[i] = val
+            result[k] = values.repeat(lengths)
+        return result
+
+    def _frame(self, columns: Dict[str, List], n_rows: int) -> DataFrame:
+        if not columns:
+            raise _Fallback
+        for col in columns.values():
+            if len(col) < n_rows:
+                col.extend([np.nan] * (n_rows - len(col)))
+        if self.record_prefix is not None:
+            columns = {f"{self.record_prefix}{name}": col for name, col in columns.items()}
+        return DataFrame(columns)
+
+
+_FLATTENERS: Dict[str, Flattener] = {}
+
+
+def compile_flattener(record_schema: Dict, **normalize_kwargs) -> Flattener:
+    """Return the flattener for a record schema and `json_normalize` arguments, compiling it once."""
+    key = canonical_dumps([record_schema, normalize_kwargs])
+    if key not in _FLATTENERS:
+        _FLATTENERS[key] = Flattener(record_schema, **normalize_kwargs)
+    return _FLATTENERS[key]
+
+
+def flatten_records(records: Any, schema: Optional[Dict] = None,
+                    array_key: Optional[str] = None, **normalize_kwargs) -> DataFrame:
+    """
+    Flatten parsed records like `json_normalize(records, **normalize_kwargs)`.
+
+    With a document `schema` (whose records sit under `array_key`, or at the top level)
+    the compiled columnar `Flattener` is used; without one this is plain `json_normalize`.
+    """
+    if schema is None:
+        return json_normalize(records, **normalize_kwargs)
+    return compile_flattener(item_schema(schema, array_key), **normalize_kwargs).flatten(records)
@@ -0,0 +1,241 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Index, Series
+
+# a block is a (column, method) pair, or a list of them whose keys are combined; records are
+# only scored against records sharing the key of at least one block
+DEFAULT_BLOCKS = [
+    [('last_name', 'soundex'), ('email', 'domain')],
+    [('last_name', 'soundex'), ('routing_number', 'exact')],
+    ('email', 'lower')
+]
+
+_SOUNDEX_CODES = {c: digit for digit, letters in
+                  {'1': 'bfpv', '2': 'cgjkqsxz', '3': 'dt', '4': 'l', '5': 'mn', '6': 'r'}.items()
+                  for c in letters}
+
+
+def soundex(word: Any) -> Optional[str]:
+    """American Soundex code of a word (None when it has no ASCII letter)."""
+    if not isinstance(word, str):
+        return None
+    letters = [c for c in word.lower() if 'a' <= c <= 'z']
+    if not letters:
+        return None
+    code, last = letters[0].upper(), _SOUNDEX_CODES.get(letters[0])
+    for c in letters[1:]:
+        digit = _SOUNDEX_CODES.get(c)
+        if digit is not None and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        if c not in 'hw':  # h and w do not separate letters with the same code
+            last = digit
+    return code.ljust(4, '0')
+
+
+def _ngrams(value: Any, n: int) -> List[str]:
+    if not isinstance(value, str):
+        return []
+    value = value.lower()
+    return [value[i:i + n] for i in range(max(len(value) - n + 1, 1))]
+
+
+def block_keys(s: Series, method: str, n: int = 3) -> Series:
+    """
+    Blocking keys of every value of `s`, on its index ('ngram' gives several keys per value).
+
+    Args:
+        method: 'exact' (the value), 'lower' (stripped, lowercased text), 'soundex',
+            'domain' (of an email address) or 'ngram' (character n-grams of length `n`)
+    """
+    if method == 'exact':
+        keys = s
+    elif method == 'lower':
+        keys = s.astype(object).str.strip().str.lower()
+    elif method == 'soundex':
+        codes, uniques = pd.factorize(s)
+        keys = Series(np.array([soundex(u) for u in uniques] + [None], dtype=object)[codes], index=s.index)
+    elif method == 'domain':
+        keys = s.astype(object).str.lower().str.extract(r'@([^@]+)$', expand=False)
+    elif method == 'ngram':
+        keys = s.map(lambda v: _ngrams(v, n)).explode()
+    else:
+        raise ValueError(f"Unknown blocking method {method!r}")
+    return keys.dropna()
+
+
+def _block_index(frame: DataFrame, block: Union[Tuple[str, str], List[Tuple[str, str]]]) -> Optional[DataFrame]:
+    """(`key`, `row`) of every blocking key of every row, or None when a block column is missing."""
+    keys = None
+    for column, method in ([block] if isinstance(block, tuple) else block):
+        if column not in frame.columns:
+            return None
+        part = block_keys(frame[column].reset_index(drop=True), method).astype(str)
+        if keys is None:
+            keys = part
+        else:
+            joined = keys.to_frame('a').join(part.rename('b'), how='inner')
+            keys = joined['a'] + '\x1f' + joined['b']
+    return DataFrame({'key': keys.to_numpy(), 'row': keys.index.to_numpy()}).drop_duplicates()
+
+
+def candidate_pairs(left: DataFrame, right: DataFrame, blocks: Sequence,
+                    max_block_pairs: int = 10_000) -> DataFrame:
+    """
+    Row positions (`left`, `right`) of the record pairs sharing a key in at least one block.
+
+    A key giving more than `max_block_pairs` pairs (a very common domain, say) is too
+    unselective to block on and is skipped.
+    """
+    pieces = []
+    for block in blocks:
+        lk, rk = _block_index(left, block), _block_index(right, block)
+        if lk is None or rk is None:
+            continue
+        sizes = lk['key'].value_counts().mul(rk['key'].value_counts(), fill_value=0)
+        kept = sizes.index[(sizes > 0) & (sizes <= max_block_pairs)]
+        pairs = lk[lk['key'].isin(kept)].merge(rk[rk['key'].isin(kept)], on='key', suffixes=('_left', '_right'))
+        pieces.append(DataFrame({'left': pairs['row_left'].to_numpy(), 'right': pairs['row_right'].to_numpy()}))
+
+    if not pieces:
+        return DataFrame({'left': np.array([], dtype=np.int64), 'right': np.array([], dtype=np.int64)})
+    return pd.concat(pieces, ignore_index=True).drop_duplicates(ignore_index=True).astype(np.int64)
+
+
+def _code_points(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(n, width) array of the code points of each string, zero padded, and the string lengths."""
+    # encoded by hand: a numpy str array would drop trailing NUL characters
+    encoded = [value.encode('utf-32-le', 'surrogatepass') for value in values]
+    lengths = np.array([len(code) // 4 for code in encoded], dtype=np.int64)
+    width = int(lengths.max(initial=0))
+    codes = np.frombuffer(b''.join(code.ljust(4 * width, b'\0') for code in encoded), dtype='<u4')
+    return codes.reshape(len(encoded), width), lengths
+
+
+def edit_distance(a: Sequence[str], b: Sequence[str]) -> np.ndarray:
+    """
+    Levenshtein distance of every pair (a[k], b[k]), one dynamic-programming row at a
+    time for all pairs at once.
+
+    Within a row, d[j] = min(x[j], d[j-1] + 1) where x holds the substitution/deletion
+    costs; that recurrence is min over k <= j of x[k] + j - k, a running minimum of
+    x[k] - k, so each row is a few whole-array operations.
+    """
+    codes_a, len_a = _code_points(a)
+    codes_b, len_b = _code_points(b)
+    n, width_b = codes_b.shape
+    cols = np.arange(width_b + 1)
+
+    prev = np.broadcast_to(cols, (n, width_b + 1)).copy()
+    dist = len_b.copy()  # for empty `a`
+    x = np.empty_like(prev)
+    for i in range(1, int(len_a.max(initial=0)) + 1):
+        x[:, 0] = i
+        np.minimum(prev[:, :-1] + (codes_a[:, i - 1:i] != codes_b), prev[:, 1:] + 1, out=x[:, 1:])
+        prev = np.minimum.accumulate(x - cols, axis=1) + cols
+        done = np.flatnonzero(len_a == i)
+        dist[done] = prev[done, len_b[done]]
+    return dist
+
+
+def edit_similarity(a: Sequence[str], b: Sequence[str], batch_size: int = 50_000) -> np.ndarray:
+    """1 - distance / longer length for every pair (1.0 for two empty strings), in batches of similar lengths."""
+    a, b = np.asarray(a, dtype=object), np.asarray(b, dtype=object)
+    lengths = np.array([max(len(x), len(y)) for x, y in zip(a, b)], dtype=np.int64)
+    order = np.argsort(lengths, kind='stable')
+
+    similarity = np.ones(len(a))
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        longest = lengths[batch]
+        dist = edit_distance(a[batch], b[batch])
+        similarity[batch] = np.where(longest > 0, 1 - dist / np.maximum(longest, 1), 1.0)
+    return similarity
+
+
+def column_similarity(a: Series, b: Series) -> np.ndarray:
+    """
+    Similarity in [0, 1] of the aligned values: edit similarity of the stripped, lowercased
+    text for string columns, equality for the others. Missing on both sides counts as equal,
+    missing on one side as different.
+    """
+    a, b = a.reset_index(drop=True), b.reset_index(drop=True)
+    missing_a, missing_b = a.isna().to_numpy(), b.isna().to_numpy()
+    if pd.api.types.is_string_dtype(a) and pd.api.types.is_string_dtype(b):
+        present = ~(missing_a | missing_b)
+        similarity = np.zeros(len(a))
+        similarity[present] = edit_similarity(a[present].str.strip().str.lower().to_numpy(),
+                                              b[present].str.strip().str.lower().to_numpy())
+    else:
+        similarity = (a.astype(object) == b.astype(object)).to_numpy(dtype=float)
+    similarity[missing_a & missing_b] = 1.0
+    similarity[missing_a ^ missing_b] = 0.0
+    return similarity
+
+
+def fuzzy_match(left: DataFrame, right: DataFrame,
+                blocks: Sequence = DEFAULT_BLOCKS,
+                columns: Optional[List[str]] = None,
+                weights: Optional[Dict[str, float]] = None,
+                threshold: float = 0.85,
+                max_block_pairs: int = 10_000) -> DataFrame:
+    """
+    Pair records of `left` and `right` (indexed by key) that probably describe the same entity.
+
+    Only pairs sharing a blocking key are scored, so the work follows the block sizes
+    instead of len(left) * len(right). A pair's score is the weighted mean of the column
+    similarities; pairs scoring at least `threshold` are matched one to one, best first.
+
+    Args:
+        blocks: (column, method) pairs or lists of them (combined keys), see `block_keys`
+        columns: Columns scored; defaults to every column both sides have
+        weights: {column: weight}, 1 for unlisted columns
+
+    Returns:
+        Frame with `key_A`, `key_B`, `score` and the similarity of every scored column,
+        best matches first
+    """
+    columns = columns or [c for c in left.columns if c in right.columns]
+    pairs = candidate_pairs(left, right, blocks, max_block_pairs)
+    li, ri = pairs['left'].to_numpy(), pairs['right'].to_numpy()
+
+    similarities = {col: column_similarity(left[col].take(li), right[col].take(ri)) for col in columns}
+    weight = np.array([(weights or {}).get(col, 1.0) for col in columns])
+    score = (np.column_stack([similarities[col] for col in columns]) @ weight / weight.sum()
+             if columns and len(li) else np.zeros(len(li)))
+
+    order = np.argsort(-score, kind='stable')
+    order = order[score[order] >= threshold]
+    used_left, used_right, chosen = set(), set(), []
+    for k in order:
+        if li[k] not in used_left and ri[k] not in used_right:
+            used_left.add(li[k])
+            used_right.add(ri[k])
+            chosen.append(k)
+    chosen = np.array(chosen, dtype=np.int64)
+
+    matches = DataFrame({
+        'key_A': left.index.take(li[chosen]).to_numpy(dtype=object),
+        'key_B': right.index.take(ri[chosen]).to_numpy(dtype=object),
+        'score': score[chosen]
+    })
+    for col in columns:
+        matches[f'similarity_{col}'] = similarities[col][chosen]
+    return matches
+
+
+def unmatched_rows(df: DataFrame, key_cols: List[str], keys: Index) -> DataFrame:
+    """The rows of `df` whose key is in `keys` (first row per key), indexed by key with the key columns kept."""
+    frame = df.set_index(key_cols, drop=False)
+    frame = frame[~frame.index.duplicated(keep='first')]
+    return frame[frame.index.isin(keys)]
+
+
+def match_unmatched(df1: DataFrame, df2: DataFrame, key_cols: List[str], result: Dict[str, Any],
+                    **options) -> DataFrame:
+    """`fuzzy_match` over the `only_in_df1`/`only_in_df2` rows of a `compare_frames` result."""
+    return fuzzy_match(unmatched_rows(df1, key_cols, result['only_in_df1']),
+                       unmatched_rows(df2, key_cols, result['only_in_df2']), **options)
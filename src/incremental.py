@@ -0,0 +1,140 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from pandas import DataFrame, Index, Series
+
+from mismatch import compare_frames, merge_results, order_mismatches, sort_keys
+
+def key_fingerprints(frame: DataFrame) -> Series:
+    """
+    64-bit hash of every row of a key-indexed frame (keys must be unique), as a nullable
+    UInt64 series on the same index. Any change to any value changes the fingerprint.
+    """
+    hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return Series(pd.array(hashes, dtype='UInt64'), index=frame.index)
+
+
+def _differs(a: Series, b: Series) -> Series:
+    """Element-wise `a != b` where a missing value only equals another missing value."""
+    return (a != b).fillna(False) | (a.isna() ^ b.isna())
+
+
+def changed_keys(previous: DataFrame, current: DataFrame) -> Index:
+    """Keys that are new, deleted, or whose fingerprint changed on either side."""
+    keys = previous.index.union(current.index, sort=False)
+    previous, current = previous.reindex(keys), current.reindex(keys)
+    changed = _differs(previous['fp_A'], current['fp_A']) | _differs(previous['fp_B'], current['fp_B'])
+    return keys[changed.to_numpy(dtype=bool)]
+
+
+def _mismatch_ids(mismatches: DataFrame) -> Index:
+    return mismatches.set_index('column', append=True).index
+
+
+def result_delta(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    What changed between two reconciliation results: keys that appeared in or left the
+    `only_in` sets, and (key, column) mismatches that are new or were resolved.
+    """
+    delta = {}
+    for side in ['only_in_df1', 'only_in_df2']:
+        delta[side] = {
+            'added': list(current[side].difference(previous[side])),
+            'removed': list(previous[side].difference(current[side]))
+        }
+
+    new_ids, old_ids = _mismatch_ids(current['mismatches']), _mismatch_ids(previous['mismatches'])
+    delta['mismatches'] = {
+        'added': current['mismatches'][~new_ids.isin(old_ids)],
+        'resolved': previous['mismatches'][~old_ids.isin(new_ids)]
+    }
+    return delta
+
+
+def load_state(path: str) -> Optional[Dict[str, Any]]:
+    """Read the state saved by the previous incremental run, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    return pd.read_pickle(path)
+
+
+def save_state(path: str, state: Dict[str, Any]) -> None:
+    tmp = f"{path}.tmp"
+    pd.to_pickle(state, tmp)
+    os.replace(tmp, path)
+
+
+def reconcile_incremental(df1: DataFrame, df2: DataFrame, key_cols: List[str],
+                          state: Optional[Dict[str, Any]],
+                          numeric_tolerance: float = 0.01,
+                          time_tolerance_seconds: float = 60) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Compare two frames, re-comparing only the keys that changed since the previous run.
+
+    Every row is fingerprinted on both sides. Keys whose fingerprints are unchanged since
+    `state` would compare exactly as before, so their part of the previous result is
+    reused and only new, deleted and modified keys go through `compare_frames`. The
+    merged result is identical to comparing the whole frames. A full comparison is run
+    when there is no state or the settings (keys, columns, dtypes, tolerances) changed.
+
+    Returns:
+        (result, new_state) where result is a `compare_frames` result plus a `delta`
+        against the previous result (None on the first run) and the number of
+        `compared_keys`, and new_state is what the next run needs
+    """
+    left, right = df1.set_index(key_cols), df2.set_index(key_cols)
+    duplicate_keys = int(left.index.duplicated().sum() + right.index.duplicated().sum())
+    if duplicate_keys:
+        left = left[~left.index.duplicated(keep='first')]
+        right = right[~right.index.duplicated(keep='first')]
+
+    settings = {
+        'key_cols': list(key_cols),
+        'columns': [[(col, str(dtype)) for col, dtype in frame.dtypes.items()] for frame in (left, right)],
+        'numeric_tolerance': numeric_tolerance,
+        'time_tolerance_seconds': time_tolerance_seconds
+    }
+    fingerprints = pd.DataFrame({'fp_A': key_fingerprints(left), 'fp_B': key_fingerprints(right)})
+
+    if state is None or state['settings'] != settings:
+        result = compare_frames(df1, df2, key_cols,
+                                numeric_tolerance=numeric_tolerance,
+                                time_tolerance_seconds=time_tolerance_seconds)
+        result['compared_keys'] = len(fingerprints)
+    else:
+        dirty = changed_keys(state['fingerprints'], fingerprints)
+        partial = compare_frames(left[left.index.isin(dirty)].reset_index(),
+                                 right[right.index.isin(dirty)].reset_index(),
+                                 key_cols,
+                                 numeric_tolerance=numeric_tolerance,
+                                 time_tolerance_seconds=time_tolerance_seconds)
+
+        previous = state['result']
+        kept = {
+            'only_in_df1': previous['only_in_df1'][~previous['only_in_df1'].isin(dirty)],
+            'only_in_df2': previous['only_in_df2'][~previous['only_in_df2'].isin(dirty)],
+            'mismatches': previous['mismatches'][~previous['mismatches'].index.isin(dirty)],
+            'common_keys': 0,
+            'common_cols': [],
+            'duplicate_keys': 0
+        }
+        result = merge_results([kept, partial])
+        result['only_in_df1'] = sort_keys(result['only_in_df1'])
+        result['only_in_df2'] = sort_keys(result['only_in_df2'])
+        result['common_cols'] = [c for c in left.columns if c in right.columns]
+        result['common_keys'] = int(fingerprints.notna().all(axis=1).sum())
+        result['mismatches'] = order_mismatches(result['mismatches'], result['common_cols'],
+                                                left.index.get_indexer(result['mismatches'].index))
+        result['compared_keys'] = len(dirty)
+
+    result['duplicate_keys'] = duplicate_keys
+    comparable = state is not None and state['settings']['key_cols'] == settings['key_cols']
+    result['delta'] = result_delta(state['result'], result) if comparable else None
+
+    new_state = {
+        'settings': settings,
+        'fingerprints': fingerprints,
+        'result': {k: result[k] for k in ['only_in_df1', 'only_in_df2', 'mismatches']}
+    }
+    return result, new_state
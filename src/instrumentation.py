@@ -0,0 +1,217 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import re
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of the process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)  # bytes on macOS, KB elsewhere
+
+
+def current_rss_mb() -> Optional[float]:
+    """Current resident memory in MB (Linux only, None elsewhere)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Instrumentation:
+    """
+    Per-stage timing and memory, counters and gauges of a pipeline run.
+
+    Stages are timed with `stage()` (or the `instrumented` method decorator); every call adds
+    its wall and CPU time and records the peak RSS of the process and the change of the
+    current RSS. Optional captures, both off by default as they slow the run down:
+
+    - `profile`: every outermost stage runs under cProfile; the top functions by cumulative
+      time are kept as text, and the raw stats are dumped to `profile_dir` when it is set
+    - `trace_memory`: tracemalloc runs during the stages and records the peak of Python
+      allocations in each one (a nested stage restarts the peak of the stage around it)
+
+    The collected values are exported with `export_jsonl()` and `export_prometheus()`.
+
+    Args:
+        enabled: False turns every call into a no-op
+        labels: Added to every exported sample (e.g. {'pipeline': 'reconciliation'})
+    """
+
+    def __init__(self, enabled: bool = True, profile: bool = False, trace_memory: bool = False,
+                 profile_dir: Optional[str] = None, labels: Optional[Dict[str, str]] = None):
+        self.enabled = enabled
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        self.labels = dict(labels or {})
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.profiles: Dict[str, str] = {}
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._lock = threading.Lock()
+        self._depth = 0  # cProfile cannot nest, only outermost stages are profiled
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as stage `name`."""
+        if not self.enabled:
+            yield
+            return
+
+        profiler = cProfile.Profile() if self.profile and self._depth == 0 else None
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        rss_before = current_rss_mb()
+        start, cpu_start = time.perf_counter(), time.process_time()
+
+        self._depth += 1
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            self._depth -= 1
+            seconds, cpu_seconds = time.perf_counter() - start, time.process_time() - cpu_start
+            rss_after = current_rss_mb()
+
+            with self._lock:
+                record = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'cpu_seconds': 0.0})
+                record['calls'] += 1
+                record['seconds'] += seconds
+                record['cpu_seconds'] += cpu_seconds
+                record['peak_rss_mb'] = round(peak_rss_mb(), 1)
+                if rss_before is not None and rss_after is not None:
+                    record['rss_delta_mb'] = round(record.get('rss_delta_mb', 0.0) + rss_after - rss_before, 1)
+                if self.trace_memory:
+                    traced_peak = tracemalloc.get_traced_memory()[1] / 2**20
+                    record['traced_peak_mb'] = round(max(record.get('traced_peak_mb', 0.0), traced_peak), 1)
+            if started_tracing:
+                tracemalloc.stop()
+            if profiler is not None:
+                self._keep_profile(name, profiler)
+
+    def _keep_profile(self, name: str, profiler: cProfile.Profile, top: int = 25) -> None:
+        # repeated calls of a stage add up in one set of stats
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = pstats.Stats(profiler)
+        else:
+            stats.add(profiler)
+        text = io.StringIO()
+        stats.stream = text
+        stats.sort_stats('cumulative').print_stats(top)
+        self.profiles[name] = text.getvalue()
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            stats.dump_stats(os.path.join(self.profile_dir, f"{_metric_name(name)}.prof"))
+
+    def count(self, name: str, value: float = 1) -> None:
+        """Add `value` to counter `name` (rows read, cast failures, cache hits...)."""
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float) -> None:
+        """Set gauge `name` to its latest `value`."""
+        if self.enabled:
+            self.gauges[name] = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Everything collected so far as plain, JSON-serializable dicts."""
+        return {
+            'stages': {name: dict(record) for name, record in self.stages.items()},
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges)
+        }
+
+    def export_jsonl(self, path: str) -> None:
+        """Append one JSON line per stage, counter and gauge to `path`."""
+        timestamp = datetime.now(timezone.utc).isoformat()
+        with open(path, 'a') as f:
+            for name, record in self.stages.items():
+                f.write(json.dumps({'timestamp': timestamp, 'type': 'stage', 'name': name, **self.labels, **record}) + '\n')
+            for kind, values in (('counter', self.counters), ('gauge', self.gauges)):
+                for name, value in values.items():
+                    f.write(json.dumps({'timestamp': timestamp, 'type': kind, 'name': name, **self.labels, 'value': value}) + '\n')
+
+    def prometheus_text(self, prefix: str = 'recon') -> str:
+        """The collected values in the Prometheus text exposition format."""
+        lines = []
+
+        def family(metric: str, kind: str, help_text: str, samples: Dict[str, float], label: Optional[str]) -> None:
+            if not samples:
+                return
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for key, value in samples.items():
+                labels = dict(self.labels, **({label: key} if label else {}))
+                lines.append(f"{metric}{_label_text(labels)} {float(value)!r}")
+
+        stage_fields = [
+            ('calls', 'counter', 'Number of times the stage ran', '_calls_total'),
+            ('seconds', 'counter', 'Wall time spent in the stage', '_seconds_total'),
+            ('cpu_seconds', 'counter', 'CPU time spent in the stage', '_cpu_seconds_total'),
+            ('peak_rss_mb', 'gauge', 'Peak resident memory of the process after the stage, in MB', '_peak_rss_mb'),
+            ('rss_delta_mb', 'gauge', 'Change of resident memory over the stage, in MB', '_rss_delta_mb'),
+            ('traced_peak_mb', 'gauge', 'Peak of traced Python allocations during the stage, in MB', '_traced_peak_mb')
+        ]
+        for field, kind, help_text, suffix in stage_fields:
+            samples = {name: record[field] for name, record in self.stages.items() if field in record}
+            family(f"{prefix}_stage{suffix}", kind, help_text, samples, 'stage')
+        for name, value in self.counters.items():
+            family(f"{prefix}_{_metric_name(name)}_total", 'counter', f"Counter {name}", {name: value}, None)
+        for name, value in self.gauges.items():
+            family(f"{prefix}_{_metric_name(name)}", 'gauge', f"Gauge {name}", {name: value}, None)
+        return '\n'.join(lines) + '\n'
+
+    def export_prometheus(self, path: str, prefix: str = 'recon') -> None:
+        """Write `prometheus_text()` to `path` (e.g. for node_exporter's textfile collector)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.prometheus_text(prefix))
+        os.replace(tmp, path)  # scrapers never see a half-written file
+
+
+def _metric_name(name: str) -> str:
+    name = re.sub(r'[^a-zA-Z0-9_]', '_', name)
+    return name if not name[:1].isdigit() else f"_{name}"
+
+
+def _label_text(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{_metric_name(key)}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def instrumented(stage: str) -> Callable:
+    """Method decorator timing every call as `stage` on the instance's `instruments`."""
+    def decorate(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.instruments.stage(stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
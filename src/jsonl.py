@@ -0,0 +1,147 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+JSONL_SUFFIXES = ('.jsonl', '.ndjson')
+
+
+def is_jsonl(path: str) -> bool:
+    """Whether `path` names a JSON Lines file (one JSON value per line), by its extension."""
+    return path.lower().endswith(JSONL_SUFFIXES)
+
+
+def iter_jsonl(path: str, object_pairs_hook: Optional[Callable] = None,
+               start: int = 0, end: Optional[int] = None) -> Iterator[Any]:
+    """
+    Yield the records of a JSON Lines file one line at a time; blank lines are skipped.
+
+    Args:
+        object_pairs_hook: Passed to the decoder (e.g. `canonical.sorted_object`)
+        start, end: Byte range to read, as given by `line_ranges` (the whole file by default)
+    """
+    decoder = json.JSONDecoder(object_pairs_hook=object_pairs_hook)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if end is not None and offset >= end:
+                return
+            text = line.decode('utf-8').strip()
+            if text:
+                try:
+                    yield decoder.decode(text)
+                except json.JSONDecodeError as e:
+                    raise json.JSONDecodeError(f"{e.msg} (in the line at byte {offset} of {path})", e.doc, e.pos) from None
+            offset += len(line)
+
+
+def iter_jsonl_batches(path: str, batch_size: int, object_pairs_hook: Optional[Callable] = None,
+                       start: int = 0, end: Optional[int] = None) -> Iterator[List[Any]]:
+    """Group the records of a JSON Lines file (or of a byte range of it) into lists of at most `batch_size`."""
+    batch = []
+    for record in iter_jsonl(path, object_pairs_hook, start, end):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def line_ranges(path: str, n_parts: int) -> List[Tuple[int, int]]:
+    """
+    Split a file into at most `n_parts` byte ranges of about equal size that start and end
+    on line boundaries, so each range can be parsed independently (e.g. in another process).
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for k in range(1, max(n_parts, 1)):
+            target = max(size * k // n_parts, bounds[-1])
+            f.seek(target)
+            if target:
+                f.readline()  # finish the line the target falls in
+            position = f.tell()
+            if position >= size:
+                break
+            if position > bounds[-1]:
+                bounds.append(position)
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def _load_line_range(path: str, start: int, end: int, object_pairs_hook: Optional[Callable] = None) -> List[Any]:
+    return list(iter_jsonl(path, object_pairs_hook, start, end))
+
+
+def load_jsonl(path: str, workers: int = 1, object_pairs_hook: Optional[Callable] = None) -> List[Any]:
+    """
+    All records of a JSON Lines file in file order. With `workers` > 1 the file is split by
+    `line_ranges` and the ranges are parsed in a process pool (`object_pairs_hook` must be picklable).
+    """
+    ranges = line_ranges(path, workers) if workers > 1 else []
+    if len(ranges) <= 1:
+        return list(iter_jsonl(path, object_pairs_hook))
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        parts = pool.map(_load_line_range, [path] * len(ranges), *zip(*ranges), [object_pairs_hook] * len(ranges))
+        return [record for part in parts for record in part]
+
+
+def _json_default(value: Any) -> Any:
+    # numpy scalars and timestamps found in frames and key tuples
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def write_jsonl(records: Iterable[Any], path: str, mode: str = 'w') -> int:
+    """Write `records` one JSON value per line; returns the number of records written."""
+    n = 0
+    with open(path, mode, encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, default=_json_default) + '\n')
+            n += 1
+    return n
+
+
+def write_frame_jsonl(df: DataFrame, path: str, mode: str = 'w', chunk_size: int = 100_000,
+                      extra: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Append the rows of `df` (its index levels included as columns) as JSON lines, `chunk_size`
+    rows at a time so the whole text never sits in memory. `extra` fields are added to every line.
+    """
+    frame = df.reset_index() if any(name is not None for name in df.index.names) else df
+    if extra:
+        frame = frame.assign(**extra)[list(extra) + [c for c in frame.columns if c not in extra]]
+    with open(path, mode, encoding='utf-8') as f:
+        for start in range(0, len(frame), chunk_size):
+            text = frame.iloc[start:start + chunk_size].to_json(orient='records', lines=True,
+                                                                date_format='iso', force_ascii=False)
+            f.write(text if text.endswith('\n') else text + '\n')
+    return len(frame)
+
+
+def write_differences_jsonl(differences: Dict[str, Any], path: str, key_cols: List[str]) -> int:
+    """
+    Stream a `reconcile()` result to a JSON Lines file, one difference per line: value
+    mismatches (`kind` 'mismatch' with the key columns, `column`, `value_A`, `value_B`),
+    keys found in one file only (`kind` 'only_in_df1' / 'only_in_df2') and fuzzy
+    `probable_match` pairs.
+    """
+    def keyed(kind: str, keys: List[Any]) -> Iterator[Dict[str, Any]]:
+        for key in keys:
+            values = key if isinstance(key, tuple) else (key,)
+            yield {'kind': kind, **dict(zip(key_cols, values))}
+
+    n = write_frame_jsonl(differences['mismatches'], path, extra={'kind': 'mismatch'})
+    n += write_jsonl(keyed('only_in_df1', differences['only_in_df1']), path, mode='a')
+    n += write_jsonl(keyed('only_in_df2', differences['only_in_df2']), path, mode='a')
+    if differences.get('probable_matches') is not None and len(differences['probable_matches']):
+        n += write_frame_jsonl(differences['probable_matches'], path, mode='a', extra={'kind': 'probable_match'})
+    return n
@@ -0,0 +1,322 @@
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Index, Series
+
+# columns of the long-format mismatch frame. the frame itself is indexed by the key columns
+MISMATCH_COLUMNS = ['column', 'value_A', 'value_B', 'delta']
+
+# row fingerprint of rows that can't be bucketed (infinite values); never treated as equal
+UNCERTAIN_FINGERPRINT = np.uint64(0)
+
+
+def empty_mismatches(index: Index) -> DataFrame:
+    """Return an empty long-format mismatch frame whose index matches the key layout of `index`."""
+    frame = DataFrame({
+        'column': pd.Series([], dtype=object),
+        'value_A': pd.Series([], dtype=object),
+        'value_B': pd.Series([], dtype=object),
+        'delta': pd.Series([], dtype='float64'),
+    })
+    frame.index = index[:0]
+    return frame
+
+
+def _is_plain_numeric(s: Series) -> bool:
+    return pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s)
+
+
+def _comparison_kind(s: Series) -> str:
+    """How `column_mismatch_mask` compares a column."""
+    if _is_plain_numeric(s):
+        return 'numeric'
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return 'datetime_tz' if isinstance(s.dtype, pd.DatetimeTZDtype) else 'datetime'
+    return 'equality'
+
+
+def row_fingerprints(df: DataFrame, key_cols: List[str],
+                     numeric_tolerance: float,
+                     time_tolerance_seconds: float) -> Tuple[List, np.ndarray]:
+    """
+    Hash every row of `df` over its non-key columns after bucketing numbers and timestamps
+    by their tolerance (`floor(value / tolerance)`).
+
+    Two values in the same bucket are less than one tolerance apart, so rows whose
+    fingerprints are equal on both sides match on every column and can skip the
+    per-column comparison. Rows in neighbouring buckets just get compared as usual.
+
+    Returns:
+        (signature, fingerprints) where signature lists the hashed columns, how they are
+        compared and the tolerances; fingerprints of two frames are only comparable when
+        their signatures are equal
+    """
+    cols = sorted(c for c in df.columns if c not in key_cols)
+    signature = [(col, _comparison_kind(df[col])) for col in cols]
+    signature.append(('tolerances', (numeric_tolerance, time_tolerance_seconds)))
+
+    fingerprints = np.zeros(len(df), dtype='uint64')
+    uncertain = np.zeros(len(df), dtype=bool)
+    for col, kind in signature[:-1]:
+        s = df[col]
+        if kind == 'equality':
+            values = s.astype(object) if isinstance(s.dtype, pd.CategoricalDtype) else s
+        else:
+            if kind == 'numeric':
+                values, tolerance = s.to_numpy(dtype='float64', na_value=np.nan), numeric_tolerance
+            else:
+                # epoch ticks in the column's unit (UTC for tz-aware columns), scaled to seconds
+                ticks_per_second = np.timedelta64(1, 's') / np.timedelta64(1, s.dt.unit)
+                values = np.where(s.isna().to_numpy(), np.nan, s.array.asi8 / ticks_per_second)
+                tolerance = time_tolerance_seconds
+            uncertain |= np.isinf(values)
+            values = np.floor(values / tolerance) if tolerance > 0 else values
+        # order-dependent combination of the column hashes (wraps around in uint64)
+        column_hash = pd.util.hash_pandas_object(pd.Series(values, copy=False), index=False).to_numpy()
+        fingerprints = fingerprints * np.uint64(1000003) ^ column_hash
+
+    fingerprints[uncertain] = UNCERTAIN_FINGERPRINT
+    return signature, fingerprints
+
+
+def column_mismatch_mask(a: Series, b: Series,
+                         numeric_tolerance: float,
+                         time_tolerance_seconds: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compare two positionally aligned columns.
+
+    Numbers are compared with `numeric_tolerance`, timestamps with `time_tolerance_seconds`,
+    everything else by equality. Missing on both sides counts as a match.
+
+    Returns:
+        (mask, delta) where mask flags mismatching rows and delta is value_B - value_A as float
+        (seconds for timestamps, NaN for columns compared by equality)
+    """
+    both_missing = (a.isna() & b.isna()).to_numpy(dtype=bool)
+
+    if _is_plain_numeric(a) and _is_plain_numeric(b):
+        delta = (b.astype('float64') - a.astype('float64')).to_numpy(dtype='float64', na_value=np.nan)
+        mask = ~(np.abs(delta) <= numeric_tolerance)
+    elif pd.api.types.is_datetime64_any_dtype(a) and pd.api.types.is_datetime64_any_dtype(b):
+        delta = (b - a).dt.total_seconds().to_numpy(dtype='float64', na_value=np.nan)
+        mask = ~(np.abs(delta) <= time_tolerance_seconds)
+    else:
+        if isinstance(a.dtype, pd.CategoricalDtype) or isinstance(b.dtype, pd.CategoricalDtype):
+            # categoricals only compare when their categories are identical
+            a, b = a.astype(object), b.astype(object)
+        mask = ~(a == b).to_numpy(dtype=bool, na_value=False)
+        delta = np.full(len(a), np.nan)
+
+    return mask & ~both_missing, delta
+
+
+def align_on_keys(df1: DataFrame, df2: DataFrame, key_cols: List[str]) -> Dict[str, Any]:
+    """
+    Index both frames by `key_cols` and split the key space.
+
+    Duplicate keys keep their first occurrence for the value comparison; `left_rows` and
+    `right_rows` give the row position in `df1`/`df2` of every kept row.
+    """
+    left = df1.set_index(key_cols)
+    right = df2.set_index(key_cols)
+    left_rows, right_rows = np.arange(len(left)), np.arange(len(right))
+
+    duplicate_keys = int(left.index.duplicated().sum() + right.index.duplicated().sum())
+    if duplicate_keys:
+        keep_left, keep_right = ~left.index.duplicated(keep='first'), ~right.index.duplicated(keep='first')
+        left, left_rows = left[keep_left], left_rows[keep_left]
+        right, right_rows = right[keep_right], right_rows[keep_right]
+
+    return {
+        'left': left,
+        'right': right,
+        'left_rows': left_rows,
+        'right_rows': right_rows,
+        'only_in_df1': left.index.difference(right.index),
+        'only_in_df2': right.index.difference(left.index),
+        'common_keys': left.index.intersection(right.index, sort=False),
+        'duplicate_keys': duplicate_keys,
+    }
+
+
+def compare_frames(df1: DataFrame, df2: DataFrame, key_cols: List[str],
+                   numeric_tolerance: float = 0.01,
+                   time_tolerance_seconds: float = 60,
+                   fingerprints: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Dict[str, Any]:
+    """
+    Compare two flat frames on `key_cols` using array operations only.
+
+    Both frames are aligned once on the common keys; every shared column is then compared
+    as a whole and the mismatching rows are gathered into a single long-format frame.
+
+    Args:
+        fingerprints: Optional `row_fingerprints` of `df1` and `df2` (with equal signatures);
+            common rows with equal fingerprints are known to match and are not compared
+
+    Returns:
+        Dictionary with `only_in_df1`/`only_in_df2` (key indexes), `mismatches` (long frame
+        indexed by key with columns `column`, `value_A`, `value_B`, `delta`), the number of
+        compared keys, the compared columns and the number of duplicate keys dropped
+        (plus the number of `prefiltered_keys` when `fingerprints` are given)
+    """
+    aligned = align_on_keys(df1, df2, key_cols)
+    left, right, common = aligned['left'], aligned['right'], aligned['common_keys']
+    common_cols = [c for c in left.columns if c in right.columns]
+
+    left_pos, right_pos = left.index.get_indexer(common), right.index.get_indexer(common)
+    candidates = common
+    if fingerprints is not None:
+        fp1 = fingerprints[0][aligned['left_rows'][left_pos]]
+        fp2 = fingerprints[1][aligned['right_rows'][right_pos]]
+        suspicious = np.flatnonzero((fp1 != fp2) | (fp1 == UNCERTAIN_FINGERPRINT))
+        left_pos, right_pos, candidates = left_pos[suspicious], right_pos[suspicious], common.take(suspicious)
+
+    left_common = left[common_cols].take(left_pos).reset_index(drop=True)
+    right_common = right[common_cols].take(right_pos).reset_index(drop=True)
+
+    pieces = []
+    for col in common_cols:
+        a, b = left_common[col], right_common[col]
+        mask, delta = column_mismatch_mask(a, b, numeric_tolerance, time_tolerance_seconds)
+        if not mask.any():
+            continue
+        rows = np.flatnonzero(mask)
+        piece = DataFrame({
+            'column': np.full(len(rows), col, dtype=object),
+            'value_A': a.take(rows).astype(object).to_numpy(),
+            'value_B': b.take(rows).astype(object).to_numpy(),
+            'delta': delta[rows],
+        })
+        piece.index = candidates.take(rows)
+        pieces.append(piece)
+
+    mismatches = pd.concat(pieces) if pieces else empty_mismatches(common)
+
+    result = {
+        'only_in_df1': aligned['only_in_df1'],
+        'only_in_df2': aligned['only_in_df2'],
+        'mismatches': mismatches,
+        'common_keys': len(common),
+        'common_cols': common_cols,
+        'duplicate_keys': aligned['duplicate_keys'],
+    }
+    if fingerprints is not None:
+        result['prefiltered_keys'] = len(common) - len(candidates)
+    return result
+
+
+def summarize(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Derive the reconciliation metrics from a `compare_frames` result."""
+    mismatches = result['mismatches']
+    total_comparisons = result['common_keys'] * len(result['common_cols'])
+    total_mismatches = len(mismatches)
+    match_rate = 1 - (total_mismatches / total_comparisons) if total_comparisons > 0 else 0
+
+    return {
+        'matching_records': result['common_keys'] - mismatches.index.nunique(),
+        'mismatches': {
+            'only_in_df1': len(result['only_in_df1']),
+            'only_in_df2': len(result['only_in_df2']),
+            'value_mismatches': total_mismatches
+        },
+        'match_rate': match_rate
+    }
+
+
+def to_differences(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the `differences` dictionary returned by `reconcile()`."""
+    return {
+        'only_in_df1': list(result['only_in_df1']),
+        'only_in_df2': list(result['only_in_df2']),
+        'mismatches': result['mismatches'],
+        'value_mismatches': MismatchView(result['mismatches'])
+    }
+
+
+def sort_keys(index: Index) -> Index:
+    """Sort a key index the way `Index.difference` does, leaving unorderable keys as they are."""
+    try:
+        return index.sort_values()
+    except TypeError:
+        return index
+
+
+def order_mismatches(mismatches: DataFrame, common_cols: List[str],
+                     left_positions: np.ndarray) -> DataFrame:
+    """
+    Put a merged mismatch frame back in `compare_frames` order: by column, then by the
+    row position of each key in the left input (`left_positions`, one per mismatch row).
+    """
+    if not len(mismatches):
+        return mismatches
+    rank = {col: i for i, col in enumerate(common_cols)}
+    col_rank = mismatches['column'].map(rank).to_numpy()
+    return mismatches.iloc[np.lexsort((left_positions, col_rank))]
+
+
+def merge_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge `compare_frames` results computed on disjoint slices of the key space.
+
+    Every key must live in exactly one slice (e.g. hash partitions), so the merged
+    result is the concatenation of the parts.
+    """
+    if not results:
+        raise ValueError("No results to merge")
+
+    common_cols = []
+    for r in results:
+        common_cols.extend(c for c in r['common_cols'] if c not in common_cols)
+
+    mismatch_frames = [r['mismatches'] for r in results if len(r['mismatches'])]
+
+    return {
+        'only_in_df1': results[0]['only_in_df1'].append([r['only_in_df1'] for r in results[1:]]),
+        'only_in_df2': results[0]['only_in_df2'].append([r['only_in_df2'] for r in results[1:]]),
+        'mismatches': pd.concat(mismatch_frames) if mismatch_frames else results[0]['mismatches'],
+        'common_keys': sum(r['common_keys'] for r in results),
+        'common_cols': common_cols,
+        'duplicate_keys': sum(r['duplicate_keys'] for r in results),
+    }
+
+
+class MismatchView(Mapping):
+    """
+    Lazy `{column: [(key, value_A, value_B), ...]}` view over a long-format mismatch frame.
+
+    This is the shape `reconcile()` used to return; the per-column lists are only
+    materialized when a column is accessed.
+    """
+
+    def __init__(self, mismatches: DataFrame):
+        self._frame = mismatches
+        self._columns = list(pd.unique(mismatches['column']))
+        self._cache: Dict[str, List[Tuple]] = {}
+
+    def __getitem__(self, col: str) -> List[Tuple]:
+        if col not in self._cache:
+            if col not in self._columns:
+                raise KeyError(col)
+            sub = self._frame[self._frame['column'].to_numpy() == col]
+            self._cache[col] = list(zip(sub.index, sub['value_A'], sub['value_B']))
+        return self._cache[col]
+
+    def __contains__(self, col: object) -> bool:
+        return col in self._columns
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of mismatches per column, without materializing any list."""
+        counts = self._frame['column'].value_counts(sort=False)
+        return {col: int(counts[col]) for col in self._columns}
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
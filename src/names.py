@@ -0,0 +1,77 @@
+import re
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+# the titles and suffixes `jason.parse_name` recognizes, compared lowercased without dots
+TITLES = frozenset(['mr', 'mrs', 'miss', 'dr', 'prof', 'rev', 'hon'])
+SUFFIXES = frozenset(['jr', 'sr', 'i', 'ii', 'iii', 'iv', 'v', 'phd', 'md', 'esq'])
+
+NAME_FIELDS = ['first_name', 'last_name', 'middle_name', 'title', 'suffix']
+
+
+def _word_pattern(words: frozenset) -> str:
+    """
+    Tokens equal to one of `words` once lowercased and stripped of dots. Only ASCII case
+    classes are used, as str.lower() maps no other letter onto them, and a lookahead on
+    the possible first characters fails fast on the other tokens.
+    """
+    first = sorted({c for word in words for c in (word[0], word[0].upper())})
+    spelled = [r'\.*' + r'\.*'.join(f'[{c}{c.upper()}]' for c in word) + r'\.*' for word in sorted(words)]
+    return r'(?=[.' + ''.join(first) + r'])(?:' + '|'.join(spelled) + ')'
+
+
+_TITLE = _word_pattern(TITLES)
+_SUFFIX = _word_pattern(SUFFIXES)
+
+# one pass over a whitespace-normalized name (single spaces, stripped), as parse_name reads it:
+# "Last, First Middle[, Suffix]" when there is a comma, else "[Title] First [Middle ...] Last [Suffix]"
+# where the first/last token is only taken as a name when it is not a title/suffix
+_NAME = re.compile(
+    r'^(?:'
+    r'(?=[^,]*,)(?P<c_last>[^,]*?) ?, ?(?:(?P<c_first>[^ ,]+)(?: (?P<c_middle>[^ ,][^,]*?))?)? ?'
+    r'(?:,(?: ?(?P<c_suffix>' + _SUFFIX + r') ?$|.*))?'
+    r'|(?:(?P<title>' + _TITLE + r')(?: |$))?'
+    r'(?:(?!' + _SUFFIX + r'$)(?P<first>\S+)'
+    r'(?:(?: (?P<middle>\S+(?: \S+)*?))? (?!' + _SUFFIX + r'$)(?P<last>\S+))?)?'
+    r'(?: ?(?<!\S)(?P<suffix>' + _SUFFIX + r'))?'
+    r')$'
+)
+
+
+def _parse_unique(names: Series) -> DataFrame:
+    is_text = names.map(lambda name: isinstance(name, str)).astype(bool)
+    text = names[is_text].str.strip().str.replace(r'\s+', ' ', regex=True)
+    parts = text.str.extract(_NAME)
+    comma = parts['c_last'].notna()
+
+    parsed = DataFrame({
+        'first_name': parts['c_first'].where(comma, parts['first']),
+        'last_name': parts['c_last'].where(comma, parts['last']),
+        'middle_name': parts['c_middle'].where(comma, parts['middle']),
+        'title': parts['title'],
+        'suffix': parts['c_suffix'].where(comma, parts['suffix'])
+    })
+    return parsed.reindex(names.index)
+
+
+def parse_name_series(names: Series) -> DataFrame:
+    """
+    Parse a whole series of raw names, giving the same fields as `jason.parse_name`.
+
+    Each distinct raw string is parsed once and the result is spread back over its
+    repeats.
+
+    Returns:
+        Frame on the index of `names` with columns first_name, last_name, middle_name,
+        title and suffix (None where parse_name gives None)
+    """
+    codes, uniques = pd.factorize(names.astype(object), use_na_sentinel=False)
+    parsed = _parse_unique(Series(np.asarray(uniques, dtype=object), dtype=object))
+    columns = {}
+    for col in NAME_FIELDS:
+        values = parsed[col].to_numpy(dtype=object, copy=True)
+        values[pd.isna(values)] = None
+        columns[col] = values[codes]
+    return DataFrame(columns, index=names.index, dtype=object)
@@ -0,0 +1,121 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from mismatch import compare_frames, merge_results, order_mismatches, sort_keys
+from partition import partition_ids
+
+_MASKED_ARRAYS = (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)
+
+
+def encode_frame(df: DataFrame) -> Dict[str, Any]:
+    """
+    Turn a frame into plain NumPy buffers so it crosses the process boundary as raw
+    array bytes instead of one pickled Python object per cell.
+
+    Nullable extension columns travel as (values, mask), tz-aware timestamps as UTC
+    datetime64 and categoricals as codes. String/object columns stay object arrays.
+    """
+    columns = []
+    for col in df.columns:
+        s = df[col]
+        dtype = s.dtype
+        entry = {'name': col, 'dtype': dtype, 'mask': None}
+        if isinstance(dtype, pd.CategoricalDtype):
+            entry['values'] = s.cat.codes.to_numpy()
+        elif isinstance(dtype, pd.DatetimeTZDtype):
+            entry['values'] = s.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy()
+        elif isinstance(s.array, _MASKED_ARRAYS):
+            entry['mask'] = s.isna().to_numpy()
+            entry['values'] = s.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+        else:
+            entry['values'] = s.to_numpy()
+        columns.append(entry)
+    return {'columns': columns, 'length': len(df)}
+
+
+def decode_frame(payload: Dict[str, Any]) -> DataFrame:
+    """Rebuild a frame produced by `encode_frame` with its original dtypes."""
+    data = {}
+    for entry in payload['columns']:
+        dtype, values = entry['dtype'], entry['values']
+        if isinstance(dtype, pd.CategoricalDtype):
+            s = pd.Series(pd.Categorical.from_codes(values, dtype=dtype))
+        elif isinstance(dtype, pd.DatetimeTZDtype):
+            s = pd.Series(values).dt.tz_localize('UTC').dt.tz_convert(dtype.tz)
+        elif entry['mask'] is not None:
+            s = pd.Series(values).astype(dtype).mask(entry['mask'])
+        else:
+            s = pd.Series(values, dtype=dtype)
+        data[entry['name']] = s
+    if not data:
+        return DataFrame(index=range(payload['length']))
+    return DataFrame(data)
+
+
+def _compare_shard(left: Dict[str, Any], left_positions: np.ndarray, right: Dict[str, Any],
+                   key_cols: List[str], numeric_tolerance: float,
+                   time_tolerance_seconds: float) -> Dict[str, Any]:
+    """Worker: compare one shard and tag each mismatch with its row position in the left input."""
+    df1, df2 = decode_frame(left), decode_frame(right)
+    result = compare_frames(df1, df2, key_cols,
+                            numeric_tolerance=numeric_tolerance,
+                            time_tolerance_seconds=time_tolerance_seconds)
+
+    left_index = df1.set_index(key_cols).index
+    first = ~left_index.duplicated(keep='first')
+    rows = left_index[first].get_indexer(result['mismatches'].index)
+    result['left_positions'] = left_positions[first][rows]
+    return result
+
+
+def _shard_rows(df: DataFrame, key_cols: List[str], n_shards: int) -> List[np.ndarray]:
+    """Row positions of each shard, in their original order."""
+    ids = partition_ids(df, key_cols, n_shards)
+    order = np.argsort(ids, kind='stable')
+    bounds = np.searchsorted(ids[order], np.arange(1, n_shards))
+    return np.split(order, bounds)
+
+
+def reconcile_parallel(df1: DataFrame, df2: DataFrame, key_cols: List[str],
+                       workers: int,
+                       n_shards: Optional[int] = None,
+                       numeric_tolerance: float = 0.01,
+                       time_tolerance_seconds: float = 60) -> Dict[str, Any]:
+    """
+    Compare two frames by splitting the key space into hash shards and reconciling the
+    shards in a `ProcessPoolExecutor`.
+
+    The merged result is put back in the order `compare_frames` produces on the whole
+    frames (keys sorted, mismatches by column then by row order of `df1`), so it is
+    identical to the serial path.
+
+    Args:
+        workers: Number of worker processes
+        n_shards: Number of key shards (defaults to `workers`)
+    """
+    n_shards = n_shards or workers
+    shards1 = _shard_rows(df1, key_cols, n_shards)
+    shards2 = _shard_rows(df2, key_cols, n_shards)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_compare_shard,
+                        encode_frame(df1.take(rows1)), rows1,
+                        encode_frame(df2.take(rows2)),
+                        key_cols, numeric_tolerance, time_tolerance_seconds)
+            for rows1, rows2 in zip(shards1, shards2)
+        ]
+        results = [f.result() for f in futures]
+
+    merged = merge_results(results)
+    merged['common_cols'] = [c for c in df1.columns if c in df2.columns and c not in key_cols]
+    merged['only_in_df1'] = sort_keys(merged['only_in_df1'])
+    merged['only_in_df2'] = sort_keys(merged['only_in_df2'])
+
+    positions = np.concatenate([r['left_positions'] for r in results])
+    merged['mismatches'] = order_mismatches(merged['mismatches'], merged['common_cols'], positions)
+    return merged
@@ -0,0 +1,141 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+from pandas import DataFrame
+
+from mismatch import compare_frames, merge_results
+
+
+def partition_ids(df: DataFrame, key_cols: List[str], n_partitions: int):
+    """Assign every row to a partition by hashing its key columns."""
+    hashes = pd.util.hash_pandas_object(df[key_cols], index=False).to_numpy()
+    return hashes % n_partitions
+
+
+class PartitionSpill:
+    """
+    On-disk hash partitions for one side of a reconciliation.
+
+    Chunks are split by key hash and each slice is pickled to its own file, so any
+    key only ever lives in a single partition and the whole side never has to fit in memory.
+    """
+
+    def __init__(self, spill_dir: str, side: str, key_cols: List[str], n_partitions: int):
+        self.spill_dir = spill_dir
+        self.side = side
+        self.key_cols = key_cols
+        self.n_partitions = n_partitions
+        self.files: Dict[int, List[str]] = {}
+        self.columns: List[str] = []
+        self.rows = 0
+        self._chunks = 0
+
+    def add(self, chunk: DataFrame) -> None:
+        """Split `chunk` by partition and write each non-empty slice to disk."""
+        if chunk.empty:
+            return
+        for col in chunk.columns:
+            if col not in self.columns:
+                self.columns.append(col)
+
+        parts = partition_ids(chunk, self.key_cols, self.n_partitions)
+        for p, piece in chunk.groupby(parts, sort=True):
+            path = os.path.join(self.spill_dir, f"{self.side}_p{int(p):05d}_c{self._chunks:06d}.pkl")
+            piece.reset_index(drop=True).to_pickle(path)
+            self.files.setdefault(int(p), []).append(path)
+
+        self.rows += len(chunk)
+        self._chunks += 1
+
+    def load(self, partition: int) -> DataFrame:
+        """Read one partition back (an empty frame with the known columns if it has no rows)."""
+        return load_partition(self.files.get(partition, []), self.columns or self.key_cols)
+
+
+def load_partition(paths: List[str], columns: List[str]) -> DataFrame:
+    """Concatenate the spilled pieces of one partition."""
+    if not paths:
+        return DataFrame(columns=columns)
+    frames = [pd.read_pickle(path) for path in paths]
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def _compare_partition(left_paths: List[str], left_columns: List[str],
+                       right_paths: List[str], right_columns: List[str],
+                       key_cols: List[str], numeric_tolerance: float,
+                       time_tolerance_seconds: float) -> Dict[str, Any]:
+    """Worker: load one partition pair from disk and compare it."""
+    return compare_frames(
+        load_partition(left_paths, left_columns),
+        load_partition(right_paths, right_columns),
+        key_cols,
+        numeric_tolerance=numeric_tolerance,
+        time_tolerance_seconds=time_tolerance_seconds
+    )
+
+
+def reconcile_partitioned(left_chunks: Iterator[DataFrame],
+                          right_chunks: Iterator[DataFrame],
+                          key_cols: List[str],
+                          spill_dir: str,
+                          n_partitions: int = 64,
+                          numeric_tolerance: float = 0.01,
+                          time_tolerance_seconds: float = 60,
+                          workers: int = 1,
+                          on_partition: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Out-of-core reconciliation: spill both sides into hash partitions, then compare
+    partition pairs one at a time and merge their results.
+
+    Peak memory is roughly one partition of each side, i.e. about (file size / n_partitions).
+
+    Args:
+        left_chunks, right_chunks: Iterators of flat, already-cast DataFrame chunks
+        key_cols: Key columns used both for hashing and for the comparison
+        spill_dir: Existing directory for the partition files (the caller owns cleanup)
+        n_partitions: Number of hash partitions
+        workers: Number of processes comparing partition pairs concurrently
+        on_partition: Optional callback invoked with (partition, result) after each pair
+
+    Returns:
+        A `compare_frames`-shaped result with `rows_df1`/`rows_df2` added
+    """
+    left = PartitionSpill(spill_dir, 'A', key_cols, n_partitions)
+    right = PartitionSpill(spill_dir, 'B', key_cols, n_partitions)
+    for chunk in left_chunks:
+        left.add(chunk)
+    for chunk in right_chunks:
+        right.add(chunk)
+
+    partitions = sorted(set(left.files) | set(right.files))
+    jobs = [
+        (left.files.get(p, []), left.columns or key_cols,
+         right.files.get(p, []), right.columns or key_cols,
+         key_cols, numeric_tolerance, time_tolerance_seconds)
+        for p in partitions
+    ]
+
+    results = []
+    if workers > 1:
+        # workers read their partition straight from disk, nothing but paths is shipped
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for p, result in zip(partitions, pool.map(_compare_partition, *zip(*jobs))):
+                if on_partition:
+                    on_partition(p, result)
+                results.append(result)
+    else:
+        for p, job in zip(partitions, jobs):
+            result = _compare_partition(*job)
+            if on_partition:
+                on_partition(p, result)
+            results.append(result)
+
+    if results:
+        merged = merge_results(results)
+    else:
+        merged = compare_frames(DataFrame(columns=key_cols), DataFrame(columns=key_cols), key_cols)
+    merged['rows_df1'] = left.rows
+    merged['rows_df2'] = right.rows
+    return merged
@@ -0,0 +1,158 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from canonical import canonical_dumps, load_canonical, write_canonical
+from flatten import flatten_records
+from jsonl import is_jsonl
+from streaming import concat_chunks, flatten_document, iter_json_batches
+from validation import ItemValidator, document_errors, item_schema
+
+
+class InputPipeline:
+    """
+    Run every input file through a chain of stages concurrently.
+
+    Each file gets its own thread that walks the stages in order, so file B can be
+    canonicalized while file A is being validated. Stages are called on the thread
+    (good for subprocesses and I/O); CPU-bound work such as parsing is pushed to a shared
+    process pool with `in_process`.
+    """
+
+    def __init__(self, process_workers: Optional[int] = None):
+        self.process_workers = process_workers
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    def in_process(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a picklable, module-level `fn` in the process pool and wait for its result."""
+        if self._processes is None:
+            return fn(*args, **kwargs)
+        return self._processes.submit(fn, *args, **kwargs).result()
+
+    def run(self, files: List[str],
+            stages: List[Tuple[str, Callable[[Any], Any]]]) -> Tuple[List[Any], Dict[str, Dict[str, float]]]:
+        """
+        Feed each file through `stages`; every stage receives the previous stage's output.
+
+        Returns:
+            (final output per file in input order, {file: {stage: seconds}})
+        """
+        def chain(path: str) -> Tuple[Any, Dict[str, float]]:
+            timings = {}
+            value = path
+            for name, stage in stages:
+                start = time.perf_counter()
+                value = stage(value)
+                timings[name] = time.perf_counter() - start
+            return value, timings
+
+        with ProcessPoolExecutor(max_workers=self.process_workers or len(files)) as processes:
+            self._processes = processes
+            try:
+                with ThreadPoolExecutor(max_workers=len(files)) as threads:
+                    futures = [threads.submit(chain, path) for path in files]
+                    results = [f.result() for f in futures]
+            finally:
+                self._processes = None
+
+        return [value for value, _ in results], {path: t for path, (_, t) in zip(files, results)}
+
+
+def prepare_file(path: str, schema: Dict, chunk_size: int, stream_threshold_mb: float,
+                 array_key: Optional[str] = None, canonical_out: Optional[str] = None,
+                 validation: Optional[Dict] = None, workers: int = 1, **normalize_kwargs) -> Dict[str, Any]:
+    """
+    Parse `path` once and canonicalize, validate and flatten the parsed object in-process.
+
+    Keys are sorted while parsing, the schema is checked on the object and the same
+    object is flattened (by the flattener compiled from the schema), so the file is read
+    a single time and no canonical copy has to hit the disk unless `canonical_out` is
+    given. With `workers` > 1 the file is parsed in byte ranges over that many processes
+    whatever its size (see `canonical.load_json`). Otherwise files above
+    `stream_threshold_mb` are streamed in `chunk_size` batches and validated record by
+    record (their canonical copy only holds the array). JSON Lines inputs are read line
+    by line and their canonical copy is written as JSON lines too. `validation` holds the
+    sampling/early-exit options of `validation.document_errors`.
+
+    Runs in a worker process, so it returns plain data instead of logging or raising
+    on schema errors.
+
+    Returns:
+        Dictionary with `dataframe`, `n_errors`, `messages` (first schema errors) and
+        `timings` ({stage: seconds})
+    """
+    timings = {'canonicalize': 0.0, 'validate': 0.0, 'load_and_flatten': 0.0}
+    validation = validation or {}
+
+    if workers > 1 or os.path.getsize(path) <= stream_threshold_mb * 1024 * 1024:
+        start = time.perf_counter()
+        data = load_canonical(path, array_key=array_key, workers=workers)
+        timings['canonicalize'] = time.perf_counter() - start
+
+        n_errors, messages = 0, []
+        if schema:
+            start = time.perf_counter()
+            n_errors, messages = document_errors(data, schema, array_key=array_key, **validation)
+            timings['validate'] = time.perf_counter() - start
+
+        if canonical_out:
+            start = time.perf_counter()
+            write_canonical(data, canonical_out, array_key=array_key)
+            timings['write_canonical'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        df = flatten_document(data, array_key=array_key, schema=schema, **normalize_kwargs)
+        timings['load_and_flatten'] = time.perf_counter() - start
+        return {'dataframe': df, 'n_errors': n_errors, 'messages': messages, 'timings': timings}
+
+    # large file: one streaming pass that canonicalizes, validates, writes and flattens each batch
+    # streamed batches are validated in this process as they are parsed
+    stream_options = {k: v for k, v in validation.items() if k != 'workers'}
+    validator = ItemValidator(item_schema(schema, array_key), **stream_options) if schema else None
+    out = open(canonical_out, 'w', encoding='utf-8') if canonical_out else None
+    lines = bool(canonical_out) and is_jsonl(canonical_out)
+    chunks = []
+    try:
+        if out and not lines:
+            out.write('{' + json.dumps(array_key) + ':[' if array_key is not None else '[')
+        batches = iter_json_batches(path, chunk_size, array_key=array_key, canonical=True)
+        first = True
+        while True:
+            start = time.perf_counter()
+            batch = next(batches, None)
+            timings['canonicalize'] += time.perf_counter() - start
+            if batch is None:
+                break
+
+            if validator and not validator.done:
+                start = time.perf_counter()
+                validator.validate(batch)
+                timings['validate'] += time.perf_counter() - start
+
+            if out:
+                start = time.perf_counter()
+                for item in batch:
+                    if lines:
+                        out.write(canonical_dumps(item) + '\n')
+                    else:
+                        out.write(('' if first else ',') + canonical_dumps(item))
+                    first = False
+                timings['write_canonical'] = timings.get('write_canonical', 0.0) + time.perf_counter() - start
+
+            start = time.perf_counter()
+            chunks.append(flatten_records(batch, schema=schema, array_key=array_key, **normalize_kwargs))
+            timings['load_and_flatten'] += time.perf_counter() - start
+        if out and not lines:
+            out.write(']}' if array_key is not None else ']')
+    finally:
+        if out:
+            out.close()
+
+    return {
+        'dataframe': concat_chunks(iter(chunks)),
+        'n_errors': validator.n_errors if validator else 0,
+        'messages': validator.messages if validator else [],
+        'timings': timings
+    }
@@ -1,11 +1,12 @@
 
-import json
-import subprocess         
 import pandas as pd
-from pandas import json_normalize
-from jsonschema import Draft7Validator
 import datetime
 
+from canonical import canonical_path, load_canonical, write_canonical
+from pipeline import InputPipeline, prepare_file
+from streaming import load_flattened
+from validation import schema_errors
+
 # step 1: canonicalize json on disk (structural normalization).  jq sorts keys and strips extraneous whitespace → repeatable, git‑friendly files.
 
 # step 2: schema validation with minimal schema to enforce presence/type of crucial fields. 
@@ -30,7 +31,6 @@ import datetime
 # both[both["ts_diff"] != datetime.timedelta(0)].to_csv("report_ts_mismatch.csv", index=False)
 
 # TODO: step 8 automate & schedule
-# TODO: add fuzzy matching for names.
 # TODO: add support for multiple types of schemas or json files types so that i can actually use this with different structures. 
 
 schema = {
@@ -92,30 +92,33 @@ class Reconciliation:
         }
 
     def jq_canonicalize(self):
+        # canonicalize in-process now (sorted keys, no extra whitespace), jq is no longer needed
         for file in self.files:
-            out = file.replace(".json", "_canon.json")
-            subprocess.run(
-                f"jq --sort-keys . {file} > {out}",
-                shell=True, check=True
-            )
-            self.canon_files.append(out)
+            self.canon_files.append(self.canonicalize_file(file))
+
+    def canonicalize_file(self, file):
+        out = canonical_path(file)
+        write_canonical(load_canonical(file), out)
+        return out
 
     def validate_with_schema(self):
         if self.canon_files:
             for canon in self.canon_files:
-                data = json.load(open(canon))
-                errors = list(Draft7Validator(self.schema).iter_errors(data))
-                if errors: 
-                    print(f"Error while validating with schema: {canon}")
-                    for e in errors[:5]:
-                        print(" ", e.message)
-                    raise SystemExit(1)
-                else:
-                    print("no errors found! we are good to move on")
+                self.validate_file(canon)
+
+    def validate_file(self, canon):
+        n_errors, messages = schema_errors(canon, self.schema)
+        if n_errors: 
+            print(f"Error while validating with schema: {canon}")
+            for message in messages:
+                print(" ", message)
+            raise SystemExit(1)
+        else:
+            print("no errors found! we are good to move on")
+        return canon
 
     def load_and_flatten(self, path):
-        data = json.load(open(path))
-        df = json_normalize(data, record_path="orders", meta=[["customer", "id"], ["customer", "name"]], record_prefix="order_", meta_prefix="cust_")
+        df = load_flattened(path, self.config['chunk_size'], float('inf'), schema=self.schema, record_path="orders", meta=[["customer", "id"], ["customer", "name"]], record_prefix="order_", meta_prefix="cust_")
         # we are extracting "orders" and normalizing it.
         # meta = additional fields to normalize (extracts customer's id and name) 
         # string to prepend to column names from the normalized records 
@@ -123,6 +126,29 @@ class Reconciliation:
         self.dataframes.append(df)
         return df
 
+    def prepare_inputs(self):
+        # canonicalize -> validate -> load for every file at the same time.
+        # one thread per file hands the whole chain to a worker process so each file is parsed once
+        pipeline = InputPipeline()
+
+        def prepare(file):
+            out = canonical_path(file)
+            result = pipeline.in_process(prepare_file, file, self.schema, self.config['chunk_size'], float('inf'), canonical_out=out, record_path="orders", meta=[["customer", "id"], ["customer", "name"]], record_prefix="order_", meta_prefix="cust_")
+            if result['n_errors']:
+                print(f"Error while validating with schema: {out}")
+                for message in result['messages']:
+                    print(" ", message)
+                raise SystemExit(1)
+            print("no errors found! we are good to move on")
+            return out, result
+
+        outputs, _ = pipeline.run(self.files, [("prepare", prepare)])
+        self.metrics['stage_timings'] = {}
+        for file, (canon, result) in zip(self.files, outputs):
+            self.canon_files.append(canon)
+            self.dataframes.append(result['dataframe'])
+            self.metrics['stage_timings'][file] = result['timings']
+
     def clean_and_cast(self):
         if self.dataframes:
             for df in self.dataframes:
@@ -143,10 +169,7 @@ class Reconciliation:
 
     def report(self):
         # this function will call the rest of the functions and create a report that summarizes the result
-        self.jq_canonicalize()
-        self.validate_with_schema()
-        for file in self.canon_files:
-            self.load_and_flatten(file)
+        self.prepare_inputs()
         self.clean_and_cast()
         merged_objects = self.merge_flag_diffs(self.dataframes[0], self.dataframes[1])
 
@@ -0,0 +1,278 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+import pandas as pd
+from pandas import DataFrame
+
+from byteranges import iter_array_chunks
+from canonical import canonical_dumps, load_json, sorted_object
+from flatten import flatten_records
+from jsonl import is_jsonl, iter_jsonl, iter_jsonl_batches, line_ranges
+from validation import ItemValidator, item_schema
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _Reader:
+    """Sliding text buffer over a file that only keeps the unparsed tail in memory."""
+
+    def __init__(self, f: TextIO, buffer_size: int):
+        self.f = f
+        self.buffer_size = buffer_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read more text, dropping everything already consumed. Returns False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.buffer_size)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+        return bool(chunk)
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ('' at end of file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(f"Expected '{char}'", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self, decoder: json.JSONDecoder) -> Any:
+        """Decode the next complete JSON value, reading more text until it fits in the buffer."""
+        self.peek()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(self.buf, self.pos)
+                # a number cut at the buffer edge ("4." of "4.5") decodes fine, so only trust
+                # the value once a delimiter follows it
+                nxt = end
+                while nxt < len(self.buf) and self.buf[nxt] in _WHITESPACE:
+                    nxt += 1
+                if self.eof or (nxt < len(self.buf) and self.buf[nxt] in ',:]}'):
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def iter_json_array(path: str, array_key: Optional[str] = None,
+                    buffer_size: int = 1 << 16, canonical: bool = False) -> Iterator[Any]:
+    """
+    Yield the items of a JSON array one at a time without loading the whole file.
+
+    Args:
+        path: JSON file whose top level is an array, or an object holding the array
+        array_key: Top-level key of the array to walk (e.g. 'customers'); None for a top-level array
+        buffer_size: Number of characters read from disk at a time
+        canonical: Sort the keys of every object while parsing
+
+    A JSON Lines file (`.jsonl`/`.ndjson`) is read one line at a time instead; its lines are
+    the records, so `array_key` does not apply to it.
+    """
+    if is_jsonl(path):
+        yield from iter_jsonl(path, object_pairs_hook=sorted_object if canonical else None)
+        return
+
+    decoder = json.JSONDecoder(object_pairs_hook=sorted_object if canonical else None)
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = _Reader(f, buffer_size)
+
+        if array_key is not None:
+            # skip over the sibling members until we reach the wanted array
+            reader.expect('{')
+            while True:
+                if reader.peek() == '}':
+                    return
+                key = reader.value(decoder)
+                reader.expect(':')
+                if key == array_key:
+                    break
+                reader.value(decoder)
+                if reader.peek() == ',':
+                    reader.pos += 1
+
+        reader.expect('[')
+        if reader.peek() == ']':
+            return
+        while True:
+            yield reader.value(decoder)
+            nxt = reader.peek()
+            if nxt == ',':
+                reader.pos += 1
+            elif nxt == ']':
+                return
+            else:
+                raise json.JSONDecodeError("Expected ',' or ']'", reader.buf, reader.pos)
+
+
+def iter_json_batches(path: str, batch_size: int, array_key: Optional[str] = None,
+                      canonical: bool = False) -> Iterator[List[Any]]:
+    """Group the streamed array items into lists of at most `batch_size` records."""
+    batch = []
+    for item in iter_json_array(path, array_key=array_key, canonical=canonical):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_canonical_stream(path: str, out: str, array_key: Optional[str] = None) -> int:
+    """
+    Write the canonical copy of a large file record by record, so only one record is in memory.
+
+    The copy only holds the array (under `array_key` when given); a JSON Lines `out` gets one
+    record per line. Returns the number of records written.
+    """
+    lines = is_jsonl(out)
+    n = 0
+    with open(out, 'w', encoding='utf-8') as f:
+        if not lines:
+            f.write('{' + json.dumps(array_key) + ':[' if array_key is not None else '[')
+        for item in iter_json_array(path, array_key=array_key, canonical=True):
+            if lines:
+                f.write(canonical_dumps(item) + '\n')
+            else:
+                f.write((',' if n else '') + canonical_dumps(item))
+            n += 1
+        if not lines:
+            f.write(']}' if array_key is not None else ']')
+    return n
+
+
+def stream_schema_errors(path: str, schema: Dict, chunk_size: int, limit: int = 5,
+                         array_key: Optional[str] = None, max_errors: Optional[int] = None,
+                         sample_every: Optional[int] = None, sample_fraction: Optional[float] = None,
+                         seed: int = 0, workers: int = 1) -> Tuple[int, List[str]]:
+    """
+    Validate the records of a large file batch by batch against the record schema, as
+    `pipeline.prepare_file` does for streamed files. `workers` is accepted for symmetry with
+    `validation.document_errors` but streamed batches are validated in this process.
+
+    Returns:
+        (number of errors found, messages of the first `limit` errors)
+    """
+    validator = ItemValidator(item_schema(schema, array_key), limit=limit, max_errors=max_errors,
+                              sample_every=sample_every, sample_fraction=sample_fraction, seed=seed)
+    for batch in iter_json_batches(path, chunk_size, array_key=array_key):
+        validator.validate(batch)
+        if validator.done:
+            break
+    return validator.n_errors, validator.messages
+
+
+def iter_normalized_chunks(path: str, chunk_size: int, array_key: Optional[str] = None,
+                           canonical: bool = False, schema: Optional[Dict] = None,
+                           **normalize_kwargs) -> Iterator[DataFrame]:
+    """
+    Stream a JSON array and yield `json_normalize`d DataFrames of `chunk_size` records.
+
+    Only one batch of parsed records is alive at a time, so peak memory follows the
+    chunk rather than the file. `normalize_kwargs` are passed to `json_normalize`, or to
+    the flattener compiled from the document `schema` when one is given.
+    """
+    for batch in iter_json_batches(path, chunk_size, array_key=array_key, canonical=canonical):
+        yield flatten_records(batch, schema=schema, array_key=array_key, **normalize_kwargs)
+
+
+def concat_chunks(chunks: Iterator[DataFrame]) -> DataFrame:
+    """Concatenate streamed chunks into one frame (an empty frame if there were none)."""
+    frames = list(chunks)
+    if not frames:
+        return DataFrame()
+    result = pd.concat(frames, ignore_index=True)
+    # a chunk where a column is entirely null comes out as object and drags the merged column
+    # to object; re-infer only those columns so the result matches a single json_normalize
+    for col in result.columns:
+        if result[col].dtype == object and any(
+                col in f.columns and f[col].dtype != object for f in frames):
+            result[col] = result[col].infer_objects()
+    return result
+
+
+def flatten_document(data: Any, array_key: Optional[str] = None, schema: Optional[Dict] = None,
+                     **normalize_kwargs) -> DataFrame:
+    """Flatten an already parsed document (the array itself, or the object holding it under `array_key`)."""
+    if array_key is not None:
+        data = data[array_key]
+    return flatten_records(data, schema=schema, array_key=array_key, **normalize_kwargs)
+
+
+def _flatten_line_range(path: str, start: int, end: int, chunk_size: int, canonical: bool,
+                        schema: Optional[Dict], array_key: Optional[str], normalize_kwargs: Dict) -> DataFrame:
+    """Flatten the JSON lines between byte offsets `start` and `end`, `chunk_size` records at a time."""
+    batches = iter_jsonl_batches(path, chunk_size, object_pairs_hook=sorted_object if canonical else None,
+                                 start=start, end=end)
+    return concat_chunks(flatten_records(batch, schema=schema, array_key=array_key, **normalize_kwargs)
+                         for batch in batches)
+
+
+def load_jsonl_flattened(path: str, chunk_size: int, workers: int = 1, canonical: bool = False,
+                         schema: Optional[Dict] = None, array_key: Optional[str] = None,
+                         **normalize_kwargs) -> DataFrame:
+    """
+    Load and flatten a JSON Lines file in `chunk_size` record chunks.
+
+    With `workers` > 1 the file is split at line boundaries into one byte range per worker
+    and the ranges are parsed and flattened in a process pool; the chunks are concatenated
+    in file order, so the result is the same as with a single worker. `array_key` only
+    selects the flattener compiled from `schema`, the lines themselves are the records.
+    """
+    ranges = line_ranges(path, workers) if workers > 1 else [(0, os.path.getsize(path))]
+    args = (chunk_size, canonical, schema, array_key, normalize_kwargs)
+    if len(ranges) <= 1:
+        return concat_chunks(_flatten_line_range(path, start, end, *args) for start, end in ranges)
+
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [pool.submit(_flatten_line_range, path, start, end, *args) for start, end in ranges]
+        return concat_chunks(f.result() for f in futures)
+
+
+def load_flattened(path: str, chunk_size: int, stream_threshold_mb: float,
+                   array_key: Optional[str] = None, canonical: bool = False,
+                   schema: Optional[Dict] = None, workers: int = 1, **normalize_kwargs) -> DataFrame:
+    """
+    Load and flatten a JSON array file, streaming it when it is larger than `stream_threshold_mb`.
+
+    JSON Lines files are always read line by line, in parallel over `workers` processes
+    (see `load_jsonl_flattened`). With `workers` > 1 a JSON array file is memory-mapped and
+    parsed and flattened in byte ranges of whole records in a process pool instead (see
+    `byteranges.iter_array_chunks`). This is a plain function (no logger, no instance state)
+    so it can run in a worker process.
+    """
+    if is_jsonl(path):
+        return load_jsonl_flattened(path, chunk_size, workers=workers, canonical=canonical,
+                                    schema=schema, array_key=array_key, **normalize_kwargs)
+
+    if workers > 1:
+        flatten = partial(flatten_records, schema=schema, array_key=array_key, **normalize_kwargs)
+        return concat_chunks(iter_array_chunks(path, workers, array_key=array_key,
+                                               object_pairs_hook=sorted_object if canonical else None,
+                                               transform=flatten))
+
+    if os.path.getsize(path) > stream_threshold_mb * 1024 * 1024:
+        return concat_chunks(iter_normalized_chunks(path, chunk_size, array_key=array_key,
+                                                    canonical=canonical, schema=schema,
+                                                    **normalize_kwargs))
+
+    data = load_json(path, object_pairs_hook=sorted_object if canonical else None)
+    return flatten_document(data, array_key=array_key, schema=schema, **normalize_kwargs)
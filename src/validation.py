@@ -0,0 +1,200 @@
+import hashlib
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from jsonschema import Draft7Validator
+
+from canonical import canonical_dumps, load_json
+
+# compiled validators by schema hash, shared by every file validated in this process
+_VALIDATORS: Dict[str, Draft7Validator] = {}
+
+
+def schema_hash(schema: Dict) -> str:
+    return hashlib.sha256(canonical_dumps(schema).encode('utf-8')).hexdigest()
+
+
+def compiled_validator(schema: Dict) -> Draft7Validator:
+    """Return the validator for `schema`, checking and compiling it only the first time it is seen."""
+    key = schema_hash(schema)
+    if key not in _VALIDATORS:
+        Draft7Validator.check_schema(schema)
+        _VALIDATORS[key] = Draft7Validator(schema)
+    return _VALIDATORS[key]
+
+
+def sample_items(items: Iterable[Any], every: Optional[int] = None,
+                 fraction: Optional[float] = None, seed: int = 0) -> Iterator[Any]:
+    """
+    Yield every `every`-th item, or a random `fraction` of the items (reproducible with
+    `seed`), or all of them when neither is set.
+    """
+    if every:
+        return islice(items, 0, None, every)
+    if fraction is not None:
+        rng = random.Random(seed)
+        return (item for item in items if rng.random() < fraction)
+    return iter(items)
+
+
+def _collect(errors: Iterable[Any], limit: int, max_errors: Optional[int]) -> Tuple[int, List[str]]:
+    """Count `errors` (stopping at `max_errors`) and keep the messages of the first `limit`."""
+    n_errors, messages = 0, []
+    for error in islice(errors, max_errors):
+        n_errors += 1
+        if len(messages) < limit:
+            messages.append(error.message)
+    return n_errors, messages
+
+
+def _chunk_errors(schema: Dict, items: List[Any], limit: int,
+                  max_errors: Optional[int]) -> Tuple[int, List[str]]:
+    """Worker: validate one chunk of records."""
+    validator = compiled_validator(schema)
+    errors = (error for item in items for error in validator.iter_errors(item))
+    return _collect(errors, limit, max_errors)
+
+
+def items_errors(items: Sequence[Any], schema: Dict, limit: int = 5,
+                 max_errors: Optional[int] = None, workers: int = 1,
+                 chunk_size: int = 1000) -> Tuple[int, List[str]]:
+    """
+    Validate records against the record `schema`, in `chunk_size` chunks spread over
+    `workers` processes when `workers` > 1.
+
+    Chunks are collected in order and the remaining ones are cancelled as soon as
+    `max_errors` errors have been found.
+    """
+    if workers <= 1:
+        return _chunk_errors(schema, list(items), limit, max_errors)
+
+    n_errors, messages = 0, []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_chunk_errors, schema, list(items[i:i + chunk_size]), limit, max_errors)
+                   for i in range(0, len(items), chunk_size)]
+        for future in futures:
+            chunk_errors, chunk_messages = future.result()
+            n_errors += chunk_errors
+            messages.extend(chunk_messages[:limit - len(messages)])
+            if max_errors is not None and n_errors >= max_errors:
+                for pending in futures:
+                    pending.cancel()
+                return max_errors, messages
+    return n_errors, messages
+
+
+def document_errors(data: Any, schema: Dict, limit: int = 5, array_key: Optional[str] = None,
+                    max_errors: Optional[int] = None, sample_every: Optional[int] = None,
+                    sample_fraction: Optional[float] = None, seed: int = 0,
+                    workers: int = 1) -> Tuple[int, List[str]]:
+    """
+    Validate an already parsed document against `schema`.
+
+    By default the whole document is checked, stopping after `max_errors` errors. When
+    sampling (`sample_every`/`sample_fraction`) or `workers` > 1 is requested, the document
+    is first checked once against `schema` without its record constraints (see
+    `envelope_schema`), then the records of the array (the document itself, or its
+    `array_key` member) are checked against the record schema, as when a file is streamed.
+    A document whose array is not a list is reported as an error and its records are skipped.
+
+    Returns:
+        (number of errors found, messages of the first `limit` errors)
+    """
+    if not (sample_every or sample_fraction is not None or workers > 1):
+        return _collect(compiled_validator(schema).iter_errors(data), limit, max_errors)
+
+    n_errors, messages = _collect(compiled_validator(envelope_schema(schema, array_key)).iter_errors(data),
+                                  limit, max_errors)
+    if array_key is None:
+        items = data
+    else:
+        items = data.get(array_key) if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        if not n_errors:
+            where = 'the document' if array_key is None else f"'{array_key}'"
+            n_errors, messages = 1, [f"{where} is not an array"][:limit]
+        return n_errors, messages
+    if max_errors is not None and n_errors >= max_errors:
+        return n_errors, messages
+
+    items = list(sample_items(items, every=sample_every, fraction=sample_fraction, seed=seed))
+    item_count, item_messages = items_errors(
+        items, item_schema(schema, array_key), limit=limit,
+        max_errors=max_errors - n_errors if max_errors is not None else None, workers=workers)
+    return n_errors + item_count, messages + item_messages[:limit - len(messages)]
+
+
+def schema_errors(path: str, schema: Dict, limit: int = 5, **options) -> Tuple[int, List[str]]:
+    """Validate a JSON (or JSON Lines) file against `schema`. See `document_errors` for the `options`."""
+    data = load_json(path, array_key=options.get('array_key'))
+    return document_errors(data, schema, limit, **options)
+
+
+def item_schema(schema: Dict, array_key: Optional[str] = None) -> Dict:
+    """
+    The schema of a single record of the validated array, used when the array is streamed.
+
+    Only constraints on the records are kept; anything declared on the enclosing document is not checked.
+    """
+    if array_key is not None:
+        schema = schema.get('properties', {}).get(array_key, {})
+    return schema.get('items', {})
+
+
+def envelope_schema(schema: Dict, array_key: Optional[str] = None) -> Dict:
+    """
+    `schema` without the constraints on the records of the validated array, so the document
+    around them (its type, `minItems`, other members, ...) can be checked once on its own.
+    """
+    if array_key is None:
+        return {k: v for k, v in schema.items() if k not in ('items', 'additionalItems')}
+    properties = schema.get('properties', {})
+    if array_key not in properties:
+        return schema
+    return {**schema, 'properties': {**properties, array_key: envelope_schema(properties[array_key])}}
+
+
+class ItemValidator:
+    """
+    Accumulates the errors of records validated one batch at a time.
+
+    Sampling follows the position of each record in the whole stream, and once
+    `max_errors` errors have been found the remaining batches are skipped (`done`).
+    """
+
+    def __init__(self, schema: Dict, limit: int = 5, max_errors: Optional[int] = None,
+                 sample_every: Optional[int] = None, sample_fraction: Optional[float] = None,
+                 seed: int = 0):
+        self.validator = compiled_validator(schema)
+        self.limit = limit
+        self.max_errors = max_errors
+        self.sample_every = sample_every
+        self.sample_fraction = sample_fraction
+        self.rng = random.Random(seed)
+        self.seen = 0
+        self.n_errors = 0
+        self.messages: List[str] = []
+
+    @property
+    def done(self) -> bool:
+        return self.max_errors is not None and self.n_errors >= self.max_errors
+
+    def _sampled(self, items: Iterable[Any]) -> Iterator[Any]:
+        for item in items:
+            position, self.seen = self.seen, self.seen + 1
+            if self.sample_every and position % self.sample_every:
+                continue
+            if self.sample_fraction is not None and self.rng.random() >= self.sample_fraction:
+                continue
+            yield item
+
+    def validate(self, items: Iterable[Any]) -> None:
+        for item in self._sampled(items):
+            for error in self.validator.iter_errors(item):
+                if self.done:
+                    return
+                self.n_errors += 1
+                if len(self.messages) < self.limit:
+                    self.messages.append(error.message)
@@ -0,0 +1,211 @@
+"""Benchmarks of the reconciliation pipelines on seeded datasets.
+
+Every (suite, size) runs in a fresh process inside a temporary directory: the datasets are
+generated with `generate_common_test_data`, then each stage is timed and the peak resident
+memory is read after it. Results are written as JSON so runs of different commits can be
+compared:
+
+    python benchmark.py --sizes 10k,1m --output results.json
+    python benchmark.py --sizes 10k --compare results.json
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(os.path.dirname(HERE), "src")
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+SUITES = ["reconciliation", "bank"]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class StageTimer:
+    """Times named stages and records the peak memory after each one."""
+
+    def __init__(self, trace_memory=False):
+        self.stages = {}
+        self.trace_memory = trace_memory
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - start
+        result = self.stages.setdefault(name, {"seconds": 0.0})
+        result["seconds"] += seconds
+        result["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+        if self.trace_memory:
+            result["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+
+
+def _run_reconciliation(timer, n_records, options):
+    from generate_common_test_data import generate_pair
+    from advanced_recon import Reconciliation, schema
+
+    with timer.stage("generate"):
+        counts = generate_pair("fileA.json", "fileB.json", n_records, workers=os.cpu_count(), manifest="", **options)
+
+    recon = Reconciliation(["fileA.json", "fileB.json"], schema, {"log_file": "reconciliation.log"})
+    with timer.stage("canonicalize"):
+        recon.canonicalize()
+    with timer.stage("validate"):
+        recon.validate_with_schema()
+    with timer.stage("load_and_flatten"):
+        for path in recon.canon_files:
+            recon.load_and_flatten(path)
+    with timer.stage("clean_and_cast"):
+        recon.clean_and_cast()
+    with timer.stage("reconcile"):
+        differences = recon.reconcile()
+    with timer.stage("generate_report"):
+        recon.generate_report(differences)
+    return counts, {key: recon.metrics[key] for key in ("total_records", "matching_records") if key in recon.metrics}
+
+
+def _run_bank(timer, n_records, options):
+    from generate_common_test_data import generate_bank_pair
+    from bank_recon import BankRecon
+
+    with timer.stage("generate"):
+        counts = generate_bank_pair("core.json", "legacy.json", n_records, workers=os.cpu_count(), manifest="", **options)
+
+    recon = BankRecon(["core.json", "legacy.json"], {}, {"log_file": "reconciliation.log"})
+    with timer.stage("canonicalize"):
+        recon.canonicalize()
+    with timer.stage("validate"):
+        recon.validate_with_schema()
+    with timer.stage("load_and_flatten"):
+        for path in recon.canon_files:
+            recon.load_and_flatten(path)
+    with timer.stage("normalize"):
+        core, legacy = recon.get_dataframes()
+        recon.normalize_core(core)
+        recon.normalize_legacy(legacy)
+    with timer.stage("reconcile"):
+        differences = recon.reconcile()
+    with timer.stage("generate_report"):
+        recon.generate_report(differences)
+    return counts, {key: recon.metrics[key] for key in ("total_records", "matching_records") if key in recon.metrics}
+
+
+RUNNERS = {"reconciliation": _run_reconciliation, "bank": _run_bank}
+
+
+def run_one(suite, size, options, trace_memory=False):
+    """Run one suite at one size in the current process; meant to be called in a fresh one."""
+    sys.path[:0] = [HERE, SRC]
+    if trace_memory:
+        tracemalloc.start()
+    timer = StageTimer(trace_memory)
+    workdir = tempfile.mkdtemp(prefix="benchmark_")
+    os.chdir(workdir)
+    # the pipelines print as they go, keep the benchmark output readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        counts, metrics = RUNNERS[suite](timer, SIZES[size], options)
+    os.chdir(HERE)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    total = sum(stage["seconds"] for name, stage in timer.stages.items() if name != "generate")
+    return {
+        "suite": suite,
+        "size": size,
+        "records": SIZES[size],
+        "dataset": counts,
+        "metrics": metrics,
+        "stages": {name: dict(stage, seconds=round(stage["seconds"], 4)) for name, stage in timer.stages.items()},
+        "total_seconds": round(total, 4),
+        "peak_rss_mb": round(_peak_rss_mb(), 1)
+    }
+
+
+def _environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    import numpy
+    import pandas
+    return {
+        "commit": commit or None,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count()
+    }
+
+
+def compare(results, baseline):
+    """Lines comparing the stage times of `results` with those of a previous run."""
+    previous = {(r["suite"], r["size"]): r for r in baseline["results"]}
+    lines = []
+    for result in results["results"]:
+        old = previous.get((result["suite"], result["size"]))
+        if old is None:
+            continue
+        for name, stage in list(result["stages"].items()) + [("total", {"seconds": result["total_seconds"]})]:
+            before = old["stages"].get(name, {}).get("seconds") if name != "total" else old["total_seconds"]
+            if before:
+                lines.append(f"{result['suite']:>15} {result['size']:>4} {name:>17}: "
+                             f"{before:9.3f}s -> {stage['seconds']:9.3f}s  ({stage['seconds'] / before:5.2f}x)")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10k", help=f"comma separated, of {', '.join(SIZES)}")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"comma separated, of {', '.join(SUITES)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mismatch-rate", type=float, default=0.01)
+    parser.add_argument("--duplicate-rate", type=float, default=0.001)
+    parser.add_argument("--missing-rate", type=float, default=0.001)
+    parser.add_argument("--tracemalloc", action="store_true", help="also record per-stage peaks of traced allocations (slower)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="results file of a previous run to compare against")
+    args = parser.parse_args(argv)
+
+    options = {"seed": args.seed, "mismatch_rate": args.mismatch_rate,
+               "duplicate_rate": args.duplicate_rate, "missing_rate": args.missing_rate}
+    results = {"environment": _environment(), "options": options, "results": []}
+
+    # one fresh process per run, so peak memory is that run's alone
+    context = multiprocessing.get_context("spawn")
+    for size in args.sizes.split(","):
+        for suite in args.suites.split(","):
+            with context.Pool(1) as pool:
+                result = pool.apply(run_one, (suite, size, options, args.tracemalloc))
+            results["results"].append(result)
+            print(f"{suite:>15} {size:>4}: {result['total_seconds']:9.3f}s, peak {result['peak_rss_mb']} MB")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            for line in compare(results, json.load(f)):
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,348 @@
-import json, random, datetime
+import argparse, json, os, random, datetime, shutil, tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 def generate_file(filename: str, n_records: int, customer_pool=None, seed=None):
     """Generate a JSON file with customer and order data.
-    
+
+    Records are written as they are built, one per line, so memory stays flat whatever
+    `n_records` is.
+
     Args:
         filename: Output JSON filename
         n_records: Number of records to generate
         customer_pool: Optional pre-generated customer data to ensure commonality
         seed: Random seed for reproducibility
+
+    Returns:
+        Number of records written
     """
     if seed is not None:
         random.seed(seed)
-    
-    data = []
-    for i in range(n_records):
-        # Build a customer record
-        cust_id = i % 1000
-        
-        # Use customer from pool if available and applicable
-        if customer_pool and cust_id < len(customer_pool) and random.random() < 0.7:
-            # 70% chance to use a customer from the pool
-            record = customer_pool[cust_id].copy()
-            # Generate new orders for existing customers
-            record["orders"] = [
-                {
-                    "order_id": i * 10 + j,
-                    "amt": round(random.uniform(10.0, 1000.0), 2),
-                    "ts": (
-                        datetime.datetime.now(datetime.timezone.utc)
-                        - datetime.timedelta(days=random.randint(0, 365))
-                    ).isoformat()
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    def new_orders(i):
+        return [
+            {
+                "order_id": i * 10 + j,
+                "amt": round(random.uniform(10.0, 1000.0), 2),
+                "ts": (now - datetime.timedelta(days=random.randint(0, 365))).isoformat()
+            }
+            for j in range(random.randint(1, 5))
+        ]
+
+    # same layout as json.dump(records, f, indent=2), one record at a time
+    with open(filename, "w") as f:
+        f.write("[" if n_records else "[]")
+        for i in range(n_records):
+            # Build a customer record
+            cust_id = i % 1000
+
+            # Use customer from pool if available and applicable (the pool roll comes before the
+            # orders are drawn, so seeded files keep their records)
+            if customer_pool and cust_id < len(customer_pool) and random.random() < 0.7:
+                # 70% chance to use a customer from the pool, with new orders
+                record = customer_pool[cust_id].copy()
+                record["orders"] = new_orders(i)
+            else:
+                record = {
+                    "customer": {
+                        "id": cust_id,
+                        "name": f"Customer {cust_id}"
+                    },
+                    "orders": new_orders(i)
                 }
-                for j in range(random.randint(1, 5))
-            ]
+            f.write((",\n  " if i else "\n  ") + json.dumps(record, indent=2).replace("\n", "\n  "))
+        if n_records:
+            f.write("\n]")
+
+    return n_records
+
+
+# Load-test datasets: paired A/B files that differ in a known way, plus a manifest of every
+# difference. The records are split in fixed-size shards, each generated by a worker process
+# from its own seed and written to part files that are then concatenated in order, so the
+# output only depends on the seed and the rates, never on the number of workers.
+
+# fixed reference time, so seeded datasets are the same on every run
+BASE_TIME = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+DAYS = [(BASE_TIME - datetime.timedelta(days=d)).strftime("%Y-%m-%d") for d in range(3651)]
+TIMES = [f"T{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}+00:00" for s in range(86400)]
+
+FIRST_NAMES = ["Alice", "Bob", "Carol", "David", "Erin", "Frank", "Grace", "Heidi", "Ivan", "Judy", "Mallory", "Niaj"]
+LAST_NAMES = ["Nguyen", "Smith", "Chen", "Garcia", "Johnson", "Brown", "Lee", "Martin", "Patel", "Walker", "Young", "King"]
+
+# record separator and the text around the records, per format and layout
+FORMATS = {
+    "json": {"sep": ",\n", "orders": ("[\n", "\n]\n"), "bank": ('{"customers": [\n', "\n]}\n")},
+    "jsonl": {"sep": "\n", "orders": ("", "\n"), "bank": ("", "\n")}
+}
+
+
+def _timestamp(u):
+    # a time of the year before BASE_TIME from one uniform draw (randint per field is slow)
+    day, seconds = divmod(int(u * 366 * 86400), 86400)
+    return DAYS[day] + TIMES[seconds]
+
+
+def _order_record(rng, i):
+    # (customer id, name, [(order id, amount, timestamp)]) of record i
+    random = rng.random
+    name = f"{FIRST_NAMES[int(random() * len(FIRST_NAMES))]} {LAST_NAMES[int(random() * len(LAST_NAMES))]}"
+    orders = [(i * 10 + j, round(10.0 + 990.0 * random(), 2), _timestamp(random()))
+              for j in range(1 + int(random() * 5))]
+    return i, name, orders
+
+
+def _order_text(record):
+    # the names come from fixed pools and need no escaping, formatting beats json.dumps
+    cust_id, name, orders = record
+    items = ", ".join(f'{{"order_id": {order_id}, "amt": {amt!r}, "ts": "{ts}"}}' for order_id, amt, ts in orders)
+    return f'{{"customer": {{"id": {cust_id}, "name": "{name}"}}, "orders": [{items}]}}'
+
+
+def _order_keys(record):
+    return [[record[0], order[0]] for order in record[2]]
+
+
+def _changed_order(rng, record):
+    # one order's amount moves well past the numeric tolerance
+    cust_id, name, orders = record
+    k = rng.randrange(len(orders))
+    order_id, amt, ts = orders[k]
+    changed = list(orders)
+    changed[k] = (order_id, round(amt + 1.0, 2), ts)
+    return (cust_id, name, changed), [{"key": [cust_id, order_id], "field": "amt", "a": amt, "b": changed[k][1]}]
+
+
+def _bank_record(rng, i):
+    # (id, first, last, masked account, routing number, signup day) of record i
+    random = rng.random
+    return (100000 + i, FIRST_NAMES[int(random() * len(FIRST_NAMES))], LAST_NAMES[int(random() * len(LAST_NAMES))],
+            int(random() * 100000), int(random() * 1000000000), DAYS[int(random() * len(DAYS))])
+
+
+def _core_text(record):
+    cust_id, first, last, masked, routing, day = record
+    email = f"{first}.{last}{cust_id}@example.com".upper()
+    return (f'{{"id": "{cust_id}", "name": {{"given": "{last}, {first}"}}, "contact": {{"email": "{email}"}}, '
+            f'"bankDetails": {{"acctNumMasked": "XXXX{masked:05d}", "rtgNum": "{routing:09d}"}}, "createdAt": "{day}T12:00:00Z"}}')
+
+
+def _legacy_text(record):
+    # the same customer in the legacy layout; a changed record carries another email domain
+    cust_id, first, last, masked, routing, day = record[:6]
+    domain = record[6] if len(record) > 6 else "example.com"
+    return (f'{{"customerId": {cust_id}, "firstName": "{first}", "lastName": "{last}", '
+            f'"email": "{first.lower()}.{last.lower()}{cust_id}@{domain}", "accountNumber": "{cust_id * 7919 % 10**10:010d}", '
+            f'"routingNumber": "{routing:09d}", "signupDate": "{day}"}}')
+
+
+def _bank_keys(record):
+    return [str(record[0])]
+
+
+def _changed_bank(rng, record):
+    cust_id, first, last = record[:3]
+    a = f"{first.lower()}.{last.lower()}{cust_id}@example.com"
+    return record + ("example.org",), [{"key": str(cust_id), "field": "email", "a": a, "b": a.replace("example.com", "example.org")}]
+
+
+# make(rng, i), text of A, text of B, keys of a record, change(rng, record) -> (changed, [mismatches])
+LAYOUTS = {
+    "orders": (_order_record, _order_text, _order_text, _order_keys, _changed_order),
+    "bank": (_bank_record, _core_text, _legacy_text, _bank_keys, _changed_bank)
+}
+
+
+def _write_shard(task):
+    """Write records [start, end) of a dataset to part files; returns the shard's counts."""
+    layout, fmt, n_records, start, end, seed, rates, paths = task
+    make, text_a, text_b, keys, change = LAYOUTS[layout]
+    sep = FORMATS[fmt]["sep"]
+    mismatch_rate, duplicate_rate, missing_rate, extra_rate = rates
+    # every shard has its own seed, so shards can be generated in any order or process
+    rng = random.Random(f"{seed}/{start}")
+    counts = {"records_a": 0, "records_b": 0, "mismatches": 0, "duplicates": 0, "missing": 0, "extra": 0}
+
+    with open(paths[0], "w") as fa, open(paths[1], "w") as fb, open(paths[2], "w") as fm:
+        sep_a = sep_b = ""
+        for i in range(start, end):
+            record = make(rng, i)
+            text = text_a(record)
+            fa.write(sep_a + text)
+            sep_a = sep
+            counts["records_a"] += 1
+
+            roll = rng.random()
+            b_records = [record]
+            if roll < missing_rate:
+                b_records = []
+                counts["missing"] += 1
+                for key in keys(record):
+                    fm.write(json.dumps({"kind": "only_in_a", "key": key}) + "\n")
+            elif roll < missing_rate + mismatch_rate:
+                changed, mismatches = change(rng, record)
+                b_records = [changed]
+                counts["mismatches"] += 1
+                for mismatch in mismatches:
+                    fm.write(json.dumps(dict(kind="mismatch", **mismatch)) + "\n")
+            elif roll < missing_rate + mismatch_rate + duplicate_rate:
+                b_records = [record, record]
+                counts["duplicates"] += 1
+                for key in keys(record):
+                    fm.write(json.dumps({"kind": "duplicate_in_b", "key": key}) + "\n")
+
+            if rng.random() < extra_rate:
+                # a record only B has; its index is past every record of A
+                extra = make(rng, n_records + i)
+                b_records.append(extra)
+                counts["extra"] += 1
+                for key in keys(extra):
+                    fm.write(json.dumps({"kind": "only_in_b", "key": key}) + "\n")
+
+            for b in b_records:
+                # an unchanged record of the orders layout is the same text on both sides
+                fb.write(sep_b + (text if b is record and text_b is text_a else text_b(b)))
+                sep_b = sep
+                counts["records_b"] += 1
+    return counts
+
+
+def _concatenate(out, parts, prefix, sep, suffix):
+    with open(out, "w") as f:
+        f.write(prefix)
+        first = True
+        for part in parts:
+            if os.path.getsize(part):
+                if not first:
+                    f.write(sep)
+                with open(part) as p:
+                    shutil.copyfileobj(p, f, 1 << 20)
+                first = False
+        f.write(suffix)
+
+
+def generate_dataset(file_a: str, file_b: str, n_records: int, layout: str = "orders", fmt: str = "json",
+                     seed: int = 0, mismatch_rate: float = 0.01, duplicate_rate: float = 0.001,
+                     missing_rate: float = 0.001, extra_rate: float = 0.0, workers: int = 1,
+                     shard_size: int = 50_000, manifest: str = None):
+    """Generate paired A/B files that differ in a known way, streaming them to disk.
+
+    Args:
+        file_a, file_b: Output filenames
+        n_records: Number of records in file_a
+        layout: "orders" (customer/orders records in both files) or "bank" (the json_files/
+            customers_core layout in file_a, customers_legacy in file_b)
+        fmt: "json" (one array, under "customers" for the bank layout) or "jsonl" (one record per line)
+        seed: Random seed; the same arguments give the same files for any number of workers
+        mismatch_rate: Fraction of records changed in file_b (an order amount, or the email)
+        duplicate_rate: Fraction of records written twice to file_b
+        missing_rate: Fraction of records left out of file_b
+        extra_rate: Fraction of records followed by a new record only file_b has
+        workers: Processes generating shards in parallel
+        shard_size: Records per shard
+        manifest: Where to write the ground-truth manifest (JSON with the counts and every
+            difference); defaults to file_b + ".manifest.json", "" skips it
+
+    Returns:
+        Counts of the records written and of every kind of difference
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout {layout!r}, expected one of {', '.join(LAYOUTS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    rates = (mismatch_rate, duplicate_rate, missing_rate, extra_rate)
+    if manifest is None:
+        manifest = file_b + ".manifest.json"
+
+    parts_dir = tempfile.mkdtemp(prefix="parts_", dir=os.path.dirname(os.path.abspath(file_b)))
+    try:
+        tasks = []
+        for start in range(0, n_records, shard_size):
+            paths = [os.path.join(parts_dir, f"{start}.{side}") for side in ("a", "b", "m")]
+            tasks.append((layout, fmt, n_records, start, min(start + shard_size, n_records), seed, rates, paths))
+
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                shard_counts = list(pool.map(_write_shard, tasks))
         else:
-            record = {
+            shard_counts = [_write_shard(task) for task in tasks]
+        counts = {key: sum(c[key] for c in shard_counts) for key in shard_counts[0]} if tasks else {}
+
+        prefix, suffix = FORMATS[fmt][layout]
+        sep = FORMATS[fmt]["sep"]
+        _concatenate(file_a, [task[-1][0] for task in tasks], prefix, sep, suffix)
+        _concatenate(file_b, [task[-1][1] for task in tasks], prefix, sep, suffix)
+        if manifest:
+            header = json.dumps({"layout": layout, "format": fmt, "records": n_records, "seed": seed,
+                                 "rates": dict(zip(("mismatch", "duplicate", "missing", "extra"), rates)),
+                                 "counts": counts})
+            # the difference lines of the parts are JSON already, joined into one array
+            with open(manifest, "w") as f:
+                f.write(header[:-1] + ', "differences": [\n')
+                first = True
+                for task in tasks:
+                    with open(task[-1][2]) as p:
+                        for line in p:
+                            f.write(("" if first else ",\n") + line.rstrip("\n"))
+                            first = False
+                f.write("\n]}\n")
+        return counts
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+
+def generate_pair(fileA: str, fileB: str, n_records: int, seed: int = 0, mismatch_rate: float = 0.01,
+                  duplicate_rate: float = 0.001, missing_rate: float = 0.001, **options):
+    """Two customer/orders files that differ by controlled rates, see `generate_dataset`."""
+    return generate_dataset(fileA, fileB, n_records, "orders", seed=seed, mismatch_rate=mismatch_rate,
+                            duplicate_rate=duplicate_rate, missing_rate=missing_rate, **options)
+
+
+def generate_bank_pair(core_file: str, legacy_file: str, n_records: int, seed: int = 0, mismatch_rate: float = 0.01,
+                       duplicate_rate: float = 0.001, missing_rate: float = 0.001, **options):
+    """A core and a legacy customers file describing the same customers, see `generate_dataset`."""
+    return generate_dataset(core_file, legacy_file, n_records, "bank", seed=seed, mismatch_rate=mismatch_rate,
+                            duplicate_rate=duplicate_rate, missing_rate=missing_rate, **options)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate paired A/B test datasets")
+    parser.add_argument("--records", type=int, help="records per file; without it the 5000-record sample files are written")
+    parser.add_argument("--layout", choices=list(LAYOUTS), default="orders")
+    parser.add_argument("--format", choices=list(FORMATS), default="json")
+    parser.add_argument("--out", nargs=2, metavar=("FILE_A", "FILE_B"), default=["fileA.json", "fileB.json"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mismatch-rate", type=float, default=0.01)
+    parser.add_argument("--duplicate-rate", type=float, default=0.001)
+    parser.add_argument("--missing-rate", type=float, default=0.001)
+    parser.add_argument("--extra-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--shard-size", type=int, default=50_000)
+    args = parser.parse_args(argv)
+
+    if args.records is None:
+        # Generate common customer pool first
+        common_customers = []
+        for i in range(500):  # Create pool of 500 common customers
+            common_customers.append({
                 "customer": {
-                    "id": cust_id,
-                    "name": f"Customer {cust_id}"
+                    "id": i,
+                    "name": f"Customer {i}"
                 },
-                "orders": [
-                    {
-                        "order_id": i * 10 + j,
-                        "amt": round(random.uniform(10.0, 1000.0), 2),
-                        "ts": (
-                            datetime.datetime.now(datetime.timezone.utc)
-                            - datetime.timedelta(days=random.randint(0, 365))
-                        ).isoformat()
-                    }
-                    for j in range(random.randint(1, 5))
-                ]
-            }
-        data.append(record)
+                "orders": []  # Empty orders initially
+            })
 
-    with open(filename, "w") as f:
-        json.dump(data, f, indent=2)
-    
-    return data
+        # Use same customer pool but different random seeds
+        generate_file("fileA.json", 5000, customer_pool=common_customers, seed=42)
+        generate_file("fileB.json", 5000, customer_pool=common_customers, seed=43)
+        print("Generated fileA.json and fileB.json (5000 records each, with shared customer data)")
+        return
+
+    counts = generate_dataset(args.out[0], args.out[1], args.records, args.layout, args.format, args.seed,
+                              args.mismatch_rate, args.duplicate_rate, args.missing_rate, args.extra_rate,
+                              args.workers, args.shard_size)
+    print(f"Generated {args.out[0]} and {args.out[1]}: {counts}")
 
 if __name__ == "__main__":
-    # Generate common customer pool first
-    common_customers = []
-    for i in range(500):  # Create pool of 500 common customers
-        common_customers.append({
-            "customer": {
-                "id": i,
-                "name": f"Customer {i}"
-            },
-            "orders": []  # Empty orders initially
-        })
-    
-    # Use same customer pool but different random seeds
-    generate_file("fileA.json", 5000, customer_pool=common_customers, seed=42)
-    generate_file("fileB.json", 5000, customer_pool=common_customers, seed=43)
-    print("Generated fileA.json and fileB.json (5000 records each, with shared customer data)")
\ No newline at end of file
+    main()
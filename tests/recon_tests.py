@@ -0,0 +1,525 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_dir)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'pyscripts')))
+
+from byteranges import array_ranges, load_array
+from cache import FrameCache
+from casting import CAST_RULES, apply_cast_plan, cast_plan, schema_dtypes
+from canonical import canonical_dumps, canonicalize, load_canonical
+from flatten import flatten_records
+from fuzzy import candidate_pairs, edit_distance, fuzzy_match, soundex
+from incremental import reconcile_incremental
+from instrumentation import Instrumentation
+from jason import parse_name
+from jsonl import iter_jsonl, line_ranges, load_jsonl, write_differences_jsonl, write_jsonl
+from mismatch import compare_frames, row_fingerprints, summarize, to_differences
+from names import NAME_FIELDS, parse_name_series
+from parallel import decode_frame, encode_frame, reconcile_parallel
+from partition import reconcile_partitioned
+from pipeline import InputPipeline
+from streaming import iter_json_array, iter_normalized_chunks, concat_chunks, load_flattened
+from validation import ItemValidator, compiled_validator, document_errors
+
+
+class TestMismatch(unittest.TestCase):
+    def setUp(self):
+        self.df1 = pd.DataFrame({
+            'id': [1, 2, 3, 4],
+            'amt': [10.0, 20.0, 30.0, None],
+            'ts': pd.to_datetime(['2023-01-01T00:00:00Z'] * 4, utc=True),
+            'name': pd.Series(['a', 'b', 'c', 'd'], dtype='string'),
+        })
+        self.df2 = pd.DataFrame({
+            'id': [2, 3, 4, 5],
+            'amt': [20.005, 31.0, None, 50.0],
+            'ts': pd.to_datetime(['2023-01-01T00:00:30Z', '2023-01-01T00:05:00Z',
+                                  '2023-01-01T00:00:00Z', '2023-01-01T00:00:00Z'], utc=True),
+            'name': pd.Series(['b', 'c', 'x', 'e'], dtype='string'),
+        })
+
+    def test_compare_frames(self):
+        """Test long-format mismatch extraction with tolerances"""
+        result = compare_frames(self.df1, self.df2, ['id'], numeric_tolerance=0.01, time_tolerance_seconds=60)
+
+        self.assertEqual(list(result['only_in_df1']), [1])
+        self.assertEqual(list(result['only_in_df2']), [5])
+        self.assertEqual(result['common_keys'], 3)
+
+        mismatches = result['mismatches']
+        self.assertEqual(list(mismatches.columns), ['column', 'value_A', 'value_B', 'delta'])
+        self.assertEqual(list(zip(mismatches.index, mismatches['column'])),
+                         [(3, 'amt'), (3, 'ts'), (4, 'name')])
+        self.assertAlmostEqual(mismatches['delta'].iloc[0], 1.0)
+        self.assertEqual(mismatches['delta'].iloc[1], 300.0)
+
+    def test_lazy_view(self):
+        """Test the legacy list-of-tuples view over the mismatch frame"""
+        result = compare_frames(self.df1, self.df2, ['id'])
+        differences = to_differences(result)
+        view = differences['value_mismatches']
+
+        self.assertEqual(list(view), ['amt', 'ts', 'name'])
+        self.assertEqual(view.counts(), {'amt': 1, 'ts': 1, 'name': 1})
+        self.assertEqual(view['name'], [(4, 'd', 'x')])
+
+        metrics = summarize(result)
+        self.assertEqual(metrics['matching_records'], 1)
+        self.assertEqual(metrics['mismatches']['value_mismatches'], 3)
+
+    def test_multi_key(self):
+        """Test mismatch keys with composite key columns"""
+        df1 = pd.DataFrame({'a': [1, 1], 'b': ['x', 'y'], 'v': [1, 2]})
+        df2 = pd.DataFrame({'a': [1, 1], 'b': ['x', 'y'], 'v': [1, 3]})
+        view = to_differences(compare_frames(df1, df2, ['a', 'b']))['value_mismatches']
+        self.assertEqual(view['v'], [((1, 'y'), 2, 3)])
+
+    def test_partitioned_matches_in_memory(self):
+        """Test out-of-core partitioned reconciliation against the in-memory path"""
+        chunks1 = [self.df1.iloc[:2], self.df1.iloc[2:]]
+        chunks2 = [self.df2.iloc[:1], self.df2.iloc[1:]]
+        with tempfile.TemporaryDirectory() as spill_dir:
+            result = reconcile_partitioned(iter(chunks1), iter(chunks2), ['id'], spill_dir, n_partitions=3)
+            self.assertTrue(os.listdir(spill_dir))
+
+        expected = compare_frames(self.df1, self.df2, ['id'])
+        self.assertEqual(sorted(result['only_in_df1']), sorted(expected['only_in_df1']))
+        self.assertEqual(sorted(result['only_in_df2']), sorted(expected['only_in_df2']))
+        self.assertEqual(result['rows_df1'] + result['rows_df2'], 8)
+        self.assertEqual(summarize(result), summarize(expected))
+        pd.testing.assert_frame_equal(result['mismatches'].sort_index(kind='stable'),
+                                      expected['mismatches'].sort_index(kind='stable'))
+
+    def test_parallel_identical_to_serial(self):
+        """Test process-pool reconciliation gives exactly the serial output"""
+        df1 = pd.concat([self.df1, self.df1.assign(id=self.df1['id'] + 10)], ignore_index=True)
+        df2 = pd.concat([self.df2, self.df2.assign(id=self.df2['id'] + 10)], ignore_index=True)
+
+        serial = compare_frames(df1, df2, ['id'])
+        parallel = reconcile_parallel(df1, df2, ['id'], workers=2, n_shards=3)
+
+        self.assertEqual(list(parallel['only_in_df1']), list(serial['only_in_df1']))
+        self.assertEqual(list(parallel['only_in_df2']), list(serial['only_in_df2']))
+        self.assertEqual(summarize(parallel), summarize(serial))
+        pd.testing.assert_frame_equal(parallel['mismatches'], serial['mismatches'])
+
+    def test_fingerprint_prefilter(self):
+        """Test rows with equal tolerance-bucketed fingerprints are skipped without changing the result"""
+        df2 = self.df2.assign(amt=[20.001, 31.0, None, 50.0])
+        signature1, fp1 = row_fingerprints(self.df1, ['id'], 0.01, 60)
+        signature2, fp2 = row_fingerprints(df2, ['id'], 0.01, 60)
+        self.assertEqual(signature1, signature2)
+
+        result = compare_frames(self.df1, df2, ['id'], fingerprints=(fp1, fp2))
+        expected = compare_frames(self.df1, df2, ['id'])
+        self.assertEqual(result['prefiltered_keys'], 1)  # id 2: 20.0 and 20.001 share a bucket
+        self.assertEqual(summarize(result), summarize(expected))
+        pd.testing.assert_frame_equal(result['mismatches'], expected['mismatches'])
+
+    def test_incremental_matches_full(self):
+        """Test incremental runs only re-compare changed keys and match a full comparison"""
+        result, state = reconcile_incremental(self.df1, self.df2, ['id'], None)
+        self.assertIsNone(result['delta'])
+
+        df1 = self.df1.copy()
+        df1.loc[2, 'amt'] = 31.0  # fixes the mismatch on id 3
+        df2 = pd.concat([self.df2, self.df2.iloc[[0]].assign(id=6)], ignore_index=True)
+        result, state = reconcile_incremental(df1, df2, ['id'], state)
+
+        expected = compare_frames(df1, df2, ['id'])
+        self.assertEqual(result['compared_keys'], 2)
+        self.assertEqual(list(result['only_in_df2']), list(expected['only_in_df2']))
+        self.assertEqual(summarize(result), summarize(expected))
+        pd.testing.assert_frame_equal(result['mismatches'], expected['mismatches'])
+        self.assertEqual(result['delta']['only_in_df2']['added'], [6])
+        self.assertEqual(list(result['delta']['mismatches']['resolved']['column']), ['amt'])
+
+    def test_frame_buffers_roundtrip(self):
+        """Test NumPy buffer encoding keeps dtypes and missing values"""
+        df = self.df1.assign(
+            id=pd.array([1, None, 3, 4], dtype='Int64'),
+            cat=pd.Categorical(['x', 'y', None, 'x']),
+        )
+        pd.testing.assert_frame_equal(decode_frame(encode_frame(df)), df)
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data = {
+            "meta": {"source": "core", "tags": [1, {"a": 2}]},
+            "customers": [
+                {"id": "1", "name": {"given": "Nguyen, Alice"}, "score": 4.5e3},
+                {"id": "2", "name": {"given": "Bob Smith"}, "score": -12, "active": True},
+                {"id": "3", "name": {"given": "a,]b"}, "score": None},
+            ]
+        }
+        self.path = os.path.join(self.tmp.name, 'customers.json')
+        with open(self.path, 'w') as f:
+            json.dump(self.data, f, indent=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_iter_json_array(self):
+        """Test incremental parsing across tiny buffer sizes"""
+        for buffer_size in [1, 2, 3, 7, 1 << 16]:
+            with self.subTest(buffer_size=buffer_size):
+                items = list(iter_json_array(self.path, array_key='customers', buffer_size=buffer_size))
+                self.assertEqual(items, self.data['customers'])
+
+    def test_normalized_chunks(self):
+        """Test chunked flattening matches json_normalize on the whole array"""
+        chunks = list(iter_normalized_chunks(self.path, 2, array_key='customers'))
+        self.assertEqual([len(c) for c in chunks], [2, 1])
+
+        expected = pd.json_normalize(self.data['customers'])
+        pd.testing.assert_frame_equal(concat_chunks(iter(chunks)), expected)
+
+
+class TestByteRanges(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # strings full of brackets, commas and escaped quotes must not be mistaken for structure
+        tricky = ['},{', '"]', '\\', '\\"', 'a\\\\', '[', '\n,']
+        self.records = [{"id": str(i), "note": tricky[i % len(tricky)] * (i % 3),
+                         "tags": [i, {"k": tricky[(i + 1) % len(tricky)]}], "score": i * 1.5} for i in range(60)]
+        self.path = os.path.join(self.tmp.name, 'customers.json')
+        with open(self.path, 'w') as f:
+            json.dump({"meta": {"customers": [0], "s": "customers"}, "customers": self.records,
+                       "after": [{"x": "]"}]}, f, indent=1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ranges_hold_whole_records(self):
+        """Test the structural scan cuts the array between records, whatever the block size"""
+        with open(self.path, 'rb') as f:
+            text = f.read()
+        for chunk_mb in [1e-5, 1e-3, 16]:
+            with self.subTest(chunk_mb=chunk_mb):
+                ranges = array_ranges(self.path, array_key='customers', chunk_mb=chunk_mb)
+                parsed = [r for start, end in ranges for r in json.loads(b'[' + text[start:end] + b']')]
+                self.assertEqual(parsed, self.records)
+        self.assertEqual(load_array(self.path, 2, array_key='customers', chunk_mb=1e-3), self.records)
+        with self.assertRaises(ValueError):
+            array_ranges(self.path, array_key='missing')
+
+    def test_parallel_flatten_matches_json_normalize(self):
+        """Test flattening byte ranges in a process pool keeps the records in order"""
+        df = load_flattened(self.path, 10, 50, array_key='customers', workers=2)
+        pd.testing.assert_frame_equal(df, pd.json_normalize(self.records))
+
+
+class TestJsonl(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.records = [{"id": str(i), "name": {"given": f"N{i}"}, "score": i * 1.5} for i in range(25)]
+        self.path = os.path.join(self.tmp.name, 'customers.jsonl')
+        write_jsonl(self.records, self.path)
+        with open(self.path, 'a') as f:
+            f.write('\n')  # trailing blank line
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_line_ranges_cover_whole_lines(self):
+        """Test splitting at newlines gives ranges that parse back to the records in order"""
+        self.assertEqual(list(iter_jsonl(self.path)), self.records)
+        self.assertEqual(list(iter_json_array(self.path, array_key='customers')), self.records)
+        self.assertEqual(load_jsonl(self.path, workers=3), self.records)
+        for n_parts in [1, 2, 3, 7, 100]:
+            with self.subTest(n_parts=n_parts):
+                ranges = line_ranges(self.path, n_parts)
+                self.assertLessEqual(len(ranges), n_parts)
+                parsed = [r for start, end in ranges for r in iter_jsonl(self.path, start=start, end=end)]
+                self.assertEqual(parsed, self.records)
+
+    def test_parallel_flatten_matches_json_normalize(self):
+        """Test chunked, multi-process flattening of a JSON Lines file"""
+        expected = pd.json_normalize(self.records)
+        for workers in [1, 3]:
+            with self.subTest(workers=workers):
+                df = load_flattened(self.path, 4, 50, workers=workers)
+                pd.testing.assert_frame_equal(df, expected)
+
+    def test_differences_as_lines(self):
+        """Test every mismatch and unmatched key becomes one JSON line"""
+        df1 = pd.DataFrame({'id': [1, 2, 3], 'amt': [1.0, 2.0, 3.0]})
+        df2 = pd.DataFrame({'id': [2, 3, 4], 'amt': [2.0, 3.5, 4.0]})
+        differences = to_differences(compare_frames(df1, df2, ['id']))
+        out = os.path.join(self.tmp.name, 'differences.jsonl')
+        self.assertEqual(write_differences_jsonl(differences, out, ['id']), 3)
+        self.assertEqual(list(iter_jsonl(out)), [
+            {'kind': 'mismatch', 'id': 3, 'column': 'amt', 'value_A': 3.0, 'value_B': 3.5, 'delta': 0.5},
+            {'kind': 'only_in_df1', 'id': 1},
+            {'kind': 'only_in_df2', 'id': 4}
+        ])
+
+
+class TestFlatten(unittest.TestCase):
+    def test_matches_json_normalize(self):
+        """Test the schema-compiled flattener gives json_normalize's frame, including undeclared and missing keys"""
+        schema = {"type": "array", "items": {"type": "object", "properties": {
+            "customer": {"type": "object", "properties": {"id": {}, "name": {}}},
+            "orders": {"type": "array", "items": {"type": "object", "properties": {
+                "order_id": {}, "amt": {}, "ship": {"type": "object", "properties": {"city": {}}}}}}}}}
+        data = [
+            {"customer": {"id": 1, "name": "A"}, "orders": [
+                {"ship": {"city": "X"}, "order_id": 1, "amt": 2.5},
+                {"order_id": 2, "note": "undeclared", "ship": {"city": "Y", "zip": "1"}}]},
+            {"customer": {"id": 2, "name": "B"}, "orders": []},
+            {"customer": {"id": 3, "name": "C"}, "orders": [{"order_id": 3, "amt": None}]},
+        ]
+        kwargs = {'record_path': 'orders', 'meta': [['customer', 'id'], ['customer', 'name']],
+                  'record_prefix': 'order_', 'meta_prefix': 'cust_'}
+        pd.testing.assert_frame_equal(flatten_records(data, schema=schema, **kwargs),
+                                      pd.json_normalize(data, **kwargs))
+        pd.testing.assert_frame_equal(flatten_records(data, schema=schema), pd.json_normalize(data))
+
+        with self.assertRaises(KeyError):  # same error as json_normalize for a missing record path
+            flatten_records([{"customer": {"id": 4}}], schema=schema, **kwargs)
+
+
+class TestFuzzy(unittest.TestCase):
+    def test_edit_distance_and_soundex(self):
+        """Test the vectorized edit distance and the phonetic blocking key"""
+        pairs = [("kitten", "sitting"), ("", "abc"), ("abc", ""), ("", ""), ("flaw", "lawn"), ("héllo", "hello"),
+                 ("x\x00", "x"), ("\x00", ""), ("a\U0001F600", "a")]
+        self.assertEqual(list(edit_distance([a for a, _ in pairs], [b for _, b in pairs])), [3, 3, 3, 0, 2, 1, 1, 1, 1])
+        self.assertEqual([soundex(w) for w in ["Robert", "Rupert", "Ashcraft", "Tymczak", "", None]],
+                         ["R163", "R163", "A261", "T522", None, None])
+
+    def test_blocked_probable_matches(self):
+        """Test only records sharing a blocking key are scored and matches are one to one above the threshold"""
+        left = pd.DataFrame({
+            'id': ['1', '2', '3'],
+            'first_name': ['david', 'maria', 'bob'],
+            'last_name': ['chen', 'gonzalez', 'smith'],
+            'email': ['d.chen@example.com', 'maria@finance.com', 'bob@x.com'],
+        }).set_index('id', drop=False)
+        right = pd.DataFrame({
+            'id': ['9', '8', '7'],
+            'first_name': ['dave', 'frank', 'rob'],
+            'last_name': ['chen', 'zhang', 'smyth'],
+            'email': ['dave.chen@example.com', 'frank@mercury.com', 'bob@x.com'],
+        }).set_index('id', drop=False)
+        blocks = [[('last_name', 'soundex'), ('email', 'domain')]]
+        pairs = candidate_pairs(left, right, blocks)
+        self.assertEqual(sorted(zip(pairs['left'], pairs['right'])), [(0, 0), (2, 2)])
+
+        matches = fuzzy_match(left, right, blocks=blocks, columns=['first_name', 'last_name', 'email'], threshold=0.6)
+        self.assertEqual(sorted(zip(matches['key_A'], matches['key_B'])), [('1', '9'), ('3', '7')])
+        self.assertTrue(matches['score'].is_monotonic_decreasing)
+        self.assertEqual(len(fuzzy_match(left, right, blocks=blocks, threshold=0.99)), 0)
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_stages_counters_and_exports(self):
+        """Test stage timings, counters and the JSON lines / Prometheus exports"""
+        instruments = Instrumentation(profile=True, trace_memory=True, labels={'pipeline': 'test "a"'})
+        for _ in range(2):
+            with instruments.stage('load'):
+                with instruments.stage('parse'):
+                    data = [list(range(100)) for _ in range(100)]
+        instruments.count('rows_read', len(data))
+        instruments.count('rows_read', 5)
+        instruments.gauge('match_rate', 0.5)
+
+        snapshot = instruments.snapshot()
+        self.assertEqual(snapshot['stages']['load']['calls'], 2)
+        self.assertGreaterEqual(snapshot['stages']['load']['seconds'], snapshot['stages']['parse']['seconds'])
+        self.assertIn('traced_peak_mb', snapshot['stages']['parse'])
+        self.assertEqual(snapshot['counters'], {'rows_read': 105})
+        self.assertIn('load', instruments.profiles)
+        self.assertNotIn('parse', instruments.profiles)  # nested stages are not profiled separately
+
+        with tempfile.TemporaryDirectory() as tmp:
+            instruments.export_jsonl(os.path.join(tmp, 'metrics.jsonl'))
+            with open(os.path.join(tmp, 'metrics.jsonl')) as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual([(l['type'], l['name']) for l in lines],
+                             [('stage', 'parse'), ('stage', 'load'), ('counter', 'rows_read'), ('gauge', 'match_rate')])
+            instruments.export_prometheus(os.path.join(tmp, 'metrics.prom'))
+            with open(os.path.join(tmp, 'metrics.prom')) as f:
+                text = f.read()
+        self.assertIn('recon_stage_calls_total{pipeline="test \\"a\\"",stage="load"} 2.0', text)
+        self.assertIn('# TYPE recon_rows_read_total counter', text)
+        self.assertIn('recon_match_rate{pipeline="test \\"a\\""} 0.5', text)
+
+        disabled = Instrumentation(enabled=False)
+        with disabled.stage('load'):
+            disabled.count('rows_read')
+        self.assertEqual(disabled.snapshot(), {'stages': {}, 'counters': {}, 'gauges': {}})
+
+
+class TestNames(unittest.TestCase):
+    def test_series_matches_parse_name(self):
+        """Test the vectorized parser gives parse_name's fields for every form, repeats and non-strings"""
+        raw = ["John Smith", "Smith, John", "Smith, John Q, Jr.", "Dr. John Quincy Public III", "  mr   JOHN  ",
+               "Jr", "Dr", "Smith,, John", ", John", "John Jr", "John Smith Jr", "John Q. Adams", "Cher",
+               "Doe, Jane, Esq, x", "Prof Ada Lovelace PhD", "Mary Ann Jo Smith Jr", "", "   ", None, float('nan'), 42, "John Smith"]
+        parsed = parse_name_series(pd.Series(raw, index=range(10, 10 + len(raw))))
+        self.assertEqual(list(parsed.index), list(range(10, 10 + len(raw))))
+        self.assertEqual(list(parsed.columns), NAME_FIELDS)
+        for name, row in zip(raw, parsed.to_dict('records')):
+            self.assertEqual(row, parse_name(name), repr(name))
+
+
+class TestCasting(unittest.TestCase):
+    def test_schema_plan_single_pass(self):
+        """Test schema types win over name rules, overrides win over both, and each column is cast once"""
+        schema = {"type": "object", "properties": {
+            "customer": {"type": "object", "properties": {"id": {"type": "integer"}, "tier": {"type": "string"}}},
+            "orders": {"type": "array", "items": {"type": "object", "properties": {
+                "ts": {"type": "string", "format": "date-time"}, "total_id": {"type": "number"}}}}}}
+        targets = schema_dtypes(schema, record_path='orders', meta=[['customer', 'id'], ['customer', 'tier']],
+                                record_prefix='order_', meta_prefix='cust_')
+        self.assertEqual(targets, {'order_ts': 'datetime', 'order_total_id': 'float64',
+                                   'cust_customer.id': 'Int64', 'cust_customer.tier': 'string'})
+
+        df = pd.DataFrame({'order_ts': ['2023-01-01T00:00:00+01:00', None], 'order_total_id': ['1.5', 'x'],
+                           'cust_customer.id': ['7', '8'], 'cust_customer.tier': ['gold', 'gold'],
+                           'order_price': ['3', '4'], 'note': ['a', 'b']})
+        plan = cast_plan(df.columns, targets, CAST_RULES, {'note': 'category'})
+        self.assertEqual(plan['order_total_id'], 'float64')  # not Int64 although the name contains 'id'
+        self.assertEqual(plan['order_price'], 'numeric')
+
+        cast, missing = apply_cast_plan(df, plan, category_max_unique=10)
+        self.assertEqual(str(cast['order_ts'].dtype), 'datetime64[ns, UTC]')
+        self.assertEqual(cast['order_ts'].iloc[0], pd.Timestamp('2022-12-31T23:00:00Z'))
+        self.assertEqual(str(cast['cust_customer.id'].dtype), 'Int64')
+        self.assertIsInstance(cast['cust_customer.tier'].dtype, pd.CategoricalDtype)
+        self.assertEqual(str(cast['note'].dtype), 'category')
+        self.assertEqual(missing, {'order_total_id': 1})
+
+
+class TestCanonical(unittest.TestCase):
+    def test_sorted_keys_single_parse(self):
+        """Test in-process canonicalization matches jq --sort-keys"""
+        doc = {"b": 1, "a": [{"z": None, "y": {"d": 2, "c": 3}}], "a2": "x"}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'doc.json')
+            with open(path, 'w') as f:
+                json.dump(doc, f, indent=4)
+            loaded = load_canonical(path)
+
+        self.assertEqual(loaded, doc)
+        self.assertEqual(list(loaded), ['a', 'a2', 'b'])
+        self.assertEqual(list(loaded['a'][0]['y']), ['c', 'd'])
+        self.assertEqual(loaded, canonicalize(doc))
+        self.assertEqual(canonical_dumps(doc), '{"a":[{"y":{"c":3,"d":2},"z":null}],"a2":"x","b":1}')
+
+    def test_large_files_are_streamed(self):
+        """Test large inputs are canonicalized and validated record by record, without keeping the document"""
+        from advanced_recon import Reconciliation, schema
+        records = [{"customer": {"id": i, "name": f"N{i}"}, "orders": [{"order_id": i, "amt": 1.5, "ts": "2023-01-01T00:00:00Z"}]}
+                   for i in range(20)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'orders.json')
+            with open(path, 'w') as f:
+                json.dump(records, f, indent=2)
+            recon = Reconciliation([path], schema, {'stream_threshold_mb': 0, 'write_canonical': True, 'chunk_size': 7,
+                                                    'log_file': os.path.join(tmp, 'recon.log')})
+            recon.canonicalize()
+            self.assertEqual(recon._documents, {})
+            self.assertEqual(load_canonical(recon.canon_files[0]), canonicalize(records))
+            recon.validate_with_schema()
+            self.assertEqual(len(recon.load_and_flatten(recon.canon_files[0])), 20)
+
+            # with parse_workers > 1 the same file is parsed in byte ranges instead
+            recon = Reconciliation([path], schema, {'stream_threshold_mb': 0, 'parse_workers': 2,
+                                                    'log_file': os.path.join(tmp, 'recon.log')})
+            recon.canonicalize()
+            self.assertEqual(recon._documents, {path: canonicalize(records)})
+            recon.validate_with_schema()
+            self.assertEqual(len(recon.load_and_flatten(path)), 20)
+
+
+class TestValidation(unittest.TestCase):
+    def setUp(self):
+        self.schema = {"type": "object", "properties": {"customers": {
+            "type": "array", "items": {"type": "object", "required": ["id"]}}}}
+        self.data = {"customers": [{"id": 1}, {}, {"id": 3}, {}, {}, {}]}
+
+    def test_compiled_once(self):
+        """Test equal schemas share one compiled validator"""
+        self.assertIs(compiled_validator(self.schema), compiled_validator(json.loads(json.dumps(self.schema))))
+
+    def test_early_exit_and_sampling(self):
+        """Test max_errors, every-k-th sampling and parallel chunks"""
+        self.assertEqual(document_errors(self.data, self.schema)[0], 4)
+        self.assertEqual(document_errors(self.data, self.schema, max_errors=2)[0], 2)
+        self.assertEqual(document_errors(self.data, self.schema, array_key='customers', sample_every=3)[0], 1)
+        self.assertEqual(document_errors(self.data, self.schema, array_key='customers', workers=2)[0], 4)
+
+        validator = ItemValidator({"required": ["id"]}, sample_every=2)
+        validator.validate(self.data['customers'][:3])
+        validator.validate(self.data['customers'][3:])
+        self.assertEqual(validator.n_errors, 1)  # records 0, 2 and 4
+
+    def test_parallel_checks_the_document(self):
+        """Test the sampled/parallel path checks the document's type and top-level constraints"""
+        schema = {"type": "array", "items": {"type": "object"}, "minItems": 1}
+        for data in [{'a': 1}, []]:
+            with self.subTest(data=data):
+                self.assertEqual(document_errors(data, schema, workers=2), document_errors(data, schema))
+        self.assertEqual(document_errors({'a': 1}, schema, workers=2), (1, ["{'a': 1} is not of type 'array'"]))
+        self.assertEqual(document_errors({"customers": {}}, self.schema, array_key='customers', workers=2),
+                         (1, ["{} is not of type 'array'"]))
+        self.assertEqual(document_errors({}, {}, array_key='customers', sample_every=2),
+                         (1, ["'customers' is not an array"]))
+
+
+class TestFrameCache(unittest.TestCase):
+    def test_content_key_and_lru_eviction(self):
+        """Test cache keys follow file content and settings, and old entries are evicted"""
+        df = pd.DataFrame({'id': pd.array([1, None], dtype='Int64'),
+                           'ts': pd.to_datetime(['2023-01-01', '2023-01-02'], utc=True)})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'in.json')
+            with open(path, 'w') as f:
+                f.write('[1]')
+            cache = FrameCache(os.path.join(tmp, 'cache'), max_bytes=1 << 30)
+            key = cache.key(path, schema={}, cast_rules={'a': 1})
+
+            self.assertIsNone(cache.get(key))
+            cache.put(key, df)
+            pd.testing.assert_frame_equal(cache.get(key), df)
+            self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1})
+            self.assertNotEqual(key, cache.key(path, schema={}, cast_rules={'a': 2}))
+
+            with open(path, 'w') as f:
+                f.write('[2]')
+            other = cache.key(path, schema={}, cast_rules={'a': 1})
+            self.assertNotEqual(key, other)
+
+            cache.max_bytes = 1
+            cache.put(other, df)
+            self.assertIsNone(cache.get(key))
+
+
+class TestInputPipeline(unittest.TestCase):
+    def test_run_keeps_order_and_times_stages(self):
+        """Test per-file stage chains run concurrently but return in input order"""
+        pipeline = InputPipeline()
+        stages = [
+            ('upper', str.upper),
+            ('length', lambda value: pipeline.in_process(len, value)),
+        ]
+        outputs, timings = pipeline.run(['a', 'bbb', 'cc'], stages)
+
+        self.assertEqual(outputs, [1, 3, 2])
+        self.assertEqual(list(timings), ['a', 'bbb', 'cc'])
+        self.assertEqual(list(timings['a']), ['upper', 'length'])
+
+
+if __name__ == '__main__':
+    unittest.main()
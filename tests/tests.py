@@ -1,5 +1,5 @@
 import unittest
-from jason import Jason
+from jason import AliasPlan, Jason, NormalizationCache, parse_name
 import json
 
 class TestJason(unittest.TestCase):
@@ -57,6 +57,11 @@ class TestJason(unittest.TestCase):
                 'first_name': 'John', 'last_name': 'Smith', 
                 'middle_name': 'Robert', 'title': None, 'suffix': None
             }),
+            # Several middle names
+            ('Dr. John Robert Paul Smith', {
+                'first_name': 'John', 'last_name': 'Smith',
+                'middle_name': 'Robert Paul', 'title': 'Dr.', 'suffix': None
+            }),
             # Complex case
             # ('Smith, Dr. John Robert, PhD', {
             #     'first_name': 'John', 'last_name': 'Smith', 
@@ -77,6 +82,36 @@ class TestJason(unittest.TestCase):
             with self.subTest(input_name=input_name):
                 result = self.jason.parse_name(input_name)
                 self.assertEqual(result, expected)
+
+    def test_parse_name_middle_names(self):
+        """Test the module-level parser keeps every token between first and last name as the middle name"""
+        self.assertEqual(parse_name('John Robert Smith')['middle_name'], 'Robert')
+        self.assertEqual(parse_name('Mr John Robert Paul Smith III')['middle_name'], 'Robert Paul')
+        for name in ['John Robert Smith', 'Mr John Robert Paul Smith III']:
+            self.assertEqual(parse_name(name), Jason._parse_name(name))
+    
+    def test_normalization_cache(self):
+        """Test cached and batch normalization give the uncached results and count hits/misses"""
+        jason = Jason([], cache=NormalizationCache(maxsize=2))
+        emails = ['A@B.com', 'a@b.com', 'A@B.com', 'bad', None]
+        self.assertEqual(jason.clean_emails(emails), [Jason._clean_email(e) for e in emails])
+
+        names = ['John Smith', 'Smith, John', 'John Smith']
+        result = jason.parse_names(names)
+        self.assertEqual(result, [Jason._parse_name(n) for n in names])
+        result[0]['first_name'] = 'changed'  # results are copies of the cached entries
+        self.assertEqual(jason.parse_name('John Smith')['first_name'], 'John')
+
+        stats = jason.cache_metrics()['normalization_cache']
+        self.assertEqual((stats['hits'], stats['misses']), (3, 6))
+        self.assertEqual((stats['size'], stats['maxsize']), (2, 2))
+
+        # equal but differently typed values get their own entries, missing values none
+        cache = NormalizationCache(maxsize=10)
+        self.assertEqual(cache.lookup_many('repr', [True, 1, 1.0, 1], repr), ['True', '1', '1.0', '1'])
+        nan = float('nan')
+        self.assertEqual([cache.lookup('repr', v, repr) for v in [nan, nan, None]], ['nan', 'nan', 'None'])
+        self.assertEqual((cache.hits, cache.misses, len(cache.entries)), (1, 6, 3))
     
     def test_normalize(self):
         """Test normalization function"""
@@ -90,6 +125,46 @@ class TestJason(unittest.TestCase):
         
         self.assertEqual(result, expected)
     
+    def test_normalize_many(self):
+        """Test batch normalization with per-shape plans and nested aliases"""
+        actual_names = ["name", "email"]
+        alternate_names = {"name": ["full_name", "fullName"], "email": ["email_address", "contact.email"]}
+        records = [
+            {"fullName": "Ann", "contact": {"email": "ann@example.com"}},
+            {"name": None, "full_name": "Bob", "email_address": "bob@example.com"},
+            {"name": "Cy", "contact": "not an object"},
+            {}
+        ]
+        expected = [
+            {"name": "Ann", "email": "ann@example.com"},
+            {"name": "Bob", "email": "bob@example.com"},
+            {"name": "Cy", "email": None},
+            {"name": None, "email": None}
+        ]
+        self.assertEqual(self.jason.normalize_many(actual_names, alternate_names, records), expected)
+        self.assertEqual([self.jason.normalize(actual_names, alternate_names, r) for r in records], expected)
+        import pandas as pd
+        frame = self.jason.normalize_many(actual_names, alternate_names, pd.DataFrame(records))
+        self.assertEqual(frame.to_dict('records'), expected)
+        self.assertEqual(self.jason.normalize_user({"name": "", "fullName": "Ann", "contact": "a@x"}),
+                         {"name": "Ann", "email": "a@x"})
+        # "or" semantics: falsy values fall through to the last alias, None when it is absent
+        for user in [{"name": ""}, {"email": 0}, {"name": "", "fullName": ""}, {"fullName": 0, "contact": ""}, {}]:
+            self.assertEqual(self.jason.normalize_user(user),
+                             {"name": user.get("name") or user.get("fullName"),
+                              "email": user.get("email") or user.get("contact")})
+
+    def test_alias_plan_shapes(self):
+        """Test key order does not make a new shape, fields keep their order and the resolver cache is bounded"""
+        plan = AliasPlan({"name": ["name", "fullName"], "email": ["email"]}, maxsize=2)
+        records = [{"name": None, "fullName": "Ann", "email": "a@x"}, {"email": "b@x", "fullName": "Bob", "name": "B"}]
+        result = plan.resolve_many(records)
+        self.assertEqual(result, [{"name": "Ann", "email": "a@x"}, {"name": "B", "email": "b@x"}])
+        self.assertEqual([list(r) for r in result], [["name", "email"]] * 2)
+        self.assertEqual(plan._resolver.cache_info().currsize, 1)
+        plan.resolve_many([{"name": "C"}, {"email": "d@x"}, {}])
+        self.assertEqual(plan._resolver.cache_info().currsize, 2)
+
     def test_flatten_json(self):
         """Test JSON flattening functionality"""
         nested_json = {
@@ -119,6 +194,64 @@ class TestJason(unittest.TestCase):
         flattened = self.jason.flatten_json(nested_json)
         self.assertEqual(flattened, expected)
     
+    def test_unflatten_json(self):
+        """Test flattening round trips through unflatten_json, in depth and in columns"""
+        nested_json = {"user": {"name": "John", "tags": []}, "projects": [{"title": "P1", "hours": [1, 2]}, {}], "x": None}
+        for lists in (True, False):
+            flattened = self.jason.flatten_json(nested_json, sep='.', lists=lists)
+            self.assertEqual(self.jason.unflatten_json(flattened, sep='.', lists=lists), nested_json)
+        self.assertEqual(self.jason.flatten_json(nested_json, sep='.', lists=False)['projects'], nested_json['projects'])
+        with self.assertRaises(ValueError):
+            self.jason.unflatten_json({"a": 1, "a_b": 2})
+
+        # deeper than the recursion limit
+        deep = leaf = {}
+        for _ in range(5000):
+            leaf["a"] = leaf = {}
+        leaf["a"] = 1
+        self.assertEqual(self.jason.flatten_json(deep, sep='.'), {".".join(["a"] * 5001): 1})
+
+        columns = self.jason.flatten_columns([{"a": 1, "b": {"c": 2}}, {"b": {"d": 3}}])
+        self.assertEqual(columns, {"a": [1, None], "b_c": [2, None], "b_d": [None, 3]})
+
+        # an empty record adds no column
+        self.assertEqual(self.jason.flatten_json({}), {})
+        self.assertEqual(self.jason.unflatten_json(self.jason.flatten_json({})), {})
+        self.assertEqual(self.jason.flatten_columns([{"a": 1}, {}]), {"a": [1, None]})
+
+    def test_query_json(self):
+        """Test compiled path queries and traverse_nested_json built on them"""
+        doc = {"customers": [{"id": 1, "Email": "a@x", "contact": {"email": "b@x"}},
+                             {"id": 2, "email": "c@x", "tags": ["t0", "t1"]}]}
+        found = self.jason.query_json({"emails": "$..email", "ids": "$.customers[*].id", "first": "customers[0].id",
+                                       "tag": "$..tags[1]", "quoted": "$['customers'][1]['email']"}, doc)
+        self.assertEqual(found, {"emails": ["b@x", "c@x"], "ids": [1, 2], "first": [1], "tag": ["t1"], "quoted": ["c@x"]})
+        self.assertEqual(self.jason.query_json(["$..email"], iter([doc, doc]), ignore_case=True),
+                         {"$..email": ["a@x", "b@x", "c@x"] * 2})
+        with self.assertRaises(ValueError):
+            self.jason.query_json(["$.a[x]"], doc)
+        with self.assertRaises(ValueError):
+            self.jason.query_json(["$.customers[-1].id"], doc)
+
+        arr = []
+        self.jason.traverse_nested_json(doc, {"email", "id"}, arr)
+        self.assertEqual(arr, [1, "a@x", "b@x", 2, "c@x"])
+
+    def test_json_lines(self):
+        """Test JSON Lines files are parsed line by line, in parallel and in DataFrame chunks"""
+        import os
+        import tempfile
+        records = [{"id": i, "user": {"name": f"u{i}"}} for i in range(10)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "users.jsonl")
+            self.assertEqual(self.jason.write_json_lines(records, path), 10)
+            self.assertEqual(list(self.jason.iter_json_lines(path)), records)
+            self.assertEqual(self.jason.parse_json_from_file(path), records)
+            self.assertEqual(self.jason.parse_json_from_file(path, workers=3), records)
+            frames = list(self.jason.json_lines_frames(path, chunk_size=4))
+            self.assertEqual([len(f) for f in frames], [4, 4, 2])
+            self.assertEqual(list(frames[0].columns), ["id", "user_name"])
+
     def test_compare_json(self):
         """Test JSON comparison functionality"""
         # Identical JSONs
@@ -144,5 +277,58 @@ class TestJason(unittest.TestCase):
         expected = {"user": {"age": {"value_mismatch": {"json1_value": 30, "json2_value": 31}}}}
         self.assertEqual(self.jason.compare_json(json1, json2), expected)
 
+        # Same numbers written as int and float, in any order
+        self.assertEqual(self.jason.compare_json([1, 2.5, {"n": 3}], [{"n": 3.0}, 2.5, 1.0]), {})
+        self.assertNotEqual(self.jason.compare_json([1, 2], [1.5, 2]), {})
+
+        # Objects whose keys mix ints and strings
+        self.assertEqual(self.jason.compare_json([{1: "a", "b": 2}], [{"b": 2, 1: "a"}]), {})
+        self.assertEqual(self.jason.compare_json([{1: "a"}, {"b": 2}], [{1: "a"}, {"b": 3}]),
+                         {1: {"b": {"value_mismatch": {"json1_value": 2, "json2_value": 3}}}})
+
+    def test_diff_json(self):
+        """Test the structural diff matches list elements by identity or content instead of position"""
+        json1 = {"users": [{"id": 1, "name": "A"}, {"id": 2, "name": "B"}, {"id": 3, "name": "C"}]}
+        json2 = {"users": [{"id": 9, "name": "Z"}, {"id": 1, "name": "A"}, {"id": 2, "name": "b"}, {"id": 3, "name": "C"}]}
+        expected = [
+            {'op': 'replace', 'path': '/users/1/name', 'value': 'b', 'old': 'B'},
+            {'op': 'add', 'path': '/users/0', 'value': {"id": 9, "name": "Z"}}
+        ]
+        self.assertEqual(list(self.jason.diff_json(json1, json2, identity_keys=['id'])), expected)
+        self.assertEqual(list(self.jason.diff_json(json1, json2)), expected)  # by content, then in place
+
+        # reordering is only reported when order matters; true is not 1
+        self.assertEqual(list(self.jason.diff_json([1, 2, 3], [3, 1, 2])), [])
+        self.assertEqual(list(self.jason.diff_json([1, 2, 3], [3, 1, 2], ignore_order=False)),
+                         [{'op': 'move', 'from': '/2', 'path': '/0'}])
+        self.assertEqual(list(self.jason.diff_json({"a/b": True}, {"a/b": 1})),
+                         [{'op': 'replace', 'path': '/a~1b', 'value': 1, 'old': True}])
+        self.assertEqual(self.jason.compare_json([{"x": 1}, {"y": 2}], [{"y": 2}, {"x": 1}]), {})
+
+    def test_iter_compare_json(self):
+        """Test differences are yielded lazily, stop at max_diffs and can come from two streamed arrays"""
+        json1 = [{"id": i, "v": i} for i in range(100)]
+        json2 = [{"id": i, "v": -i if i % 10 == 0 else i} for i in range(100)] + [{"id": 100, "v": 0}]
+        diffs = list(self.jason.iter_compare_json(json1, json2, identity_keys=['id']))
+        self.assertEqual(len(diffs), 10)  # id 0 keeps v == 0
+        self.assertEqual(diffs[0], ('/10/v', 'replace', 10, -10))
+        self.assertEqual(diffs[-1], ('/100', 'add', None, {"id": 100, "v": 0}))
+        self.assertEqual(list(self.jason.iter_compare_json(json1, json2, identity_keys=['id'], max_diffs=3)), diffs[:3])
+
+        # the streams are only read as far as needed
+        read = []
+        def stream(items):
+            for item in items:
+                read.append(item)
+                yield item
+        first = next(self.jason.iter_compare_json(stream(json1), stream(json2), identity_keys=['id']))
+        self.assertEqual(first, diffs[0])
+        self.assertLess(len(read), 30)
+        self.assertEqual(list(self.jason.iter_compare_json(iter(json1), iter(json2), identity_keys=['id'])), diffs)
+        self.assertEqual(list(self.jason.iter_compare_json(iter([1, 2, 3]), [3, 1, 2], ignore_order=False)),
+                         [('/0', 'move', '/2', 3)])
+        with self.assertRaises(TypeError):
+            list(self.jason.iter_compare_json(iter(json1), {"id": 1}))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file